@@ -0,0 +1,200 @@
+import bisect
+import dataclasses
+import json
+from dataclasses import dataclass
+from itertools import accumulate
+from pathlib import Path
+from typing import Iterator, Optional
+
+import numpy as np
+
+from .models import Composition
+from .timeline import Timeline, compile_timeline, loop_length
+
+
+@dataclass
+class Section:
+    composition: Composition
+    repeats: int = 1
+    fade_in: int = 0  # Bars to ramp velocity up over at the start
+    fade_out: int = 0  # Bars to ramp velocity down over at the end
+
+    def to_dict(self) -> dict:
+        return {
+            "composition": self.composition.to_dict(),
+            "repeats": self.repeats,
+            "fade_in": self.fade_in,
+            "fade_out": self.fade_out,
+        }
+
+
+@dataclass(frozen=True)
+class Segment:
+    """One loop of one section, placed on the arrangement's clock"""
+
+    section: int
+    repeat: int
+    timeline: Timeline
+    tick: int  # Arrangement tick where this loop starts
+    ns: int  # Nanoseconds from the start of the arrangement to ``tick``
+    skip: int = 0  # Ticks at the start of the loop not to play (after a seek)
+
+    @property
+    def skip_ns(self) -> int:
+        return round(self.skip * self.timeline.seconds_per_tick * 1e9)
+
+    @property
+    def end_tick(self) -> int:
+        return self.tick + self.timeline.length
+
+    def hits(self) -> Timeline:
+        """The loop's hits from ``skip`` on, with ticks on the arrangement clock"""
+        timeline = self.timeline
+        first = np.searchsorted(timeline.tick, self.skip)
+        return dataclasses.replace(
+            timeline,
+            tick=timeline.tick[first:] + self.tick,
+            note=timeline.note[first:],
+            channel=timeline.channel[first:],
+            velocity=timeline.velocity[first:],
+            pan=timeline.pan[first:],
+            duration=timeline.duration[first:],
+            pattern=timeline.pattern[first:],
+        )
+
+
+class Arrangement:
+    """A sequence of compositions, each repeated and optionally faded.
+
+    Only per-section lengths and their running totals are stored; loops are
+    compiled (through the timeline cache) and produced one at a time by
+    ``segments``, so a set of any length plays and exports in constant
+    memory. Seeking to a bar is a binary search over the section starts.
+    """
+
+    def __init__(self, sections: list[Section], ppqn: int = 480):
+        if any(section.repeats < 0 for section in sections):
+            raise ValueError("Section repeats must not be negative")
+        self.sections = list(sections)
+        self.ppqn = ppqn
+        self.bar_length = ppqn * 4
+
+        self._loop_ticks = [loop_length(s.composition, ppqn) for s in self.sections]
+        self._loop_bars = [-(-ticks // self.bar_length) for ticks in self._loop_ticks]
+        self._loop_ns = [
+            round(ticks * 60e9 / (section.composition.config.bpm * ppqn))
+            for ticks, section in zip(self._loop_ticks, self.sections)
+        ]
+        repeats = [section.repeats for section in self.sections]
+        self._start_bar = [
+            0,
+            *accumulate(b * r for b, r in zip(self._loop_bars, repeats)),
+        ]
+        self._start_tick = [
+            0,
+            *accumulate(t * r for t, r in zip(self._loop_ticks, repeats)),
+        ]
+        self._start_ns = [0, *accumulate(n * r for n, r in zip(self._loop_ns, repeats))]
+
+    @property
+    def bars(self) -> int:
+        return self._start_bar[-1]
+
+    @property
+    def length(self) -> int:
+        """Total length in ticks"""
+        return self._start_tick[-1]
+
+    @property
+    def duration_ns(self) -> int:
+        return self._start_ns[-1]
+
+    def locate(self, bar: int) -> tuple[int, int, int]:
+        """(section, repeat, bar within the loop) of an arrangement bar"""
+        if not 0 <= bar < self.bars:
+            raise ValueError(
+                f"Bar {bar} is outside the arrangement (0-{self.bars - 1})"
+            )
+        section = bisect.bisect_right(self._start_bar, bar) - 1
+        repeat, loop_bar = divmod(
+            bar - self._start_bar[section], self._loop_bars[section]
+        )
+        return section, repeat, loop_bar
+
+    def _faded(self, index: int, repeat: int, timeline: Timeline) -> Timeline:
+        section = self.sections[index]
+        if not (section.fade_in or section.fade_out):
+            return timeline
+
+        # Position of every hit within the section, in bars
+        loop_ticks = self._loop_ticks[index]
+        position = (repeat * loop_ticks + timeline.tick) / self.bar_length
+        remaining = section.repeats * loop_ticks / self.bar_length - position
+        gain = np.ones(len(timeline), dtype=np.float64)
+        if section.fade_in:
+            gain *= np.minimum(1, (position + 1) / (section.fade_in + 1))
+        if section.fade_out:
+            gain *= np.minimum(1, remaining / section.fade_out)
+        if np.all(gain >= 1):
+            return timeline
+
+        velocity = np.maximum(1, np.rint(timeline.velocity * gain)).astype(np.uint8)
+        velocity.flags.writeable = False
+        return dataclasses.replace(timeline, velocity=velocity)
+
+    def segments(self, start_bar: int = 0) -> Iterator[Segment]:
+        """Every loop from ``start_bar`` to the end, compiled as it is reached"""
+        if start_bar >= self.bars:
+            return
+        first, first_repeat, loop_bar = self.locate(start_bar)
+        skip = loop_bar * self.bar_length
+
+        for index in range(first, len(self.sections)):
+            section = self.sections[index]
+            timeline = compile_timeline(section.composition, self.ppqn)
+            repeat = first_repeat if index == first else 0
+            for repeat in range(repeat, section.repeats):
+                yield Segment(
+                    section=index,
+                    repeat=repeat,
+                    timeline=self._faded(index, repeat, timeline),
+                    tick=self._start_tick[index] + repeat * self._loop_ticks[index],
+                    ns=self._start_ns[index] + repeat * self._loop_ns[index],
+                    skip=skip,
+                )
+                skip = 0
+
+    def start_ns(self, bar: int) -> int:
+        """Nanoseconds from the start of the arrangement to a bar"""
+        section, repeat, loop_bar = self.locate(bar)
+        bpm = self.sections[section].composition.config.bpm
+        return (
+            self._start_ns[section]
+            + repeat * self._loop_ns[section]
+            + round(loop_bar * self.bar_length * 60e9 / (bpm * self.ppqn))
+        )
+
+    def to_dict(self) -> dict:
+        return {"sections": [section.to_dict() for section in self.sections]}
+
+    @classmethod
+    def from_dict(cls, data: dict, base_dir: Optional[Path] = None) -> "Arrangement":
+        """Sections give a ``composition`` inline or a ``file`` to load it
+        from, relative to ``base_dir``"""
+        sections = []
+        for entry in data["sections"]:
+            if "file" in entry:
+                path = Path(base_dir or ".") / entry["file"]
+                with open(path) as f:
+                    composition = Composition.from_dict(json.load(f))
+            else:
+                composition = Composition.from_dict(entry["composition"])
+            sections.append(
+                Section(
+                    composition,
+                    repeats=entry.get("repeats", 1),
+                    fade_in=entry.get("fade_in", 0),
+                    fade_out=entry.get("fade_out", 0),
+                )
+            )
+        return cls(sections, ppqn=data.get("ppqn", 480))
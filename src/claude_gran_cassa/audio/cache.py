@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+from ..config import config
+from .samples import CHANNELS, SAMPLE_RATE, decode_sample
+
+
+class SampleCache:
+    """Decoded sample store: mixer-format PCM on disk, recent banks in memory.
+
+    Each sample is decoded once into int16 stereo at the mixer rate and saved
+    as ``.npy`` under ``cache_dir``, keyed by path, mtime, size and format, so
+    an edited file is decoded again. Later loads memory-map that file. Whole
+    banks are kept in an in-process LRU until ``max_bytes`` is exceeded,
+    keyed by the mtime and size of the bank file and every sample in it.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        max_bytes: int = 256 * 1024 * 1024,
+        sample_rate: int = SAMPLE_RATE,
+        decoder: Callable[[Path, int], np.ndarray] = decode_sample,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.sample_rate = sample_rate
+        self.decoder = decoder
+        self._banks: "OrderedDict[tuple, dict]" = OrderedDict()
+        self._bank_bytes: dict[tuple, int] = {}
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(self._bank_bytes.values())
+
+    @staticmethod
+    def _signature(path: Path) -> tuple[int, int]:
+        stat = path.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def _key(self, path: Path) -> str:
+        mtime, size = self._signature(path)
+        fmt = f"{self.sample_rate}/16/{CHANNELS}"
+        ident = f"{path}|{mtime}|{size}|{fmt}"
+        return hashlib.sha1(ident.encode()).hexdigest()
+
+    def load_sample(self, sound_file, decoder: Optional[Callable] = None) -> np.ndarray:
+        path = Path(sound_file).resolve()
+        cached = self.cache_dir / f"{self._key(path)}.npy"
+        try:
+            return np.load(cached, mmap_mode="r")
+        except (FileNotFoundError, ValueError):
+            pass
+
+        data = (decoder or self.decoder)(path, self.sample_rate)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # Write then rename so concurrent readers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, data)
+            os.replace(tmp, cached)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return np.load(cached, mmap_mode="r")
+
+    def load_bank(self, config_path: Path, decoder: Optional[Callable] = None) -> dict:
+        """Samples of a sound bank keyed by MIDI note"""
+        path = Path(config_path).resolve()
+        with open(path) as f:
+            sound_config = json.load(f)
+        # Samples replaced in place must not be served from the old bank
+        files = {int(note): Path(file).resolve() for note, file in sound_config.items()}
+        bank_key = (
+            str(path),
+            path.stat().st_mtime_ns,
+            *((str(file), *self._signature(file)) for file in files.values()),
+        )
+        bank = self._banks.get(bank_key)
+        if bank is not None:
+            self._banks.move_to_end(bank_key)
+            return bank
+
+        bank = {note: self.load_sample(file, decoder) for note, file in files.items()}
+
+        self._banks[bank_key] = bank
+        self._bank_bytes[bank_key] = sum(s.nbytes for s in bank.values())
+        # Evict least recently used banks, always keeping the one just loaded
+        while self.memory_bytes > self.max_bytes and len(self._banks) > 1:
+            evicted, _ = self._banks.popitem(last=False)
+            del self._bank_bytes[evicted]
+        return bank
+
+    def clear(self):
+        self._banks.clear()
+        self._bank_bytes.clear()
+
+
+_default_cache: Optional[SampleCache] = None
+
+
+def default_cache() -> SampleCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = SampleCache(config.cache_dir / "samples")
+    return _default_cache
@@ -1,55 +1,65 @@
 import json
+import wave
 import pygame.midi
 import pygame.mixer
-import time
+import pygame.sndarray
 from pathlib import Path
+from typing import Optional
 from ..models import Composition
+from ..playback import Player
+from ..timeline import Timeline
+from ..tracing import span
+from .cache import SampleCache, default_cache
+from .samples import CHANNELS, SAMPLE_RATE, balance, decode_sample
 
 
-class AudioEngine:
-    def __init__(self):
-        pygame.mixer.init(44100, -16, 2, 2048)
+def _decode(sound_file: Path, sample_rate: int):
+    """Decode WAV directly; anything else goes through the pygame mixer"""
+    try:
+        return decode_sample(sound_file, sample_rate)
+    except wave.Error:
+        return pygame.sndarray.array(pygame.mixer.Sound(str(sound_file)))
+
+
+class AudioEngine(Player):
+    def __init__(
+        self, lookahead_ms: float = 0.0, sample_cache: Optional[SampleCache] = None
+    ):
+        super().__init__(lookahead_ms=lookahead_ms)
+        with span("engine.init", backend="audio"):
+            pygame.mixer.init(SAMPLE_RATE, -16, CHANNELS, 2048)
         self.sounds = {}
+        self.sample_cache = sample_cache or default_cache()
 
     def load_sound_bank(self, config_path: Path):
-        with open(config_path) as f:
-            self.sound_config = json.load(f)
-            for note, sound_file in self.sound_config.items():
-                self.sounds[int(note)] = pygame.mixer.Sound(sound_file)
+        with span("samples.load", bank=str(config_path)) as current:
+            with open(config_path) as f:
+                self.sound_config = json.load(f)
+            bank = self.sample_cache.load_bank(config_path, decoder=_decode)
+            self.sounds = {
+                note: pygame.mixer.Sound(buffer=samples)
+                for note, samples in bank.items()
+            }
+            current.set(sounds=len(self.sounds))
+        # Payloads hold Sound objects from the old bank; playback prepares
+        # new ones from the next bar line
+        self._prepared = None
+
+    def _prepare(self, timeline: Timeline):
+        gains = (timeline.velocity / 127)[:, None] * balance(timeline.pan)
+        return [
+            (offset, (self.sounds[note], left, right))
+            for offset, note, (left, right) in zip(
+                timeline.nanoseconds().tolist(), timeline.note.tolist(), gains.tolist()
+            )
+            if note in self.sounds
+        ]
+
+    def _dispatch(self, batch):
+        for _, (sound, left, right) in batch:
+            channel = sound.play()
+            if channel is not None:
+                channel.set_volume(left, right)
 
     def play_pattern(self, composition: Composition):
-        bpm = composition.config.bpm
-        ms_per_tick = (60000 / bpm) / 4  # ms per 16th note
-
-        # Group events by time
-        timeline = {}
-        for pattern in composition.patterns:
-            hit_count = 0
-            for i, hit in enumerate(pattern.hits):
-                if hit == 1:
-                    tick = i * ms_per_tick
-                    if tick not in timeline:
-                        timeline[tick] = []
-                    timeline[tick].append(
-                        {
-                            "note": pattern.note,
-                            "velocity": pattern.velocities[hit_count],
-                            "pan": pattern.panning[hit_count],
-                        }
-                    )
-                    hit_count += 1
-
-        # Play events
-        start_time = time.time() * 1000
-        for tick, events in sorted(timeline.items()):
-            while (time.time() * 1000 - start_time) < tick:
-                time.sleep(0.001)
-            for event in events:
-                if event["note"] in self.sounds:
-                    sound = self.sounds[event["note"]]
-                    velocity = event["velocity"] / 127
-                    # Convert pan (0-127) to stereo balance (-1.0 to 1.0)
-                    pan = (event["pan"] - 64) / 64.0
-                    sound.set_volume(velocity)
-                    # sound.set_volume(velocity * (1 - pan), velocity * (1 + pan))
-                    sound.play()
+        self.play(composition)
@@ -0,0 +1,137 @@
+import wave
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from ..arrangement import Arrangement
+from ..models import Composition
+from ..timeline import compile_timeline
+from ..tracing import span
+from .cache import SampleCache
+from .samples import CHANNELS, SAMPLE_RATE, balance, load_sample_bank
+
+
+class OfflineRenderer:
+    """Mix a composition into a stereo buffer without touching audio hardware"""
+
+    def __init__(
+        self,
+        sample_rate: int = SAMPLE_RATE,
+        ppqn: int = 480,
+        sample_cache: Optional[SampleCache] = None,
+    ):
+        self.sample_rate = sample_rate
+        self.ppqn = ppqn
+        self.sample_cache = sample_cache
+        self.samples = {}
+
+    def load_sound_bank(self, config_path: Path):
+        with span("samples.load", bank=str(config_path)):
+            if self.sample_cache is not None:
+                self.samples = self.sample_cache.load_bank(config_path)
+            else:
+                self.samples = load_sample_bank(config_path, self.sample_rate)
+
+    def _gains(self, timeline) -> np.ndarray:
+        """Per-hit stereo gain: velocity scaled, balance-panned so centre is unity"""
+        return ((timeline.velocity / 127)[:, None] * balance(timeline.pan)).astype(
+            np.float32
+        )
+
+    def _mix(
+        self,
+        buffer: np.ndarray,
+        offsets: np.ndarray,
+        notes: np.ndarray,
+        gains: np.ndarray,
+    ):
+        for note, sample in self.samples.items():
+            selected = np.flatnonzero(notes == note)
+            if not len(selected):
+                continue
+            sample = sample.astype(np.float32) / 32768
+            frames = len(sample)
+            for offset, gain in zip(offsets[selected], gains[selected]):
+                buffer[offset : offset + frames] += sample * gain
+
+    @property
+    def _tail(self) -> int:
+        return max((len(s) for s in self.samples.values()), default=0)
+
+    @staticmethod
+    def _audible(buffer: np.ndarray) -> int:
+        """Frames up to and including the last non-silent one"""
+        audible = np.flatnonzero(np.any(buffer != 0, axis=1))
+        return audible[-1] + 1 if len(audible) else 0
+
+    def render(self, composition: Composition, loops: int = 1) -> np.ndarray:
+        """Render to a float32 buffer of shape (frames, 2) in the range -1..1"""
+        timeline = compile_timeline(composition, self.ppqn)
+
+        samples_per_tick = self.sample_rate * timeline.seconds_per_tick
+        loop_offsets = np.arange(loops, dtype=np.int64) * timeline.length
+        offsets = np.rint(
+            (timeline.tick[None, :] + loop_offsets[:, None]).ravel() * samples_per_tick
+        ).astype(np.int64)
+        notes = np.tile(timeline.note, loops)
+        gains = np.tile(self._gains(timeline), (loops, 1))
+
+        length = int(round(loops * timeline.length * samples_per_tick))
+        buffer = np.zeros((length + self._tail, CHANNELS), dtype=np.float32)
+        self._mix(buffer, offsets, notes, gains)
+
+        # Trim the tail back to the last audible frame
+        return buffer[: length + self._audible(buffer[length:])]
+
+    def write_arrangement(
+        self, arrangement: Arrangement, filename: str, start_bar: int = 0
+    ) -> int:
+        """Render an arrangement straight to a WAV file one loop at a time,
+        so memory use does not grow with its length. Returns the frames
+        written."""
+        tail = self._tail
+        carry = np.zeros((tail, CHANNELS), dtype=np.float32)
+        written = 0
+        origin = None
+        with wave.open(str(filename), "wb") as wav:
+            self._open_wav(wav)
+            for segment in arrangement.segments(start_bar):
+                timeline = segment.timeline
+                if origin is None:
+                    origin = segment.ns + segment.skip_ns
+                loop_ns = timeline.length * timeline.seconds_per_tick * 1e9
+                end = round((segment.ns + loop_ns - origin) * self.sample_rate / 1e9)
+
+                buffer = np.zeros((end - written + tail, CHANNELS), dtype=np.float32)
+                buffer[:tail] += carry
+                hits = segment.hits()
+                hit_ns = segment.ns + (hits.tick - segment.tick) * (
+                    timeline.seconds_per_tick * 1e9
+                )
+                offsets = np.rint(
+                    (hit_ns - origin) * self.sample_rate / 1e9 - written
+                ).astype(np.int64)
+                self._mix(buffer, offsets, hits.note, self._gains(hits))
+
+                wav.writeframes(self._pcm(buffer[: end - written]))
+                carry = buffer[end - written :]
+                written = end
+
+            audible = self._audible(carry)
+            wav.writeframes(self._pcm(carry[:audible]))
+        return written + audible
+
+    @staticmethod
+    def _pcm(buffer: np.ndarray) -> bytes:
+        return (np.clip(buffer, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+    def _open_wav(self, wav):
+        wav.setnchannels(CHANNELS)
+        wav.setsampwidth(2)
+        wav.setframerate(self.sample_rate)
+
+    def write_wav(self, buffer: np.ndarray, filename: str):
+        with wave.open(str(filename), "wb") as wav:
+            self._open_wav(wav)
+            wav.writeframes(self._pcm(buffer))
@@ -0,0 +1,76 @@
+import json
+import wave
+from pathlib import Path
+
+import numpy as np
+
+# Mixer format shared by the realtime engine and the offline renderer
+SAMPLE_RATE = 44100
+CHANNELS = 2
+
+
+def balance(pan: np.ndarray) -> np.ndarray:
+    """Map MIDI pan (0-127, 64 = center) to (left, right) gains, unity at center"""
+    pan = np.asarray(pan, dtype=np.float64) - 64
+    pan = np.clip(np.where(pan < 0, pan / 64, pan / 63), -1.0, 1.0)
+    return np.stack([np.clip(1 - pan, 0, 1), np.clip(1 + pan, 0, 1)], axis=-1)
+
+
+def _pcm_to_int16(frames: bytes, sample_width: int) -> np.ndarray:
+    if sample_width == 1:
+        # 8-bit WAV is unsigned
+        data = np.frombuffer(frames, dtype=np.uint8).astype(np.int16)
+        return (data - 128) << 8
+    if sample_width == 2:
+        return np.frombuffer(frames, dtype="<i2").copy()
+    if sample_width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        # Keep the two most significant bytes of each little-endian sample
+        return raw[:, 1].astype(np.int16) | (raw[:, 2].astype(np.int16) << 8)
+    if sample_width == 4:
+        return (np.frombuffer(frames, dtype="<i4") >> 16).astype(np.int16)
+    raise ValueError(f"Unsupported sample width: {sample_width} bytes")
+
+
+def _resample(data: np.ndarray, source_rate: int, target_rate: int) -> np.ndarray:
+    """Linear interpolation resampling, one column per channel"""
+    length = int(round(len(data) * target_rate / source_rate))
+    source_positions = np.arange(len(data))
+    target_positions = np.linspace(0, len(data) - 1, length)
+    return np.stack(
+        [
+            np.interp(target_positions, source_positions, data[:, c])
+            for c in range(data.shape[1])
+        ],
+        axis=1,
+    ).astype(np.int16)
+
+
+def decode_sample(sound_file, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Decode a WAV file into mixer-format PCM: int16, shape (frames, 2)"""
+    with wave.open(str(sound_file), "rb") as wav:
+        channels = wav.getnchannels()
+        sample_width = wav.getsampwidth()
+        source_rate = wav.getframerate()
+        frames = wav.readframes(wav.getnframes())
+
+    data = _pcm_to_int16(frames, sample_width).reshape(-1, channels)
+    if channels == 1:
+        data = np.repeat(data, CHANNELS, axis=1)
+    elif channels > CHANNELS:
+        data = data[:, :CHANNELS]
+
+    if source_rate != sample_rate and len(data) > 1:
+        data = _resample(data, source_rate, sample_rate)
+
+    return np.ascontiguousarray(data)
+
+
+def load_sample_bank(config_path: Path, sample_rate: int = SAMPLE_RATE) -> dict:
+    """Decode every sample of a sound bank, keyed by MIDI note"""
+    with open(config_path) as f:
+        sound_config = json.load(f)
+    return {
+        int(note): decode_sample(sound_file, sample_rate)
+        for note, sound_file in sound_config.items()
+    }
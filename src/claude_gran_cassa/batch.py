@@ -0,0 +1,74 @@
+import asyncio
+import random
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional
+
+from .composer import Composer
+from .models import Composition
+
+
+@dataclass
+class BatchResult:
+    index: int
+    prompt: str
+    composition: Optional[Composition] = None
+    error: Optional[str] = None
+    attempts: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.composition is not None
+
+
+def _retry_delay(error: Exception, attempt: int, backoff: float) -> float:
+    """Honour the server's retry-after header, else exponential backoff with jitter"""
+    response = getattr(error, "response", None)
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        if retry_after is not None:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+    return backoff * (2**attempt) * (0.5 + random.random() / 2)
+
+
+async def generate_batch(
+    composer: Composer,
+    prompts: Iterable[str],
+    concurrency: int = 4,
+    max_retries: int = 5,
+    backoff: float = 1.0,
+    on_result: Optional[Callable[[BatchResult], None]] = None,
+) -> list[BatchResult]:
+    """Generate one composition per prompt with at most ``concurrency`` requests
+    in flight. ``on_result`` is called as each prompt completes, in completion
+    order; the returned list is in prompt order."""
+    from anthropic import InternalServerError, RateLimitError
+
+    retryable = (RateLimitError, InternalServerError)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(index: int, prompt: str) -> BatchResult:
+        result = BatchResult(index=index, prompt=prompt)
+        async with semaphore:
+            while True:
+                result.attempts += 1
+                try:
+                    result.composition = await composer.agenerate_pattern(prompt)
+                    break
+                except retryable as e:
+                    if result.attempts > max_retries:
+                        result.error = str(e)
+                        break
+                    await asyncio.sleep(_retry_delay(e, result.attempts - 1, backoff))
+                except Exception as e:
+                    result.error = str(e)
+                    break
+        if on_result is not None:
+            on_result(result)
+        return result
+
+    return await asyncio.gather(
+        *(run(index, prompt) for index, prompt in enumerate(prompts))
+    )
@@ -0,0 +1,297 @@
+import asyncio
+import json
+import platform
+import statistics
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+
+from .audio.render import OfflineRenderer
+from .audio.samples import CHANNELS, SAMPLE_RATE
+from .batch import generate_batch
+from .composer import Composer
+from .midi import MIDIConverter
+from .models import Composition, Pattern, SongConfig
+from .parser import ResponseParser
+from .scheduler import Scheduler
+from .timeline import clear_cache, compile_timeline
+
+# Synthetic composition sizes: (patterns, divisions, bars)
+SIZES = {
+    "small": (4, 16, 1),
+    "medium": (8, 64, 4),
+    "large": (16, 256, 16),
+}
+QUICK_SIZES = ("small", "medium")
+
+# Differences smaller than this are timer and scheduling noise, not regressions
+NOISE_FLOOR = 50e-6
+
+DRUM_NOTES = [36, 38, 42, 46, 39, 45, 48, 50, 49, 51, 37, 56, 54, 70, 75, 76]
+
+
+def synthetic_composition(
+    patterns: int, divisions: int, bars: int = 1, seed: int = 0
+) -> Composition:
+    """A random but reproducible composition of the given size"""
+    rng = np.random.default_rng(seed)
+    result = []
+    for i in range(patterns):
+        hits = (rng.random(divisions) < 0.3).astype(int)
+        count = int(hits.sum())
+        result.append(
+            Pattern(
+                hits=hits.tolist(),
+                divisions=divisions,
+                triplet=i % 4 == 3,
+                channel=i + 1,
+                note=DRUM_NOTES[i % len(DRUM_NOTES)],
+                velocities=rng.integers(60, 128, count).tolist(),
+                panning=rng.integers(0, 128, count).tolist(),
+                name=f"pattern {i}",
+                bars=bars,
+            )
+        )
+    return Composition(config=SongConfig(bpm=128), patterns=result)
+
+
+def synthetic_response(composition: Composition) -> str:
+    """The composition as a model would answer, with response-scale pans"""
+    data = composition.to_dict()
+    for pattern in data["patterns"]:
+        pattern["panning"] = [pan - 64 for pan in pattern["panning"]]
+    return f"Here is the pattern:\n{json.dumps(data, indent=2)}\nEnjoy!"
+
+
+def synthetic_samples(seconds: float = 0.25) -> dict[int, np.ndarray]:
+    """Decaying noise bursts for every drum note, in the mixer format"""
+    rng = np.random.default_rng(0)
+    frames = int(seconds * SAMPLE_RATE)
+    envelope = np.exp(-np.linspace(0, 8, frames))
+    samples = {}
+    for note in DRUM_NOTES:
+        mono = rng.uniform(-1, 1, frames) * envelope * 16000
+        samples[note] = np.repeat(mono.astype(np.int16)[:, None], CHANNELS, axis=1)
+    return samples
+
+
+@dataclass
+class Result:
+    name: str
+    seconds: float  # Median per run
+    runs: int
+
+
+def measure(
+    function: Callable[[], object],
+    repeat: int = 5,
+    min_time: float = 0.2,
+    setup: Optional[Callable[[], object]] = None,
+) -> tuple[float, int]:
+    """Median seconds per call and the number of timed calls.
+
+    Runs once untimed to warm up, then at least ``repeat`` times and for at
+    least ``min_time`` seconds. ``setup`` runs before each call, untimed.
+    """
+    if setup is not None:
+        setup()
+    function()
+    times = []
+    deadline = time.perf_counter() + min_time
+    while len(times) < repeat or time.perf_counter() < deadline:
+        if setup is not None:
+            setup()
+        start = time.perf_counter_ns()
+        function()
+        times.append((time.perf_counter_ns() - start) / 1e9)
+    return statistics.median(times), len(times)
+
+
+CASES = ("parse", "from_dict", "to_dict", "compile", "midi", "render")
+
+
+def size_benchmarks(
+    size: str, cases: Iterable[str] = CASES, repeat: int = 5, min_time: float = 0.2
+) -> list[Result]:
+    """Time the pipeline stages on a synthetic composition of one size"""
+    composition = synthetic_composition(*SIZES[size])
+    data = composition.to_dict()
+    response = synthetic_response(composition)
+    converter = MIDIConverter()
+    renderer = OfflineRenderer()
+    renderer.samples = synthetic_samples()
+
+    functions = {
+        "parse": (lambda: ResponseParser.parse(response), None),
+        "from_dict": (lambda: Composition.from_dict(data), None),
+        "to_dict": (composition.to_dict, None),
+        "compile": (lambda: compile_timeline(composition), clear_cache),
+        "midi": (lambda: converter.convert(composition), None),
+        "render": (lambda: renderer.render(composition), None),
+    }
+    results = []
+    for case in cases:
+        function, setup = functions[case]
+        seconds, runs = measure(function, repeat, min_time, setup)
+        results.append(Result(f"{case}/{size}", seconds, runs))
+    return results
+
+
+def scheduler_lateness(events: int = 500, interval_ms: float = 1.0) -> list[Result]:
+    """Dispatch lateness of a steady event stream, as p50 and p99"""
+    scheduler = Scheduler(lambda batch: None)
+    interval = int(interval_ms * 1_000_000)
+    scheduler.start((i * interval, i) for i in range(events))
+    scheduler.join()
+    stats = scheduler.stats
+    return [
+        Result("scheduler/p50", stats.p50 / 1e9, len(stats)),
+        Result("scheduler/p99", stats.p99 / 1e9, len(stats)),
+    ]
+
+
+class StubClient:
+    """Answers every request with the same response, like Anthropic(Async)
+    would, after ``latency`` seconds"""
+
+    def __init__(self, text: str, latency: float = 0.0):
+        self.text = text
+        self.latency = latency
+        self.messages = self
+
+    def _response(self):
+        return SimpleNamespace(content=[SimpleNamespace(text=self.text)])
+
+    def create(self, **request):
+        if self.latency:
+            time.sleep(self.latency)
+        return self._response()
+
+
+class StubAsyncClient(StubClient):
+    async def create(self, **request):
+        await asyncio.sleep(self.latency)
+        return self._response()
+
+
+def composer_overhead(
+    requests: int = 64, concurrency: int = 8, latency: float = 0.005
+) -> list[Result]:
+    """Composer cost per request against a local stub: one synchronous
+    generation, and the time a concurrent batch takes beyond the stub's
+    own latency"""
+    text = synthetic_response(synthetic_composition(*SIZES["medium"]))
+    composer = Composer(
+        api_key="benchmark",
+        client=StubClient(text),
+        async_client=StubAsyncClient(text, latency),
+    )
+    seconds, runs = measure(lambda: composer.generate_pattern("techno"))
+    results = [Result("composer/generate", seconds, runs)]
+
+    prompts = [f"techno {i}" for i in range(requests)]
+    ideal = -(-requests // concurrency) * latency
+    seconds, runs = measure(
+        lambda: asyncio.run(generate_batch(composer, prompts, concurrency)), repeat=3
+    )
+    results.append(Result("composer/batch", max(seconds - ideal, 0) / requests, runs))
+    return results
+
+
+def run_benchmarks(
+    sizes: Iterable[str] = tuple(SIZES),
+    only: Iterable[str] = (),
+    repeat: int = 5,
+    min_time: float = 0.2,
+    on_result: Optional[Callable[[Result], None]] = None,
+) -> list[Result]:
+    """Run every benchmark, or those whose names start with one of ``only``"""
+    only = tuple(only)
+
+    def selected(names: Iterable[str]) -> list[str]:
+        return [name for name in names if not only or name.startswith(only)]
+
+    groups = []
+    for size in sizes:
+        cases = [case for case in CASES if selected([f"{case}/{size}"])]
+        groups.append((cases, partial(size_benchmarks, size, cases, repeat, min_time)))
+    groups.append((selected(["scheduler/p50", "scheduler/p99"]), scheduler_lateness))
+    groups.append(
+        (selected(["composer/generate", "composer/batch"]), composer_overhead)
+    )
+
+    results = []
+    for names, group in groups:
+        if not names:
+            continue
+        for result in group():
+            if not selected([result.name]):
+                continue
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+    return results
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "numpy": np.__version__,
+    }
+
+
+def save_baseline(results: list[Result], path: Path):
+    """Store results as a baseline to compare later runs against"""
+    data = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment(),
+        "results": {result.name: result.seconds for result in results},
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, indent=2) + "\n")
+
+
+def load_baseline(path: Path) -> dict:
+    return json.loads(Path(path).read_text())
+
+
+@dataclass
+class Comparison:
+    name: str
+    seconds: float
+    baseline: Optional[float]
+    regressed: bool
+
+    @property
+    def change(self) -> Optional[float]:
+        """Relative change from the baseline, positive when slower"""
+        if not self.baseline:
+            return None
+        return self.seconds / self.baseline - 1
+
+
+def compare(
+    results: list[Result], baseline: dict, threshold: float = 0.25
+) -> list[Comparison]:
+    """Compare results with a stored baseline. A benchmark regresses when it
+    is more than ``threshold`` slower and by more than the noise floor."""
+    previous = baseline.get("results", {})
+    comparisons = []
+    for result in results:
+        base = previous.get(result.name)
+        regressed = (
+            base is not None
+            and result.seconds > base * (1 + threshold)
+            and result.seconds - base > NOISE_FLOOR
+        )
+        comparisons.append(Comparison(result.name, result.seconds, base, regressed))
+    return comparisons
@@ -0,0 +1,89 @@
+import click
+import json
+from pathlib import Path
+from ..arrangement import Arrangement
+from ..audio.cache import default_cache
+from ..audio.render import OfflineRenderer
+from ..midi import MIDIConverter
+from .play import create_player
+
+
+@click.command()
+@click.argument("arrangement_file", type=click.Path(exists=True))
+@click.option(
+    "--start-bar", default=0, type=click.IntRange(min=0), help="Bar to start at"
+)
+@click.option(
+    "--midi-out", type=click.Path(dir_okay=False), help="Export to a MIDI file"
+)
+@click.option("--wav-out", type=click.Path(dir_okay=False), help="Render to a WAV file")
+@click.option("--play/--no-play", default=False, help="Play the arrangement")
+@click.option(
+    "--audio/--midi", default=False, help="Use audio playback instead of MIDI"
+)
+@click.option(
+    "--samples",
+    type=click.Path(exists=True),
+    help="Sound bank configuration for audio playback and rendering",
+)
+@click.option("--device", type=int, help="MIDI output device id (see list-devices)")
+@click.option(
+    "--clock/--no-clock",
+    default=False,
+    help="Send MIDI clock and song position so hardware follows along",
+)
+def arrange(
+    arrangement_file,
+    start_bar,
+    midi_out,
+    wav_out,
+    play,
+    audio,
+    samples,
+    device,
+    clock,
+):
+    """Play or export an arrangement of patterns.
+
+    The arrangement file lists sections in order, each with a pattern
+    ``file`` (relative to the arrangement) or inline ``composition``, plus
+    optional ``repeats``, ``fade_in`` and ``fade_out`` (in bars).
+    """
+    path = Path(arrangement_file)
+    with open(path) as f:
+        arrangement = Arrangement.from_dict(json.load(f), base_dir=path.parent)
+    if start_bar and start_bar >= arrangement.bars:
+        raise click.BadParameter(
+            f"the arrangement has {arrangement.bars} bars", param_hint="--start-bar"
+        )
+
+    minutes, seconds = divmod(arrangement.duration_ns / 1e9, 60)
+    click.echo(
+        f"{len(arrangement.sections)} sections, {arrangement.bars} bars, "
+        f"{int(minutes)}:{seconds:04.1f}"
+    )
+
+    if midi_out:
+        MIDIConverter(arrangement.ppqn).write_arrangement(
+            arrangement, midi_out, start_bar
+        )
+        click.echo(f"Arrangement exported to {midi_out}")
+
+    if wav_out:
+        if not samples:
+            raise click.UsageError("--wav-out needs --samples")
+        renderer = OfflineRenderer(ppqn=arrangement.ppqn, sample_cache=default_cache())
+        renderer.load_sound_bank(Path(samples))
+        renderer.write_arrangement(arrangement, wav_out, start_bar)
+        click.echo(f"Arrangement rendered to {wav_out}")
+
+    if play:
+        player = create_player(audio, samples, device, clock)
+        if player is None:
+            return
+        try:
+            player.play_arrangement(arrangement, start_bar)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            player.close()
@@ -0,0 +1,89 @@
+import asyncio
+import click
+import json
+from pathlib import Path
+from ..batch import generate_batch
+from .utils import (
+    cache_options,
+    create_composer,
+    get_versioned_filename,
+    library_option,
+    record_in_library,
+    save_composition,
+)
+
+
+def read_prompts(prompts_file: str) -> list[str]:
+    """One prompt per line; blank lines and # comments are skipped"""
+    with open(prompts_file) as f:
+        lines = (line.strip() for line in f)
+        return [line for line in lines if line and not line.startswith("#")]
+
+
+@click.command("generate-batch")
+@click.argument("prompts_file", type=click.Path(exists=True))
+@click.argument("output_dir", type=click.Path(file_okay=False))
+@click.option(
+    "--concurrency",
+    default=4,
+    type=click.IntRange(min=1),
+    help="Maximum API requests in flight",
+)
+@click.option(
+    "--retries", default=5, type=click.IntRange(min=0), help="Retries on rate limits"
+)
+@click.option(
+    "--jsonl",
+    type=click.Path(dir_okay=False),
+    help="Also append every result to this JSONL file",
+)
+@library_option
+@cache_options
+def generate_batch_cmd(
+    prompts_file, output_dir, concurrency, retries, jsonl, library, cache, offline
+):
+    """Generate a pattern for every prompt in a file"""
+    prompts = read_prompts(prompts_file)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    composer = create_composer(cache, offline)
+
+    jsonl_file = open(jsonl, "a") if jsonl else None
+
+    def on_result(result):
+        record = {"index": result.index, "prompt": result.prompt}
+        if result.ok:
+            output_path = get_versioned_filename(
+                output_dir / f"pattern_{result.index:04d}.json"
+            )
+            save_composition(result.composition, output_path)
+            if library:
+                record["library_id"] = record_in_library(
+                    result.composition, output_path, result.prompt
+                ).id
+            record["file"] = str(output_path)
+            record["composition"] = result.composition.to_dict()
+            click.echo(f"[{result.index}] saved to {output_path}")
+        else:
+            record["error"] = result.error
+            click.echo(f"[{result.index}] failed: {result.error}", err=True)
+        if jsonl_file:
+            jsonl_file.write(json.dumps(record) + "\n")
+            jsonl_file.flush()
+
+    try:
+        results = asyncio.run(
+            generate_batch(
+                composer,
+                prompts,
+                concurrency=concurrency,
+                max_retries=retries,
+                on_result=on_result,
+            )
+        )
+    finally:
+        if jsonl_file:
+            jsonl_file.close()
+
+    failed = sum(1 for result in results if not result.ok)
+    click.echo(f"Generated {len(results) - failed}/{len(results)} patterns")
@@ -0,0 +1,92 @@
+import click
+from pathlib import Path
+from ..benchmark import (
+    QUICK_SIZES,
+    SIZES,
+    compare,
+    environment,
+    load_baseline,
+    run_benchmarks,
+    save_baseline,
+)
+
+
+def format_seconds(seconds: float) -> str:
+    if seconds >= 1:
+        return f"{seconds:.2f}s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds * 1e6:.1f}us"
+
+
+@click.command()
+@click.option(
+    "--only",
+    multiple=True,
+    help="Run benchmarks whose names start with this (e.g. parse, render/large)",
+)
+@click.option("--quick", is_flag=True, help="Skip the largest sizes")
+@click.option(
+    "--min-time",
+    default=0.2,
+    type=click.FloatRange(min=0),
+    help="Minimum seconds to spend timing each benchmark",
+)
+@click.option(
+    "--baseline",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Baseline to compare against; exits non-zero on regressions",
+)
+@click.option(
+    "--threshold",
+    default=0.25,
+    type=click.FloatRange(min=0),
+    help="Slowdown relative to the baseline that counts as a regression",
+)
+@click.option(
+    "--save",
+    type=click.Path(dir_okay=False),
+    help="Store the results as a baseline",
+)
+def benchmark(only, quick, min_time, baseline, threshold, save):
+    """Time parsing, compiling, export, rendering, scheduling and the composer"""
+    sizes = QUICK_SIZES if quick else tuple(SIZES)
+    for name in sizes:
+        patterns, divisions, bars = SIZES[name]
+        click.echo(f"{name}: {patterns} patterns x {divisions} divisions x {bars} bars")
+
+    def on_result(result):
+        click.echo(
+            f"{result.name:<20} {format_seconds(result.seconds):>10} "
+            f"({result.runs} runs)"
+        )
+
+    results = run_benchmarks(sizes, only, min_time=min_time, on_result=on_result)
+
+    if save:
+        save_baseline(results, Path(save))
+        click.echo(f"Baseline saved to {save}")
+
+    if baseline:
+        stored = load_baseline(Path(baseline))
+        if stored.get("environment") != environment():
+            click.echo(
+                "Warning: the baseline was recorded in a different environment",
+                err=True,
+            )
+        comparisons = compare(results, stored, threshold)
+        click.echo(f"\nCompared with {baseline} (threshold {threshold:.0%}):")
+        for comparison in comparisons:
+            if comparison.baseline is None:
+                status = "new"
+            else:
+                status = f"{comparison.change:+.1%}"
+                if comparison.regressed:
+                    status += "  REGRESSION"
+            click.echo(
+                f"{comparison.name:<20} {format_seconds(comparison.seconds):>10}  "
+                f"{status}"
+            )
+        regressions = sum(comparison.regressed for comparison in comparisons)
+        if regressions:
+            raise click.ClickException(f"{regressions} benchmarks regressed")
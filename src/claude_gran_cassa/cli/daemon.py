@@ -0,0 +1,173 @@
+import click
+from pathlib import Path
+from ..config import config
+from ..daemon import PlaybackDaemon, load_composition, send
+from .play import create_player
+from .utils import (
+    cache_options,
+    create_composer,
+    get_versioned_filename,
+    library_option,
+    record_in_library,
+)
+
+
+def request(ctx, command: str, **args) -> dict:
+    try:
+        return send(ctx.obj, command, **args)
+    except ConnectionError as e:
+        raise click.ClickException(f"{e} (start one with `daemon start`)")
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+
+@click.group()
+@click.option(
+    "--socket",
+    type=click.Path(dir_okay=False),
+    help="Daemon socket (default: $GRAN_CASSA_SOCKET or the runtime directory)",
+)
+@click.pass_context
+def daemon(ctx, socket):
+    """Warm playback daemon: iterate on a groove without restarting playback"""
+    ctx.obj = Path(socket) if socket else config.socket_path
+
+
+@daemon.command()
+@click.option(
+    "--audio/--midi", default=False, help="Use audio playback instead of MIDI"
+)
+@click.option(
+    "--samples",
+    type=click.Path(exists=True),
+    help="Sound bank configuration for audio playback",
+)
+@click.option("--device", type=int, help="MIDI output device id (see list-devices)")
+@click.option(
+    "--clock/--no-clock",
+    default=False,
+    help="Send MIDI clock and start/stop so hardware follows the tempo",
+)
+@cache_options
+@click.pass_context
+def start(ctx, audio, samples, device, clock, cache, offline):
+    """Run the daemon in the foreground until shutdown or Ctrl+C"""
+    player = create_player(audio, samples, device, clock)
+    if player is None:
+        return
+    server = PlaybackDaemon(
+        player, ctx.obj, composer_factory=lambda: create_composer(cache, offline)
+    )
+    click.echo(f"Listening on {ctx.obj}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+
+@daemon.command()
+@click.argument("input_file", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--watch/--no-watch", default=True, help="Reload the file whenever it changes"
+)
+@click.option(
+    "--at-bar/--at-loop",
+    default=True,
+    help="Swap at the next bar line or the end of the current loop",
+)
+@click.pass_context
+def play(ctx, input_file, watch, at_bar):
+    """Play a pattern file, replacing what is playing"""
+    reply = request(
+        ctx, "play", file=str(Path(input_file).resolve()), watch=watch, at_bar=at_bar
+    )
+    click.echo(f"Playing {reply['file']}" + (" (watching)" if watch else ""))
+
+
+@daemon.command()
+@click.argument("prompt")
+@click.argument("output", type=click.Path(dir_okay=False))
+@click.option("--version/--no-version", default=True, help="Enable filename versioning")
+@library_option
+@click.pass_context
+def generate(ctx, prompt, output, version, library):
+    """Generate a pattern with the daemon's client and play it at the next bar"""
+    output_path = Path(output)
+    if version:
+        output_path = get_versioned_filename(output_path)
+    reply = request(ctx, "generate", prompt=prompt, output=str(output_path.resolve()))
+    click.echo(f"Generated pattern saved to {reply['file']}, playing")
+    if library:
+        record_in_library(load_composition(output_path), output_path, prompt)
+
+
+@daemon.command()
+@click.argument("input_file", type=click.Path(exists=True, dir_okay=False))
+@click.argument("prompt")
+@click.argument("output", type=click.Path(dir_okay=False))
+@click.option("--version/--no-version", default=True, help="Enable filename versioning")
+@click.option("--delta/--no-delta", default=False, help="Request a JSON Patch")
+@library_option
+@click.pass_context
+def evolve(ctx, input_file, prompt, output, version, delta, library):
+    """Evolve a pattern with the daemon's client and play it at the next bar"""
+    output_path = Path(output)
+    if version:
+        output_path = get_versioned_filename(output_path)
+    reply = request(
+        ctx,
+        "evolve",
+        file=str(Path(input_file).resolve()),
+        prompt=prompt,
+        output=str(output_path.resolve()),
+        delta=delta,
+    )
+    click.echo(f"Evolved pattern saved to {reply['file']}, playing")
+    if library:
+        record_in_library(
+            load_composition(output_path),
+            output_path,
+            prompt,
+            parent_path=Path(input_file),
+        )
+
+
+@daemon.command()
+@click.argument("config_file", type=click.Path(exists=True, dir_okay=False))
+@click.pass_context
+def samples(ctx, config_file):
+    """Load a different sound bank into an audio daemon"""
+    request(ctx, "samples", file=str(Path(config_file).resolve()))
+    click.echo(f"Sound bank loaded from {config_file}")
+
+
+@daemon.command()
+@click.pass_context
+def stop(ctx):
+    """Stop playback, keeping the daemon running"""
+    request(ctx, "stop")
+
+
+@daemon.command()
+@click.pass_context
+def status(ctx):
+    """Show what the daemon is playing and watching"""
+    reply = request(ctx, "status")
+    click.echo(f"Playing: {reply['file'] if reply['playing'] else 'nothing'}")
+    for path in reply["watching"]:
+        click.echo(f"Watching: {path}")
+    if reply["lateness"]:
+        click.echo(f"Lateness: {reply['lateness']}")
+    if reply["clock"]:
+        click.echo(f"Clock: {reply['clock']}")
+    if reply["last_error"]:
+        click.echo(f"Last reload failed: {reply['last_error']}", err=True)
+
+
+@daemon.command()
+@click.pass_context
+def shutdown(ctx):
+    """Stop playback and exit the daemon"""
+    request(ctx, "shutdown")
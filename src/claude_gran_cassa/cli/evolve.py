@@ -1,11 +1,18 @@
 import click
 import json
 from pathlib import Path
-from ..composer import Composer
-from ..config import config
+from ..genetic import FITNESS, GeneticEngine
 from ..models import Composition
-from .play import play_pattern
-from .utils import get_versioned_filename
+from ..prefetch import EvolutionPrefetcher, variations
+from .play import create_player, play_pattern
+from .utils import (
+    cache_options,
+    create_composer,
+    get_versioned_filename,
+    library_option,
+    record_in_library,
+    save_composition,
+)
 
 
 @click.command()
@@ -21,22 +28,182 @@ from .utils import get_versioned_filename
     type=click.Path(),
     help="Sound bank configuration for audio playback",
 )
+@click.option("--device", type=int, help="MIDI output device id (see list-devices)")
 @click.option("--version/--no-version", default=True, help="Enable filename versioning")
-def evolve(input_file, prompt, output, play, audio, samples, version):
+@click.option(
+    "--delta/--full",
+    default=False,
+    help="Ask only for a patch of the changes instead of the whole composition",
+)
+@click.option(
+    "--local",
+    is_flag=True,
+    default=False,
+    help="Evolve with the local genetic engine instead of the API",
+)
+@click.option(
+    "--fitness",
+    type=click.Choice(sorted(FITNESS)),
+    default="similar",
+    help="What the local engine selects for",
+)
+@click.option("--generations", default=50, type=click.IntRange(min=1))
+@click.option("--population", default=256, type=click.IntRange(min=2))
+@click.option(
+    "--top", default=1, type=click.IntRange(min=1), help="Local variants to save"
+)
+@click.option("--min-density", default=0.0, type=click.FloatRange(0, 1))
+@click.option("--max-density", default=1.0, type=click.FloatRange(0, 1))
+@click.option("--seed", type=int, help="Random seed for reproducible local runs")
+@click.option(
+    "--interactive",
+    is_flag=True,
+    default=False,
+    help="Keep playing and ask for the next prompt after each evolution",
+)
+@click.option(
+    "--prefetch",
+    default=3,
+    type=click.IntRange(min=0),
+    help="Evolutions to request ahead of time while playing (interactive)",
+)
+@click.option(
+    "--prefetch-prompts",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Prompts to prefetch, one per line (default: variations of the last)",
+)
+@click.option(
+    "--prefetch-workers",
+    default=2,
+    type=click.IntRange(min=1),
+    help="Most prefetch requests in flight at once",
+)
+@library_option
+@cache_options
+def evolve(
+    input_file,
+    prompt,
+    output,
+    play,
+    audio,
+    samples,
+    device,
+    version,
+    delta,
+    local,
+    fitness,
+    generations,
+    population,
+    top,
+    min_density,
+    max_density,
+    seed,
+    interactive,
+    prefetch,
+    prefetch_prompts,
+    prefetch_workers,
+    library,
+    cache,
+    offline,
+):
     """Evolve an existing pattern"""
+    if interactive and local:
+        raise click.UsageError("--interactive evolves through the API, not --local")
     with open(input_file) as f:
         original = Composition.from_dict(json.load(f))
 
-    composer = Composer(api_key=config.api_key)
-    evolved = composer.evolve_pattern(original, prompt)
+    if local:
+        engine = GeneticEngine(
+            FITNESS[fitness](),
+            population_size=population,
+            min_density=min_density,
+            max_density=max_density,
+            seed=seed,
+        )
+        candidates = engine.run(original, generations=generations, k=top)
+        variants = [candidate.composition for candidate in candidates]
+        prompt = f"local:{fitness} {prompt}"
+    else:
+        composer = create_composer(cache, offline)
+        variants = [composer.evolve_pattern(original, prompt, delta=delta)]
+
+    saved = []
+    for rank, evolved in enumerate(variants):
+        output_path = Path(output)
+        if version or rank > 0:
+            output_path = get_versioned_filename(output_path)
+
+        save_composition(evolved, output_path)
+        saved.append(output_path)
+        click.echo(f"Evolved pattern saved to {output_path}")
+
+        if library:
+            record_in_library(
+                evolved, output_path, prompt, parent_path=Path(input_file)
+            )
+
+    if interactive:
+        candidates = None
+        if prefetch_prompts:
+            with open(prefetch_prompts) as f:
+                candidates = [line.strip() for line in f if line.strip()]
+        prefetcher = EvolutionPrefetcher(composer, prefetch_workers, prefetch)
+        evolve_interactively(
+            prefetcher,
+            variants[0],
+            prompt,
+            saved[0],
+            Path(output),
+            candidates,
+            delta,
+            library,
+            create_player(audio, samples, device) if play else None,
+        )
+    elif play:
+        play_pattern(variants[0], audio, samples, device=device)
 
-    output_path = Path(output)
-    if version:
-        output_path = get_versioned_filename(output_path)
 
-    with open(output_path, "w") as f:
-        json.dump(evolved.to_dict(), f, indent=2)
-    click.echo(f"Evolved pattern saved to {output_path}")
+def evolve_interactively(
+    prefetcher,
+    composition,
+    prompt,
+    parent_path,
+    output,
+    candidates,
+    delta,
+    library,
+    player,
+):
+    """Loop the latest evolution while asking for the next prompt. The
+    likely next prompts are evolved in the background meanwhile, so picking
+    one of them is served without waiting for the API."""
+    if player is not None:
+        player.start(composition, loop=True)
+    try:
+        while True:
+            prefetcher.speculate(composition, candidates or variations(prompt), delta)
+            prompt = click.prompt(
+                "Next evolution (blank to stop)", default="", show_default=False
+            )
+            if not prompt:
+                break
 
-    if play:
-        play_pattern(evolved, audio, samples)
+            hits = prefetcher.hits
+            composition = prefetcher.evolve(composition, prompt, delta)
+            output_path = get_versioned_filename(output)
+            save_composition(composition, output_path)
+            source = "prefetched" if prefetcher.hits > hits else "requested"
+            click.echo(f"Evolved pattern saved to {output_path} ({source})")
+            if library:
+                record_in_library(
+                    composition, output_path, prompt, parent_path=parent_path
+                )
+            parent_path = output_path
+            if player is not None:
+                player.queue(composition, at_bar=True)
+    except (KeyboardInterrupt, click.Abort):
+        pass
+    finally:
+        prefetcher.close()
+        if player is not None:
+            player.close()
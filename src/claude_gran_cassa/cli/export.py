@@ -0,0 +1,78 @@
+import click
+import os
+import time
+from pathlib import Path
+from ..audio.cache import default_cache
+from ..audio.render import OfflineRenderer
+from ..export import ExportJob, export_bulk, find_patterns
+
+
+@click.command("export-bulk")
+@click.argument("inputs", nargs=-1, required=True, type=click.Path(exists=True))
+@click.option(
+    "--output-dir",
+    "-o",
+    required=True,
+    type=click.Path(file_okay=False),
+    help="Directory to write exports to, mirroring the input layout",
+)
+@click.option("--midi/--no-midi", default=True, help="Export Standard MIDI Files")
+@click.option("--audio/--no-audio", default=False, help="Render WAV files")
+@click.option(
+    "--samples",
+    type=click.Path(exists=True),
+    help="Sound bank configuration for audio export",
+)
+@click.option(
+    "--loops", default=1, type=click.IntRange(min=1), help="Number of loops to export"
+)
+@click.option(
+    "--split-tracks/--single-track",
+    default=True,
+    help="One MIDI track per pattern",
+)
+@click.option(
+    "--workers",
+    default=os.cpu_count(),
+    type=click.IntRange(min=1),
+    help="Worker processes",
+)
+def export_bulk_cmd(
+    inputs, output_dir, midi, audio, samples, loops, split_tracks, workers
+):
+    """Export pattern files and directories to MIDI and WAV in parallel"""
+    if audio and not samples:
+        raise click.UsageError("--audio needs --samples")
+    if not (midi or audio):
+        raise click.UsageError("Nothing to export: enable --midi or --audio")
+
+    items = find_patterns(Path(path) for path in inputs)
+    job = ExportJob(
+        output_dir=Path(output_dir),
+        midi=midi,
+        audio=audio,
+        loops=loops,
+        split_tracks=split_tracks,
+    )
+
+    bank = None
+    if audio:
+        # Decode once here; workers share it instead of loading their own
+        renderer = OfflineRenderer(sample_cache=default_cache())
+        renderer.load_sound_bank(Path(samples))
+        bank = renderer.samples
+
+    def on_result(result):
+        if not result.ok:
+            click.echo(f"{result.source}: {result.error}", err=True)
+
+    start = time.perf_counter()
+    results = export_bulk(items, job, bank, workers=workers, on_result=on_result)
+    elapsed = time.perf_counter() - start
+
+    failed = sum(1 for result in results if not result.ok)
+    click.echo(
+        f"Exported {len(results) - failed}/{len(results)} patterns in "
+        f"{elapsed:.2f}s ({len(results) / max(elapsed, 1e-9):.1f} patterns/s, "
+        f"{workers} workers)"
+    )
@@ -1,10 +1,15 @@
 import click
-import json
 from pathlib import Path
-from ..composer import Composer
-from ..config import config
-from .play import play_pattern
-from .utils import get_versioned_filename
+from ..models import Composition
+from .play import create_player, play_pattern
+from .utils import (
+    cache_options,
+    create_composer,
+    get_versioned_filename,
+    library_option,
+    record_in_library,
+    save_composition,
+)
 
 
 @click.command()
@@ -19,19 +24,73 @@ from .utils import get_versioned_filename
     type=click.Path(),
     help="Sound bank configuration for audio playback",
 )
+@click.option("--device", type=int, help="MIDI output device id (see list-devices)")
 @click.option("--version/--no-version", default=True, help="Enable filename versioning")
-def generate(prompt, output, play, audio, samples, version):
+@click.option(
+    "--stream/--no-stream",
+    default=False,
+    help="Stream the response and start playing as soon as the first pattern arrives",
+)
+@library_option
+@cache_options
+def generate(
+    prompt,
+    output,
+    play,
+    audio,
+    samples,
+    device,
+    version,
+    stream,
+    library,
+    cache,
+    offline,
+):
     """Generate a new pattern from a prompt"""
-    composer = Composer(api_key=config.api_key)
-    composition = composer.generate_pattern(prompt)
+    composer = create_composer(cache, offline)
+
+    def save(composition: Composition):
+        output_path = Path(output)
+        if version:
+            output_path = get_versioned_filename(output_path)
+
+        save_composition(composition, output_path)
+        click.echo(f"Generated pattern saved to {output_path}")
 
-    output_path = Path(output)
-    if version:
-        output_path = get_versioned_filename(output_path)
+        if library:
+            record_in_library(composition, output_path, prompt)
 
-    with open(output_path, "w") as f:
-        json.dump(composition.to_dict(), f, indent=2)
-    click.echo(f"Generated pattern saved to {output_path}")
+    if stream:
+        stream_and_play(composer, prompt, save, play, audio, samples, device)
+        return
+
+    composition = composer.generate_pattern(prompt)
+    save(composition)
 
     if play:
-        play_pattern(composition, audio, samples)
+        play_pattern(composition, audio, samples, device=device)
+
+
+def stream_and_play(composer, prompt, save, play, audio, samples, device):
+    """Loop the patterns received so far while the rest are still arriving"""
+    player = create_player(audio, samples, device) if play else None
+    try:
+        for composition in composer.stream_pattern(prompt):
+            if player is None:
+                continue
+            if player.scheduler.running:
+                player.queue(composition)  # Picked up at the next loop boundary
+            else:
+                player.start(composition, loop=True)
+
+        save(composition)
+
+        if player is not None:
+            # Play the complete composition through once, then stop
+            player.finish()
+            player.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if player is not None:
+            player.close()
@@ -0,0 +1,68 @@
+import click
+import os
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from ..config import config
+from ..ingest import find_midi_files, ingest_bulk
+from ..library import PatternLibrary
+from .utils import library_option, save_composition
+
+
+@click.command("import")
+@click.argument("inputs", nargs=-1, required=True, type=click.Path(exists=True))
+@click.option(
+    "--output-dir",
+    "-o",
+    required=True,
+    type=click.Path(file_okay=False),
+    help="Directory to write pattern files to, mirroring the input layout",
+)
+@click.option(
+    "--bars",
+    default=4,
+    type=click.IntRange(min=1),
+    help="Bars per imported loop; longer files become several patterns",
+)
+@click.option(
+    "--workers",
+    default=os.cpu_count(),
+    type=click.IntRange(min=1),
+    help="Worker processes",
+)
+@library_option
+def import_cmd(inputs, output_dir, bars, workers, library):
+    """Import MIDI files and directories as pattern files in parallel"""
+    try:
+        items = find_midi_files(Path(path) for path in inputs)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    output_dir = Path(output_dir)
+    written = 0
+
+    with PatternLibrary(config.library_path) if library else nullcontext() as db:
+
+        def on_result(result):
+            nonlocal written
+            if not result.ok:
+                click.echo(f"{result.source}: {result.error}", err=True)
+                return
+            target = output_dir / result.relative
+            target.parent.mkdir(parents=True, exist_ok=True)
+            prompt = f"import: {result.source}"
+            for number, composition in enumerate(result.compositions, 1):
+                output_path = target.with_name(f"{target.stem}_{number:03d}.json")
+                save_composition(composition, output_path)
+                if db is not None:
+                    db.add(composition, target.stem, prompt=prompt, path=output_path)
+                written += 1
+
+        start = time.perf_counter()
+        results = ingest_bulk(items, bars, workers=workers, on_result=on_result)
+        elapsed = time.perf_counter() - start
+
+    failed = sum(1 for result in results if not result.ok)
+    click.echo(
+        f"Imported {len(results) - failed}/{len(results)} files as {written} "
+        f"patterns in {elapsed:.2f}s ({workers} workers)"
+    )
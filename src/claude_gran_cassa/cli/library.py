@@ -0,0 +1,69 @@
+import click
+from ..config import config
+from ..library import LibraryEntry, PatternLibrary
+
+
+def describe(entry: LibraryEntry) -> str:
+    names = ", ".join(pattern.name for pattern in entry.composition.patterns)
+    return f"#{entry.id} {entry.name} v{entry.version} {entry.bpm} BPM [{names}]"
+
+
+@click.group()
+def library():
+    """Search generated patterns and their lineage"""
+
+
+@library.command()
+@click.option("--bpm-min", type=int, help="Minimum tempo")
+@click.option("--bpm-max", type=int, help="Maximum tempo")
+@click.option("--name", help="Library name (output file stem)")
+@click.option("--note", type=int, help="Contains a pattern on this MIDI note")
+@click.option("--channel", type=int, help="Contains a pattern on this MIDI channel")
+@click.option("--pattern", help="Contains a pattern whose name includes this text")
+@click.option("--triplet/--no-triplet", default=None, help="Triplet patterns only")
+@click.option("--min-density", type=float, help="Minimum fraction of steps hit")
+@click.option("--max-density", type=float, help="Maximum fraction of steps hit")
+@click.option("--limit", type=click.IntRange(min=1), help="Maximum results")
+def query(
+    bpm_min,
+    bpm_max,
+    name,
+    note,
+    channel,
+    pattern,
+    triplet,
+    min_density,
+    max_density,
+    limit,
+):
+    """Find stored compositions, e.g. --bpm-min 140 --triplet --pattern hihat"""
+    with PatternLibrary(config.library_path) as lib:
+        entries = lib.query(
+            bpm_min=bpm_min,
+            bpm_max=bpm_max,
+            name=name,
+            note=note,
+            channel=channel,
+            pattern_name=pattern,
+            triplet=triplet,
+            min_density=min_density,
+            max_density=max_density,
+            limit=limit,
+        )
+    for entry in entries:
+        click.echo(f"{describe(entry)} {entry.path or ''}".rstrip())
+    if not entries:
+        click.echo("No matching compositions")
+
+
+@library.command()
+@click.argument("entry_id", type=int)
+def lineage(entry_id):
+    """Show a composition and the evolutions it descends from"""
+    with PatternLibrary(config.library_path) as lib:
+        entries = lib.lineage(entry_id)
+    if not entries:
+        raise click.ClickException(f"No library entry #{entry_id}")
+    for depth, entry in enumerate(entries):
+        prompt = f" <- {entry.prompt!r}" if entry.prompt else ""
+        click.echo(f"{'  ' * depth}{describe(entry)}{prompt}")
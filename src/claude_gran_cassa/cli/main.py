@@ -1,18 +1,143 @@
 import click
-import pygame.midi
+import cProfile
+import importlib
+from pathlib import Path
+from ..tracing import tracer
 
+# Subcommands by name: (module in this package, command object, short help).
+# Each is imported only when it runs, so a command pays only for its own
+# imports, and the short help lets --help list them without importing any.
+COMMANDS = {
+    "arrange": ("arrange", "arrange", "Play or export an arrangement of patterns."),
+    "benchmark": (
+        "benchmark",
+        "benchmark",
+        "Time parsing, compiling, export, rendering, scheduling and the composer",
+    ),
+    "daemon": (
+        "daemon",
+        "daemon",
+        "Warm playback daemon: iterate on a groove without restarting playback",
+    ),
+    "evolve": ("evolve", "evolve", "Evolve an existing pattern"),
+    "export-bulk": (
+        "export",
+        "export_bulk_cmd",
+        "Export pattern files and directories to MIDI and WAV in parallel",
+    ),
+    "generate": ("generate", "generate", "Generate a new pattern from a prompt"),
+    "generate-batch": (
+        "batch",
+        "generate_batch_cmd",
+        "Generate a pattern for every prompt in a file",
+    ),
+    "import": (
+        "ingest",
+        "import_cmd",
+        "Import MIDI files and directories as pattern files in parallel",
+    ),
+    "library": ("library", "library", "Search generated patterns and their lineage"),
+    "play": ("play", "play", "Play a pattern from a file"),
+    "render": (
+        "render",
+        "render",
+        "Render a pattern to a WAV file without audio hardware",
+    ),
+    "similar": (
+        "similar",
+        "similar",
+        "Find library compositions with a similar rhythm",
+    ),
+}
 
-@click.group()
-@click.option("--debug/--no-debug", default=False, help="Enable debug output")
-def cli(debug):
+
+class LazyGroup(click.Group):
+    """A group that imports subcommand modules on first use"""
+
+    def __init__(self, *args, lazy_commands: dict = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = lazy_commands or {}
+
+    def list_commands(self, ctx):
+        return sorted({*super().list_commands(ctx), *self.lazy_commands})
+
+    def get_command(self, ctx, name):
+        if name not in self.commands and name in self.lazy_commands:
+            module, attribute, _ = self.lazy_commands[name]
+            module = importlib.import_module(f".{module}", __package__)
+            self.add_command(getattr(module, attribute), name)
+        return super().get_command(ctx, name)
+
+    def format_commands(self, ctx, formatter):
+        """List commands with their stored short help, importing none"""
+        names = self.list_commands(ctx)
+        limit = formatter.width - 6 - max(map(len, names), default=0)
+        rows = []
+        for name in names:
+            if name in self.commands:
+                command = self.commands[name]
+                if not command.hidden:
+                    rows.append((name, command.get_short_help_str(limit)))
+            else:
+                # A bare stand-in shortens the help exactly as click would
+                stand_in = click.Command(name, help=self.lazy_commands[name][2])
+                rows.append((name, stand_in.get_short_help_str(limit)))
+        if rows:
+            with formatter.section("Commands"):
+                formatter.write_dl(rows)
+
+
+@click.group(cls=LazyGroup, lazy_commands=COMMANDS)
+@click.option(
+    "--debug/--no-debug",
+    default=False,
+    help="Time each stage of the run and print a summary at exit",
+)
+@click.option(
+    "--trace",
+    type=click.Path(dir_okay=False),
+    help="Write the timed spans as a Chrome trace (chrome://tracing, Perfetto)",
+)
+@click.option(
+    "--profile",
+    type=click.Path(dir_okay=False),
+    help="Write cProfile statistics of the run (read with python -m pstats)",
+)
+@click.pass_context
+def cli(ctx, debug, trace, profile):
     """Claude Gran Cassa Pattern Generator CLI"""
-    if debug:
-        click.echo("Debug mode enabled")
+    if profile:
+        profiler = cProfile.Profile()
+
+        def dump_profile():
+            profiler.disable()
+            profiler.dump_stats(profile)
+            click.echo(f"Profile written to {profile}", err=True)
+
+        ctx.call_on_close(dump_profile)
+        profiler.enable()
+
+    if debug or trace:
+        click.echo("Debug mode enabled", err=True)
+        tracer.enable()
+
+        def report():
+            if debug:
+                click.echo(tracer.summary(), err=True)
+            if trace:
+                tracer.write(Path(trace))
+                click.echo(f"Trace written to {trace}", err=True)
+
+        # Closed in reverse order: the command span ends before the report
+        ctx.call_on_close(report)
+        ctx.with_resource(tracer.span("command", command=ctx.invoked_subcommand))
 
 
 @cli.command()
 def list_devices():
     """List available MIDI output devices"""
+    import pygame.midi
+
     pygame.midi.init()
     for i in range(pygame.midi.get_count()):
         info = pygame.midi.get_device_info(i)
@@ -22,14 +147,6 @@ def list_devices():
 
 
 def main():
-    from .generate import generate
-    from .evolve import evolve
-    from .play import play
-
-    cli.add_command(generate)
-    cli.add_command(evolve)
-    cli.add_command(play)
-    cli.add_command(list_devices)
     cli()
 
 
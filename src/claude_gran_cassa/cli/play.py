@@ -1,11 +1,10 @@
 import click
 import json
-import pygame.midi
-import tempfile
 from pathlib import Path
+from typing import Optional
 from ..models import Composition
-from ..midi import MIDIConverter
-from ..audio.engine import AudioEngine
+from ..midi import MIDIPlayer
+from ..playback import Player
 
 
 @click.command()
@@ -18,40 +17,78 @@ from ..audio.engine import AudioEngine
     type=click.Path(),
     help="Sound bank configuration for audio playback",
 )
+@click.option("--device", type=int, help="MIDI output device id (see list-devices)")
 @click.option("--loop/--no-loop", default=False, help="Loop playback")
-def play(input_file, audio, samples, loop):
+@click.option(
+    "--clock/--no-clock",
+    default=False,
+    help="Send MIDI clock and start/stop so hardware follows the tempo",
+)
+@click.option(
+    "--stats/--no-stats",
+    default=False,
+    help="Report scheduling lateness after playback",
+)
+def play(input_file, audio, samples, device, loop, clock, stats):
     """Play a pattern from a file"""
     with open(input_file) as f:
         composition = Composition.from_dict(json.load(f))
 
-    click.echo("Press Ctrl+C to stop looping")
-    while True:
-        play_pattern(composition, audio, samples)
-        if not loop:
-            break
+    if loop:
+        click.echo("Press Ctrl+C to stop looping")
+    play_pattern(composition, audio, samples, stats, loop, device, clock)
 
 
-def play_pattern(composition: Composition, use_audio: bool, samples: str):
-    """Play a pattern using either MIDI or audio"""
+def create_player(
+    use_audio: bool, samples: str, device: Optional[int] = None, clock: bool = False
+) -> Optional[Player]:
+    """Create a MIDI or audio player, or report why it can't be created"""
+    if use_audio and clock:
+        raise click.UsageError("--clock sends MIDI clock, so it needs --midi playback")
     if use_audio:
         if not samples:
             click.echo("Error: Sound configuration required for audio playback")
-            return
+            return None
+
+        from ..audio.engine import AudioEngine  # Pulls in pygame's mixer
 
         engine = AudioEngine()
         engine.load_sound_bank(Path(samples))
-        engine.play_pattern(composition)
-    else:
-        converter = MIDIConverter()
-        with tempfile.NamedTemporaryFile(suffix=".mid", delete=False) as tmp:
-            converter.convert(composition, tmp.name)
-
-            pygame.midi.init()
-            player = pygame.midi.Output(pygame.midi.get_default_output_device_id())
-
-            try:
-                # TODO: MIDI playback implementation
-                pass
-            finally:
-                player.close()
-                pygame.midi.quit()
+        return engine
+
+    from pygame.midi import MidiException  # MIDIPlayer loads pygame anyway
+
+    try:
+        return MIDIPlayer(device_id=device, send_clock=clock)
+    except ValueError as e:
+        click.echo(f"Error: {e}")
+        return None
+    except MidiException as e:
+        raise click.ClickException(f"Can't open MIDI output {device}: {e}")
+
+
+def play_pattern(
+    composition: Composition,
+    use_audio: bool,
+    samples: str,
+    stats: bool = False,
+    loop: bool = False,
+    device: Optional[int] = None,
+    clock: bool = False,
+):
+    """Play a pattern using either MIDI or audio"""
+    # One player for the whole session: loops are scheduled back to back
+    player = create_player(use_audio, samples, device, clock)
+    if player is None:
+        return
+
+    try:
+        player.play(composition, loop=loop)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        player.close()
+    if stats:
+        click.echo(player.scheduler.stats.summary())
+        if clock and hasattr(player, "clock_stats"):
+            click.echo(player.clock_stats.summary())
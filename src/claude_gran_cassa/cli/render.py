@@ -0,0 +1,45 @@
+import click
+import json
+import time
+from pathlib import Path
+from ..models import Composition
+from ..audio.cache import default_cache
+from ..audio.render import OfflineRenderer
+from .utils import get_versioned_filename
+
+
+@click.command()
+@click.argument("input_file", type=click.Path(exists=True))
+@click.argument("output", type=click.Path())
+@click.option(
+    "--samples",
+    type=click.Path(exists=True),
+    required=True,
+    help="Sound bank configuration for rendering",
+)
+@click.option(
+    "--loops", default=1, type=click.IntRange(min=1), help="Number of loops to render"
+)
+@click.option("--version/--no-version", default=True, help="Enable filename versioning")
+def render(input_file, output, samples, loops, version):
+    """Render a pattern to a WAV file without audio hardware"""
+    with open(input_file) as f:
+        composition = Composition.from_dict(json.load(f))
+
+    renderer = OfflineRenderer(sample_cache=default_cache())
+    renderer.load_sound_bank(Path(samples))
+
+    start = time.perf_counter()
+    buffer = renderer.render(composition, loops=loops)
+    elapsed = time.perf_counter() - start
+
+    output_path = Path(output)
+    if version:
+        output_path = get_versioned_filename(output_path)
+    renderer.write_wav(buffer, output_path)
+
+    duration = len(buffer) / renderer.sample_rate
+    click.echo(
+        f"Rendered {duration:.2f}s of audio to {output_path} "
+        f"({duration / max(elapsed, 1e-9):.0f}x realtime)"
+    )
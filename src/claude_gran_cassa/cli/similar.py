@@ -0,0 +1,52 @@
+import click
+import json
+from ..config import config
+from ..library import PatternLibrary
+from ..models import Composition
+from ..similarity import SimilarityIndex
+from .library import describe
+
+
+@click.command()
+@click.argument("input_file", type=click.Path(exists=True), required=False)
+@click.option("--id", "entry_id", type=int, help="Search from a library entry")
+@click.option("--limit", default=5, type=click.IntRange(min=1), help="Results")
+@click.option(
+    "--metric",
+    type=click.Choice(["cosine", "hamming"]),
+    default="cosine",
+    help="Velocity-weighted cosine or onset-only Hamming similarity",
+)
+@click.option(
+    "--duplicates",
+    type=click.FloatRange(0, 1),
+    help="List library entry pairs at least this similar instead",
+)
+def similar(input_file, entry_id, limit, metric, duplicates):
+    """Find library compositions with a similar rhythm"""
+    with PatternLibrary(config.library_path) as library:
+        index = SimilarityIndex(library)
+
+        if duplicates is not None:
+            pairs = index.duplicates(threshold=duplicates)
+            for first, second, score in pairs:
+                click.echo(f"{score:.3f} #{first} #{second}")
+            click.echo(f"{len(pairs)} near-duplicate pairs")
+            return
+
+        if entry_id is not None:
+            entry = library.get(entry_id)
+            if entry is None:
+                raise click.ClickException(f"No library entry #{entry_id}")
+            composition = entry.composition
+        elif input_file is not None:
+            with open(input_file) as f:
+                composition = Composition.from_dict(json.load(f))
+            entry = library.find_by_path(input_file)
+        else:
+            raise click.UsageError("Give an INPUT_FILE, --id or --duplicates")
+
+        exclude = entry.id if entry is not None else None
+        results = index.nearest(composition, limit, metric, exclude=exclude)
+        for result_id, score in results:
+            click.echo(f"{score:.3f} {describe(library.get(result_id))}")
@@ -1,5 +1,17 @@
+import click
+import glob
+import json
 from pathlib import Path
 import re
+from typing import Optional
+from ..composer import Composer
+from ..config import config
+from ..library import PatternLibrary
+from ..models import Composition
+from ..response_cache import ResponseCache
+from ..tracing import span
+
+_VERSION_SUFFIX = re.compile(r"(.*?)_v(\d+)$")
 
 
 def get_versioned_filename(base_path: Path) -> Path:
@@ -11,11 +23,90 @@ def get_versioned_filename(base_path: Path) -> Path:
     suffix = base_path.suffix
     parent = base_path.parent
 
-    match = re.match(r"(.*?)_v(\d+)$", stem)
+    match = _VERSION_SUFFIX.match(stem)
     if match:
         stem = match.group(1)
-        version = int(match.group(2)) + 1
-    else:
-        version = 1
 
-    return parent / f"{stem}_v{version}{suffix}"
+    # Continue after the highest existing version, not just the one passed in
+    version = 0
+    for path in parent.glob(f"{glob.escape(stem)}_v*{glob.escape(suffix)}"):
+        match = _VERSION_SUFFIX.match(path.stem)
+        if match and match.group(1) == stem:
+            version = max(version, int(match.group(2)))
+
+    return parent / f"{stem}_v{version + 1}{suffix}"
+
+
+def save_composition(composition: Composition, output_path: Path):
+    with span("write", path=str(output_path)):
+        with open(output_path, "w") as f:
+            json.dump(composition.to_dict(), f, indent=2)
+
+
+def library_name(output_path: Path) -> str:
+    """Library name for an output file: its stem without any _vN suffix"""
+    match = _VERSION_SUFFIX.match(output_path.stem)
+    return match.group(1) if match else output_path.stem
+
+
+def cache_options(command):
+    """Add --cache/--offline options for commands that call the API"""
+    command = click.option(
+        "--offline",
+        is_flag=True,
+        default=False,
+        help="Serve responses only from the cache, never call the API",
+    )(command)
+    command = click.option(
+        "--cache/--no-cache",
+        default=False,
+        help="Reuse cached API responses for identical requests",
+    )(command)
+    return command
+
+
+def create_composer(cache: bool = False, offline: bool = False) -> Composer:
+    if not (cache or offline):
+        return Composer(api_key=config.api_key)
+    response_cache = ResponseCache(config.cache_dir / "responses")
+    # Offline replay never reaches the API, so it needs no key
+    api_key = None if offline else config.api_key
+    return Composer(api_key=api_key, cache=response_cache, offline=offline)
+
+
+def library_option(command):
+    return click.option(
+        "--library/--no-library",
+        default=True,
+        help="Record the result and its lineage in the pattern library",
+    )(command)
+
+
+def record_in_library(
+    composition: Composition,
+    output_path: Path,
+    prompt: str,
+    parent_path: Optional[Path] = None,
+):
+    with span("library.record"), PatternLibrary(config.library_path) as library:
+        parent_id = None
+        if parent_path is not None:
+            parent = library.find_by_path(parent_path)
+            if parent is None:
+                # First time we see this file: record it as a lineage root
+                with open(parent_path) as f:
+                    original = Composition.from_dict(json.load(f))
+                parent = library.add(
+                    original, library_name(Path(parent_path)), path=parent_path
+                )
+            parent_id = parent.id
+
+        entry = library.add(
+            composition,
+            library_name(output_path),
+            parent_id=parent_id,
+            prompt=prompt,
+            path=output_path,
+        )
+    click.echo(f"Recorded in library as {entry.name} v{entry.version} (#{entry.id})")
+    return entry
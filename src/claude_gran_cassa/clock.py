@@ -0,0 +1,171 @@
+import heapq
+import itertools
+import threading
+import time
+from array import array
+from typing import Callable, Optional
+
+import numpy as np
+
+from .timeline import Timeline
+
+# MIDI system real-time and common messages
+CLOCK = 0xF8
+START = 0xFA
+CONTINUE = 0xFB
+STOP = 0xFC
+SONG_POSITION = 0xF2
+
+PULSES_PER_BEAT = 24
+SIXTEENTHS_PER_BAR = 16  # Song position counts MIDI beats (16th notes)
+
+
+def pulse_offsets(timeline: Timeline) -> np.ndarray:
+    """Nanosecond offsets of the 24 PPQN clock pulses within one loop"""
+    ticks = np.arange(0, timeline.length * PULSES_PER_BEAT, timeline.ppqn)
+    ticks = ticks / PULSES_PER_BEAT
+    return np.rint(ticks * (timeline.seconds_per_tick * 1e9)).astype(np.int64)
+
+
+def song_position(bar: int) -> list[int]:
+    """Song Position Pointer message for the start of a bar"""
+    position = bar * SIXTEENTHS_PER_BAR
+    if not 0 <= position < 1 << 14:
+        raise ValueError(f"Bar {bar} is beyond the reach of song position")
+    return [SONG_POSITION, position & 0x7F, position >> 7]
+
+
+class ClockStats:
+    """How far sent clock pulses are from where they were due.
+
+    Each pulse records its due time and when it actually leaves, both on
+    the perf_counter_ns clock. Drift is the trend of the error over time
+    (the output clock running fast or slow), jitter the spread of
+    pulse-to-pulse intervals around the ideal.
+    """
+
+    def __init__(self):
+        self._due = array("q")
+        self._sent = array("q")
+
+    def record(self, due_ns: int, sent_ns: int):
+        self._due.append(due_ns)
+        self._sent.append(sent_ns)
+
+    def reset(self):
+        self._due = array("q")
+        self._sent = array("q")
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def _errors(self) -> tuple[np.ndarray, np.ndarray]:
+        # Copy first, as LatenessStats does: the player thread keeps appending
+        count = min(len(self._due), len(self._sent))
+        due = np.frombuffer(self._due[:count], dtype=np.int64)
+        sent = np.frombuffer(self._sent[:count], dtype=np.int64)
+        return due, sent - due
+
+    @property
+    def drift_ppm(self) -> float:
+        """Error growth in parts per million of elapsed time"""
+        due, error = self._errors()
+        if len(due) < 2 or due[-1] == due[0]:
+            return 0.0
+        slope = np.polyfit((due - due[0]).astype(np.float64), error, 1)[0]
+        return float(slope * 1e6)
+
+    @property
+    def jitter_ns(self) -> float:
+        """Standard deviation of the pulse intervals from the ideal ones"""
+        _, error = self._errors()
+        if len(error) < 2:
+            return 0.0
+        return float(np.std(np.diff(error)))
+
+    @property
+    def max_error_ns(self) -> int:
+        _, error = self._errors()
+        return int(np.abs(error).max()) if len(error) else 0
+
+    def summary(self) -> str:
+        return (
+            f"{len(self)} clock pulses, drift={self.drift_ppm:+.1f}ppm "
+            f"jitter={self.jitter_ns / 1e6:.3f}ms "
+            f"max error={self.max_error_ns / 1e6:.3f}ms"
+        )
+
+    @classmethod
+    def from_arrivals(cls, arrivals: list[int], bpm: float) -> "ClockStats":
+        """Stats for pulses as a receiver sees them: the first one sets the
+        phase, the rest are due every 24th of a beat at ``bpm``"""
+        stats = cls()
+        interval = 60e9 / (bpm * PULSES_PER_BEAT)
+        first = arrivals[0] if arrivals else 0
+        for i, arrival in enumerate(arrivals):
+            stats.record(first + round(i * interval), arrival)
+        return stats
+
+
+class LoopbackPort:
+    """A stand-in for a PortMidi output that delivers to itself.
+
+    ``write`` takes the same timestamped batches as ``pygame.midi.Output``
+    and a thread delivers each message when its millisecond timestamp (on
+    ``time``, like ``pygame.midi.time``) comes round, recording the
+    perf_counter_ns arrival. Useful to test clock output without hardware.
+    """
+
+    def __init__(self, on_message: Optional[Callable[[int, list], None]] = None):
+        self.on_message = on_message
+        self.received: list[tuple[int, list]] = []  # (arrival ns, message)
+        self._origin = time.perf_counter_ns()
+        self._pending = []
+        self._order = itertools.count()  # Keeps same-timestamp messages in order
+        self._ready = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._deliver, daemon=True)
+        self._thread.start()
+
+    def time(self) -> int:
+        return (time.perf_counter_ns() - self._origin) // 1_000_000
+
+    def write(self, events: list):
+        with self._ready:
+            for message, timestamp in events:
+                heapq.heappush(
+                    self._pending, (timestamp, next(self._order), list(message))
+                )
+            self._ready.notify()
+
+    def messages(self, status: Optional[int] = None) -> list[tuple[int, list]]:
+        """Received (arrival ns, message) pairs, optionally of one status"""
+        with self._ready:
+            return [
+                (arrival, message)
+                for arrival, message in self.received
+                if status is None or message[0] == status
+            ]
+
+    def _deliver(self):
+        with self._ready:
+            while not self._closed:
+                if not self._pending:
+                    self._ready.wait()
+                    continue
+                due = self._origin + self._pending[0][0] * 1_000_000
+                wait = due - time.perf_counter_ns()
+                if wait > 0:
+                    self._ready.wait(wait / 1e9)
+                    continue
+                _, _, message = heapq.heappop(self._pending)
+                arrival = time.perf_counter_ns()
+                self.received.append((arrival, message))
+                if self.on_message is not None:
+                    self.on_message(arrival, message)
+
+    def close(self):
+        with self._ready:
+            self._closed = True
+            self._ready.notify()
+        self._thread.join()
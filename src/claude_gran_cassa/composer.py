@@ -1,12 +1,49 @@
 import json
-from anthropic import Anthropic
-from .models import Composition
-from .parser import ResponseParser
+from typing import Iterator, Optional
+from .models import Composition, SongConfig
+from .parser import IncrementalParser, ResponseParser
+from .patch import PatchError, apply_patch
+from .response_cache import ResponseCache
+from .tracing import record_usage, span, tracer
+from .validation import STORED_PAN, check_composition
+
+MODEL = "claude-3-opus-20240229"
+MAX_TOKENS = 1000
 
 
 class Composer:
-    def __init__(self, api_key: str):
-        self.client = Anthropic(api_key=api_key)
+    def __init__(
+        self,
+        api_key: str,
+        client=None,
+        async_client=None,
+        cache: Optional[ResponseCache] = None,
+        offline: bool = False,
+    ):
+        self.api_key = api_key
+        self._client = client
+        self._async_client = async_client
+        self.cache = cache
+        self.offline = offline
+        if offline and cache is None:
+            raise ValueError("Offline mode requires a response cache")
+
+    @property
+    def client(self):
+        if self._client is None:
+            from anthropic import Anthropic  # Slow to import; only needed here
+
+            self._client = Anthropic(api_key=self.api_key)
+        return self._client
+
+    @property
+    def async_client(self):
+        if self._async_client is None:
+            from anthropic import AsyncAnthropic
+
+            # Batch callers do their own backoff, so skip the SDK's retries
+            self._async_client = AsyncAnthropic(api_key=self.api_key, max_retries=0)
+        return self._async_client
 
     def _create_system_prompt(self) -> str:
         return """You are a techno music producer specializing in rhythm programming. Generate drum patterns in the following exact JSON format:
@@ -62,27 +99,6 @@ Example valid pattern:
   ]
 }"""
 
-    def _validate_response(self, response: str) -> str:
-        try:
-            start = response.find("{")
-            end = response.rfind("}") + 1
-            if start == -1 or end == 0:
-                raise ValueError("No JSON object found in response")
-
-            json_str = response[start:end]
-
-            data = json.loads(json_str)
-            required_top_level = {"config", "patterns"}
-            if not all(k in data for k in required_top_level):
-                raise ValueError(
-                    f"Missing required keys: {required_top_level - set(data.keys())}"
-                )
-
-            return json_str
-
-        except Exception as e:
-            raise ValueError(f"Invalid response format: {str(e)}\nResponse: {response}")
-
     def _get_example_for_prompt(self, prompt: str) -> str:
         examples = {
             "minimal": {
@@ -115,14 +131,13 @@ Example valid pattern:
                 return f"\nHere's a relevant example:\n{json.dumps(examples[key], indent=2)}"
         return ""
 
-    def generate_pattern(self, prompt: str) -> Composition:
-        """Generate a new pattern based on the prompt"""
+    def _generation_request(self, prompt: str) -> dict:
         system_prompt = self._create_system_prompt()
         example = self._get_example_for_prompt(prompt)
 
-        response = self.client.messages.create(
-            model="claude-3-opus-20240229",
-            max_tokens=1000,
+        return dict(
+            model=MODEL,
+            max_tokens=MAX_TOKENS,
             system=system_prompt,
             messages=[
                 {
@@ -132,19 +147,15 @@ Example valid pattern:
             ],
         )
 
-        validated_response = self._validate_response(response.content[0].text)
-        return ResponseParser.parse(validated_response)
-
-    def evolve_pattern(self, composition: Composition, prompt: str) -> Composition:
-        """Evolve an existing pattern"""
+    def _evolution_request(self, composition: Composition, prompt: str) -> dict:
         system_prompt = (
             self._create_system_prompt()
             + "\n\nWhen evolving patterns:\n1. Maintain the basic structure\n2. Preserve pattern length and divisions\n3. Only modify the elements mentioned in the prompt\n4. Keep all other elements unchanged"
         )
 
-        response = self.client.messages.create(
-            model="claude-3-opus-20240229",
-            max_tokens=1000,
+        return dict(
+            model=MODEL,
+            max_tokens=MAX_TOKENS,
             system=system_prompt,
             messages=[
                 {
@@ -154,5 +165,153 @@ Example valid pattern:
             ],
         )
 
-        validated_response = self._validate_response(response.content[0].text)
-        return ResponseParser.parse(validated_response)
+    def _delta_evolution_request(self, composition: Composition, prompt: str) -> dict:
+        system_prompt = self._create_system_prompt() + """
+
+When evolving patterns, respond with ONLY a JSON Patch (RFC 6902) array describing the changes to the current pattern, never the whole pattern. Use "replace", "add" and "remove" operations with JSON Pointer paths, for example:
+[
+  {"op": "replace", "path": "/patterns/0/velocities", "value": [127, 100, 120, 100]},
+  {"op": "replace", "path": "/config/bpm", "value": 134},
+  {"op": "add", "path": "/patterns/-", "value": {<complete new pattern>}}
+]
+
+Rules for patches:
+1. Only include the elements the request asks to change
+2. Keep every pattern valid: hits length equals divisions, one velocity and one panning value per hit
+3. Panning in the current pattern uses 0-127 with 64 = center; keep that scale in the patch
+4. Respond with an empty array [] if nothing needs to change"""
+
+        current = json.dumps(composition.to_dict(), separators=(",", ":"))
+        return dict(
+            model=MODEL,
+            max_tokens=MAX_TOKENS,
+            system=system_prompt,
+            messages=[
+                {
+                    "role": "user",
+                    "content": f"Current pattern:\n{current}\n\nModification request: {prompt}\n\nRespond with ONLY the JSON Patch array.",
+                }
+            ],
+        )
+
+    def _patch_parser(self, composition: Composition):
+        def parse(response: str) -> Composition:
+            operations = ResponseParser.load(response, "[", "]")
+            if not isinstance(operations, list):
+                raise PatchError("Patch must be a list of operations")
+            patched = apply_patch(composition.to_dict(), operations)
+            # The current composition is sent with stored 0-127 panning
+            check_composition(patched, pan_range=STORED_PAN)
+            return Composition.from_dict(patched)
+
+        return parse
+
+    def _cached(self, request: dict) -> Optional[str]:
+        if self.cache is None:
+            return None
+        response = self.cache.get(ResponseCache.key(request))
+        if response is None and self.offline:
+            raise ValueError("No cached response for this request (offline mode)")
+        return response
+
+    def _store(self, request: dict, response: str):
+        if self.cache is not None:
+            self.cache.put(ResponseCache.key(request), response)
+
+    def _complete(self, request: dict, parse=ResponseParser.parse) -> Composition:
+        cached = self._cached(request)
+        if cached is not None:
+            with span("parse", cached=True):
+                return parse(cached)
+
+        with span("api.request", model=request["model"]) as current:
+            response = self.client.messages.create(**request)
+            record_usage(response, current)
+        text = response.content[0].text
+        with span("parse"):
+            composition = parse(text)
+        self._store(request, text)
+        return composition
+
+    async def _acomplete(
+        self, request: dict, parse=ResponseParser.parse
+    ) -> Composition:
+        cached = self._cached(request)
+        if cached is not None:
+            with span("parse", cached=True):
+                return parse(cached)
+
+        with span("api.request", model=request["model"]) as current:
+            response = await self.async_client.messages.create(**request)
+            record_usage(response, current)
+        text = response.content[0].text
+        with span("parse"):
+            composition = parse(text)
+        self._store(request, text)
+        return composition
+
+    def generate_pattern(self, prompt: str) -> Composition:
+        """Generate a new pattern based on the prompt"""
+        return self._complete(self._generation_request(prompt))
+
+    async def agenerate_pattern(self, prompt: str) -> Composition:
+        """Generate a new pattern using the async client"""
+        return await self._acomplete(self._generation_request(prompt))
+
+    def stream_pattern(self, prompt: str) -> Iterator[Composition]:
+        """Generate a new pattern, yielding a growing Composition as each
+        pattern arrives. The last item is the complete, validated result."""
+        request = self._generation_request(prompt)
+        cached = self._cached(request)
+        if cached is not None:
+            yield ResponseParser.parse(cached)
+            return
+
+        parser = IncrementalParser()
+        config = None
+        patterns = []
+        chunks = []
+        with span("api.stream", model=request["model"]) as current:
+            with self.client.messages.stream(**request) as stream:
+                for text in stream.text_stream:
+                    if not chunks:
+                        current.set(first_token_ms=current.duration_ns / 1e6)
+                    chunks.append(text)
+                    for item in parser.feed(text):
+                        if isinstance(item, SongConfig):
+                            config = item
+                            continue
+                        patterns.append(item)
+                        if config is not None:
+                            yield Composition(config=config, patterns=list(patterns))
+                if tracer.enabled:
+                    record_usage(stream.get_final_message(), current)
+
+        text = "".join(chunks)
+        with span("parse"):
+            composition = ResponseParser.parse(text)
+        self._store(request, text)
+        yield composition
+
+    def evolve_pattern(
+        self, composition: Composition, prompt: str, delta: bool = False
+    ) -> Composition:
+        """Evolve an existing pattern. With ``delta`` the model only returns
+        a JSON Patch of what changed, which is applied locally."""
+        if delta:
+            return self._complete(
+                self._delta_evolution_request(composition, prompt),
+                parse=self._patch_parser(composition),
+            )
+        return self._complete(self._evolution_request(composition, prompt))
+
+    async def aevolve_pattern(
+        self, composition: Composition, prompt: str, delta: bool = False
+    ) -> Composition:
+        """Evolve an existing pattern using the async client"""
+        if delta:
+            return await self._acomplete(
+                self._delta_evolution_request(composition, prompt),
+                parse=self._patch_parser(composition),
+            )
+        return await self._acomplete(self._evolution_request(composition, prompt))
@@ -1,17 +1,57 @@
 import os
-from dotenv import load_dotenv
+from pathlib import Path
 
 
 class Config:
+    """Settings from the environment, read on first use so importing the
+    package (and ``--help``) doesn't search for and parse a .env file"""
+
     def __init__(self):
+        self._loaded = False
+
+    def _load(self):
+        if self._loaded:
+            return
+        from dotenv import load_dotenv
+
         load_dotenv()
         self._api_key = os.getenv("ANTHROPIC_API_KEY")
+        self._cache_dir = Path(
+            os.getenv("GRAN_CASSA_CACHE_DIR", "~/.cache/claude-gran-cassa")
+        ).expanduser()
+        self._library_path = Path(
+            os.getenv(
+                "GRAN_CASSA_LIBRARY", "~/.local/share/claude-gran-cassa/library.db"
+            )
+        ).expanduser()
+        runtime_dir = os.getenv("XDG_RUNTIME_DIR") or self._cache_dir
+        self._socket_path = Path(
+            os.getenv("GRAN_CASSA_SOCKET", Path(runtime_dir) / "gran-cassa.sock")
+        ).expanduser()
+        self._loaded = True
 
     @property
     def api_key(self):
+        self._load()
         if not self._api_key:
             raise ValueError("ANTHROPIC_API_KEY not found in environment")
         return self._api_key
 
+    @property
+    def cache_dir(self) -> Path:
+        self._load()
+        return self._cache_dir
+
+    @property
+    def library_path(self) -> Path:
+        self._load()
+        return self._library_path
+
+    @property
+    def socket_path(self) -> Path:
+        """Where the playback daemon listens"""
+        self._load()
+        return self._socket_path
+
 
 config = Config()
@@ -0,0 +1,283 @@
+import json
+import os
+import socket
+import socketserver
+import threading
+from pathlib import Path
+from typing import Callable, Optional
+
+from .models import Composition
+from .playback import Player
+from .validation import STORED_PAN, check_composition
+
+
+def load_composition(path: Path) -> Composition:
+    """Read and validate a pattern file, repairing what can be repaired"""
+    with open(path) as f:
+        data = json.load(f)
+    check_composition(data, STORED_PAN)
+    return Composition.from_dict(data)
+
+
+class FileWatcher:
+    """Poll files for changes from a background thread.
+
+    A file counts as changed when its modification time or size does;
+    polling needs no extra dependency and copes with editors that save by
+    replacing the file.
+    """
+
+    def __init__(self, on_change: Callable[[Path], None], interval: float = 0.1):
+        self.on_change = on_change
+        self.interval = interval
+        self._files: dict[Path, Optional[tuple[int, int]]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _signature(path: Path) -> Optional[tuple[int, int]]:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    @property
+    def watched(self) -> list[Path]:
+        with self._lock:
+            return sorted(self._files)
+
+    def watch(self, path: Path):
+        path = Path(path).resolve()
+        with self._lock:
+            self._files[path] = self._signature(path)
+
+    def unwatch(self, path: Path):
+        with self._lock:
+            self._files.pop(Path(path).resolve(), None)
+
+    def poll(self) -> list[Path]:
+        """Files that changed since the last poll"""
+        changed = []
+        with self._lock:
+            for path, previous in self._files.items():
+                current = self._signature(path)
+                if current != previous:
+                    self._files[path] = current
+                    if current is not None:
+                        changed.append(path)
+        return changed
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            for path in self.poll():
+                self.on_change(path)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """One JSON request per line in, one JSON reply per line out"""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                response = {"ok": False, "error": "Request is not valid JSON"}
+            else:
+                response = self.server.daemon.handle(request)
+            self.wfile.write((json.dumps(response) + "\n").encode())
+
+
+class PlaybackDaemon:
+    """Long-running playback that keeps the player, its sound bank and the
+    API client warm, driven by commands over a unix socket.
+
+    New compositions (loaded, watched files that change, or fresh
+    generations) are queued to start at the next bar line, so the groove
+    keeps playing while it is edited.
+    """
+
+    SLOW_COMMANDS = {"generate", "evolve"}
+
+    def __init__(
+        self,
+        player: Player,
+        socket_path: Path,
+        composer_factory: Optional[Callable] = None,
+        poll_interval: float = 0.1,
+    ):
+        self.player = player
+        self.socket_path = Path(socket_path)
+        self.composer_factory = composer_factory
+        self.watcher = FileWatcher(self._reload, poll_interval)
+        self.current: Optional[Path] = None
+        self.last_error: Optional[str] = None
+        self._composer = None
+        self._composer_lock = threading.Lock()
+        self._lock = threading.Lock()  # One change to playback at a time
+        self._server = None
+
+    @property
+    def composer(self):
+        with self._composer_lock:
+            if self._composer is None:
+                if self.composer_factory is None:
+                    raise ValueError("This daemon was started without an API client")
+                self._composer = self.composer_factory()
+            return self._composer
+
+    def handle(self, request: dict) -> dict:
+        command = request.get("command")
+        handler = getattr(self, f"_cmd_{command}", None)
+        if handler is None:
+            return {"ok": False, "error": f"Unknown command: {command!r}"}
+        try:
+            if command in self.SLOW_COMMANDS:
+                # These lock only around the swap, not the API call
+                result = handler(**request.get("args", {}))
+            else:
+                with self._lock:
+                    result = handler(**request.get("args", {}))
+        except Exception as e:
+            return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        return {"ok": True, **(result or {})}
+
+    def _switch(self, composition: Composition, at_bar: bool = True):
+        if self.player.scheduler.running:
+            self.player.queue(composition, at_bar=at_bar)
+        else:
+            self.player.start(composition, loop=True)
+
+    def _follow(self, path: Path, watch: bool):
+        if self.current is not None:
+            self.watcher.unwatch(self.current)
+        self.current = Path(path).resolve()
+        if watch:
+            self.watcher.watch(self.current)
+
+    def _reload(self, path: Path):
+        try:
+            composition = load_composition(path)
+        except (OSError, ValueError) as e:
+            # Often a half-written save; the next change will retry
+            self.last_error = f"{path}: {e}"
+            return
+        with self._lock:
+            self.last_error = None
+            if path == self.current:
+                self._switch(composition)
+
+    def _cmd_play(self, file: str, watch: bool = True, at_bar: bool = True):
+        """Play a pattern file, swapping at the next bar if already playing"""
+        self._switch(load_composition(Path(file)), at_bar)
+        self._follow(file, watch)
+        return {"file": str(self.current)}
+
+    def _cmd_queue(self, composition: dict, at_bar: bool = True):
+        """Play a composition given inline"""
+        data = dict(composition)
+        check_composition(data, STORED_PAN)
+        self._switch(Composition.from_dict(data), at_bar)
+
+    def _cmd_stop(self):
+        self.player.stop()
+
+    def _cmd_samples(self, file: str):
+        """Swap the sound bank of an audio player from the next bar"""
+        if not hasattr(self.player, "load_sound_bank"):
+            raise ValueError("The daemon is playing MIDI, not audio")
+        self.player.load_sound_bank(Path(file))
+
+    def _cmd_generate(self, prompt: str, output: str):
+        """Generate with the warm client, save, and play from the next bar"""
+        composition = self.composer.generate_pattern(prompt)
+        return self._save(composition, Path(output))
+
+    def _cmd_evolve(self, file: str, prompt: str, output: str, delta: bool = False):
+        composition = self.composer.evolve_pattern(
+            load_composition(Path(file)), prompt, delta=delta
+        )
+        return self._save(composition, Path(output))
+
+    def _save(self, composition: Composition, output: Path):
+        with open(output, "w") as f:
+            json.dump(composition.to_dict(), f, indent=2)
+        with self._lock:
+            self._switch(composition)
+            self._follow(output, watch=True)
+            return {"file": str(self.current)}
+
+    def _cmd_status(self):
+        stats = self.player.scheduler.stats
+        clock = getattr(self.player, "clock_stats", None)
+        return {
+            "playing": self.player.scheduler.running,
+            "file": str(self.current) if self.current else None,
+            "watching": [str(path) for path in self.watcher.watched],
+            "last_error": self.last_error,
+            "lateness": stats.summary() if len(stats) else None,
+            "clock": clock.summary() if clock is not None and len(clock) else None,
+        }
+
+    def _cmd_shutdown(self):
+        # Runs on a handler thread, so this does not wait on itself
+        threading.Thread(target=self._server.shutdown).start()
+
+    def serve_forever(self):
+        """Listen on the socket until a shutdown command or KeyboardInterrupt"""
+        if self.socket_path.exists():
+            try:
+                send(self.socket_path, "status")
+            except ConnectionError:
+                self.socket_path.unlink()  # Left over from a daemon that died
+            else:
+                raise ValueError(f"A daemon is already listening on {self.socket_path}")
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._server = socketserver.ThreadingUnixStreamServer(
+            str(self.socket_path), _Handler
+        )
+        self._server.daemon_threads = True
+        self._server.daemon = self
+        os.chmod(self.socket_path, 0o600)
+        self.watcher.start()
+        try:
+            self._server.serve_forever()
+        finally:
+            self.watcher.stop()
+            self.player.close()
+            self._server.server_close()
+            self.socket_path.unlink(missing_ok=True)
+
+
+def send(socket_path: Path, command: str, **args) -> dict:
+    """Send one command to a running daemon and return its reply.
+
+    Raises ConnectionError if no daemon is listening and ValueError if the
+    daemon could not carry out the command.
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(str(socket_path))
+            request = {"command": command, "args": args}
+            sock.sendall((json.dumps(request) + "\n").encode())
+            with sock.makefile("rb") as reply:
+                line = reply.readline()
+    except (FileNotFoundError, ConnectionRefusedError):
+        raise ConnectionError(f"No daemon is listening on {socket_path}")
+
+    response = json.loads(line)
+    if not response.pop("ok"):
+        raise ValueError(response["error"])
+    return response
@@ -0,0 +1,190 @@
+import json
+import multiprocessing
+from dataclasses import dataclass, field
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+
+from .audio.render import OfflineRenderer
+from .audio.samples import CHANNELS, SAMPLE_RATE
+from .midi import MIDIConverter
+from .models import Composition
+
+
+def find_patterns(paths: Iterable[Path]) -> list[tuple[Path, Path]]:
+    """(file, path relative to its input) for every JSON file under ``paths``"""
+    found = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            found.extend(
+                (file, file.relative_to(path)) for file in path.rglob("*.json")
+            )
+        else:
+            found.append((path, Path(path.name)))
+    return sorted(found)
+
+
+class SharedSoundBank:
+    """A decoded sound bank packed into one shared memory block.
+
+    The parent process creates it once; pool workers attach by name and get
+    zero-copy views of the samples instead of decoding the bank themselves.
+    """
+
+    def __init__(self, samples: dict[int, np.ndarray]):
+        frames = sum(len(sample) for sample in samples.values())
+        self._memory = SharedMemory(create=True, size=max(frames * CHANNELS * 2, 1))
+        data = np.ndarray((frames, CHANNELS), dtype=np.int16, buffer=self._memory.buf)
+        self.layout = {}
+        offset = 0
+        for note, sample in samples.items():
+            data[offset : offset + len(sample)] = sample
+            self.layout[note] = (offset, len(sample))
+            offset += len(sample)
+        del data  # Views must be gone before the block can be closed
+
+    @property
+    def spec(self) -> tuple[str, dict]:
+        """What a worker needs to attach: block name and sample layout"""
+        return self._memory.name, self.layout
+
+    @staticmethod
+    def attach(spec: tuple[str, dict]) -> tuple[SharedMemory, dict[int, np.ndarray]]:
+        name, layout = spec
+        try:
+            # The creating process owns cleanup, so workers must not track it
+            memory = SharedMemory(name=name, track=False)
+        except TypeError:  # Python < 3.13
+            memory = SharedMemory(name=name)
+        frames = sum(length for _, length in layout.values())
+        data = np.ndarray((frames, CHANNELS), dtype=np.int16, buffer=memory.buf)
+        data.flags.writeable = False
+        samples = {
+            note: data[offset : offset + length]
+            for note, (offset, length) in layout.items()
+        }
+        return memory, samples
+
+    def close(self):
+        self._memory.close()
+        self._memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+@dataclass
+class ExportResult:
+    source: Path
+    outputs: list[Path] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class ExportJob:
+    output_dir: Path
+    midi: bool = True
+    audio: bool = False
+    loops: int = 1
+    split_tracks: bool = True
+    sample_rate: int = SAMPLE_RATE
+
+
+# Per-process state, set up once by _init_worker
+_job: Optional[ExportJob] = None
+_renderer: Optional[OfflineRenderer] = None
+_memory: Optional[SharedMemory] = None
+
+
+def _init_worker(job: ExportJob, bank_spec: Optional[tuple]):
+    global _job, _renderer, _memory
+    _job = job
+    if bank_spec is not None:
+        _memory, samples = SharedSoundBank.attach(bank_spec)
+        _renderer = OfflineRenderer(sample_rate=job.sample_rate)
+        _renderer.samples = samples
+
+
+def _release_worker():
+    global _job, _renderer, _memory
+    _job = _renderer = None  # Drop the sample views before closing the block
+    if _memory is not None:
+        _memory.close()
+        _memory = None
+
+
+def _export_one(item: tuple[Path, Path]) -> ExportResult:
+    source, relative = item
+    result = ExportResult(source)
+    try:
+        with open(source) as f:
+            composition = Composition.from_dict(json.load(f))
+
+        target = _job.output_dir / relative
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if _job.midi:
+            output = target.with_suffix(".mid")
+            MIDIConverter().convert(composition, output, _job.loops, _job.split_tracks)
+            result.outputs.append(output)
+        if _job.audio:
+            output = target.with_suffix(".wav")
+            buffer = _renderer.render(composition, loops=_job.loops)
+            _renderer.write_wav(buffer, output)
+            result.outputs.append(output)
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    return result
+
+
+def export_bulk(
+    items: list[tuple[Path, Path]],
+    job: ExportJob,
+    samples: Optional[dict[int, np.ndarray]] = None,
+    workers: Optional[int] = None,
+    on_result: Optional[Callable[[ExportResult], None]] = None,
+) -> list[ExportResult]:
+    """Export pattern files to MIDI and/or WAV over a pool of processes.
+
+    ``items`` come from ``find_patterns``. Audio export needs the decoded
+    ``samples`` of a sound bank, which are shared with every worker. Results
+    arrive in completion order.
+    """
+    if job.audio and samples is None:
+        raise ValueError("Audio export needs a sound bank")
+    workers = workers or multiprocessing.cpu_count()
+
+    bank = SharedSoundBank(samples) if job.audio else None
+    spec = bank.spec if bank is not None else None
+    pool = None
+    results = []
+    try:
+        if workers == 1:
+            _init_worker(job, spec)
+            outcomes = map(_export_one, items)
+        else:
+            pool = multiprocessing.Pool(workers, _init_worker, (job, spec))
+            # Small chunks keep workers busy to the end; large ones cut IPC
+            chunksize = max(1, min(64, len(items) // (workers * 8)))
+            outcomes = pool.imap_unordered(_export_one, items, chunksize)
+
+        for result in outcomes:
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+    finally:
+        if pool is not None:
+            pool.terminate()  # Every result is in, or we are bailing out
+            pool.join()
+        _release_worker()
+        if bank is not None:
+            bank.close()
+    return results
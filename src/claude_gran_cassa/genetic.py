@@ -0,0 +1,291 @@
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import numpy as np
+
+from .models import Composition, Pattern, SongConfig
+from .timeline import division_length, hit_steps
+
+DEFAULT_VELOCITY = 100
+CENTER_PAN = 64
+
+
+class Population:
+    """Many variants of one composition, one array row per individual.
+
+    Velocity and pan are kept per step rather than per hit, so hits can be
+    flipped, rotated and crossed over without re-aligning the expression
+    lists. Pattern metadata (note, channel, divisions...) comes from the seed.
+    """
+
+    def __init__(self, seed: Composition, hits, velocities, panning):
+        self.seed = seed
+        self.hits = hits  # One (size, steps) bool array per pattern
+        self.velocities = velocities  # (size, steps) int16
+        self.panning = panning  # (size, steps) int16
+        self._seed_hits = None
+
+    @classmethod
+    def from_composition(cls, composition: Composition, size: int) -> "Population":
+        hits, velocities, panning = [], [], []
+        for pattern in composition.patterns:
+            steps = hit_steps(pattern)
+            row = np.zeros(pattern.hit_length, dtype=bool)
+            row[steps] = True
+            velocity = np.full(pattern.hit_length, DEFAULT_VELOCITY, dtype=np.int16)
+            pan = np.full(pattern.hit_length, CENTER_PAN, dtype=np.int16)
+            given = pattern.velocities[: len(steps)]
+            velocity[steps[: len(given)]] = given
+            given = pattern.panning[: len(steps)]
+            pan[steps[: len(given)]] = given
+
+            hits.append(np.tile(row, (size, 1)))
+            velocities.append(np.tile(velocity, (size, 1)))
+            panning.append(np.tile(pan, (size, 1)))
+        return cls(composition, hits, velocities, panning)
+
+    def __len__(self) -> int:
+        return len(self.hits[0]) if self.hits else 0
+
+    @property
+    def seed_hits(self) -> list[np.ndarray]:
+        """The seed's hit rows, for fitness functions that compare against it"""
+        if self._seed_hits is None:
+            self._seed_hits = [
+                hits[0] for hits in Population.from_composition(self.seed, 1).hits
+            ]
+        return self._seed_hits
+
+    def take(self, index: np.ndarray) -> "Population":
+        population = Population(
+            self.seed,
+            [hits[index] for hits in self.hits],
+            [velocities[index] for velocities in self.velocities],
+            [panning[index] for panning in self.panning],
+        )
+        population._seed_hits = self._seed_hits
+        return population
+
+    def concat(self, other: "Population") -> "Population":
+        population = Population(
+            self.seed,
+            [np.concatenate(pair) for pair in zip(self.hits, other.hits)],
+            [np.concatenate(pair) for pair in zip(self.velocities, other.velocities)],
+            [np.concatenate(pair) for pair in zip(self.panning, other.panning)],
+        )
+        population._seed_hits = self._seed_hits
+        return population
+
+    def composition(self, i: int) -> Composition:
+        patterns = []
+        for original, hits, velocities, panning in zip(
+            self.seed.patterns, self.hits, self.velocities, self.panning
+        ):
+            row = hits[i]
+            patterns.append(
+                Pattern(
+                    hits=row.astype(np.uint8).tolist(),
+                    divisions=original.divisions,
+                    triplet=original.triplet,
+                    channel=original.channel,
+                    note=original.note,
+                    velocities=velocities[i][row].tolist(),
+                    panning=panning[i][row].tolist(),
+                    name=original.name,
+                    bars=original.bars,
+                )
+            )
+        config = self.seed.config
+        return Composition(
+            config=SongConfig(config.bpm, config.time_signature, config.swing_amount),
+            patterns=patterns,
+        )
+
+
+Fitness = Callable[[Population], np.ndarray]
+
+
+def similarity() -> Fitness:
+    """Fraction of steps that match the seed, averaged over patterns"""
+
+    def score(population: Population) -> np.ndarray:
+        return np.mean(
+            [
+                (hits == seed).mean(axis=1)
+                for hits, seed in zip(population.hits, population.seed_hits)
+            ],
+            axis=0,
+        )
+
+    return score
+
+
+def density(target: float) -> Fitness:
+    """Closeness of each pattern's fraction of steps hit to ``target``"""
+
+    def score(population: Population) -> np.ndarray:
+        return 1 - np.mean(
+            [np.abs(hits.mean(axis=1) - target) for hits in population.hits], axis=0
+        )
+
+    return score
+
+
+def syncopation() -> Fitness:
+    """Fraction of hits that fall off the quarter-note beat"""
+
+    def score(population: Population) -> np.ndarray:
+        offbeat, total = 0, 0
+        for pattern, hits in zip(population.seed.patterns, population.hits):
+            ppqn = 12
+            ticks = np.arange(hits.shape[1]) * division_length(pattern, ppqn)
+            offbeat = offbeat + hits[:, ticks % ppqn != 0].sum(axis=1)
+            total = total + hits.sum(axis=1)
+        return offbeat / np.maximum(total, 1)
+
+    return score
+
+
+def weighted(*terms: tuple[Fitness, float]) -> Fitness:
+    """Weighted sum of fitness functions"""
+
+    def score(population: Population) -> np.ndarray:
+        return sum(weight * fitness(population) for fitness, weight in terms)
+
+    return score
+
+
+FITNESS = {
+    "similar": similarity,
+    "syncopated": lambda: weighted((syncopation(), 1.0), (similarity(), 0.5)),
+    "dense": lambda: weighted((density(0.75), 1.0), (similarity(), 0.5)),
+    "sparse": lambda: weighted((density(0.25), 1.0), (similarity(), 0.5)),
+}
+
+
+@dataclass
+class Candidate:
+    composition: Composition
+    score: float
+
+
+class GeneticEngine:
+    """Evolve a composition locally by mutation, crossover and selection.
+
+    Every operator works on whole populations at once, so a generation of a
+    few hundred candidates costs a handful of NumPy calls per pattern.
+    """
+
+    def __init__(
+        self,
+        fitness: Fitness,
+        population_size: int = 256,
+        mutation_rate: float = 0.05,
+        rotate_rate: float = 0.1,
+        velocity_jitter: float = 4.0,
+        pan_jitter: float = 2.0,
+        min_density: float = 0.0,
+        max_density: float = 1.0,
+        elite: int = 8,
+        seed: Optional[int] = None,
+    ):
+        if not 0 <= min_density <= max_density <= 1:
+            raise ValueError("Density bounds must satisfy 0 <= min <= max <= 1")
+        self.fitness = fitness
+        self.population_size = population_size
+        self.mutation_rate = mutation_rate
+        self.rotate_rate = rotate_rate
+        self.velocity_jitter = velocity_jitter
+        self.pan_jitter = pan_jitter
+        self.min_density = min_density
+        self.max_density = max_density
+        self.elite = min(elite, population_size)
+        self.rng = np.random.default_rng(seed)
+
+    def _select(self, scores: np.ndarray, count: int) -> np.ndarray:
+        """Binary tournament: the better of two random individuals"""
+        first = self.rng.integers(0, len(scores), count)
+        second = self.rng.integers(0, len(scores), count)
+        return np.where(scores[first] >= scores[second], first, second)
+
+    def _crossover(self, a: Population, b: Population) -> Population:
+        """Single-point crossover, with an independent point per pattern"""
+        child = a.take(np.arange(len(a)))
+        for i, hits in enumerate(a.hits):
+            size, steps = hits.shape
+            point = self.rng.integers(0, steps + 1, size)[:, None]
+            from_b = np.arange(steps) >= point
+            child.hits[i] = np.where(from_b, b.hits[i], hits)
+            child.velocities[i] = np.where(from_b, b.velocities[i], a.velocities[i])
+            child.panning[i] = np.where(from_b, b.panning[i], a.panning[i])
+        return child
+
+    def _mutate(self, population: Population):
+        rng = self.rng
+        for i, hits in enumerate(population.hits):
+            size, steps = hits.shape
+            hits ^= rng.random((size, steps)) < self.mutation_rate
+
+            # Rotate a share of the rows by a random number of steps
+            shift = rng.integers(0, steps, size) * (rng.random(size) < self.rotate_rate)
+            index = (np.arange(steps) - shift[:, None]) % steps
+            hits = np.take_along_axis(hits, index, axis=1)
+            velocities = np.take_along_axis(population.velocities[i], index, axis=1)
+            panning = np.take_along_axis(population.panning[i], index, axis=1)
+
+            velocities = velocities + rng.normal(
+                0, self.velocity_jitter, velocities.shape
+            ).astype(np.int16)
+            panning = panning + rng.normal(0, self.pan_jitter, panning.shape).astype(
+                np.int16
+            )
+
+            population.hits[i] = self._constrain(hits)
+            population.velocities[i] = np.clip(velocities, 1, 127)
+            population.panning[i] = np.clip(panning, 0, 127)
+
+    def _constrain(self, hits: np.ndarray) -> np.ndarray:
+        """Add or drop random hits until every row is within the density bounds"""
+        size, steps = hits.shape
+        count = hits.sum(axis=1)
+        low = int(np.ceil(self.min_density * steps))
+        high = int(np.floor(self.max_density * steps))
+
+        # Rank candidate steps in random order; steps that cannot change
+        # get a key of 2 so they sort after every real candidate
+        keys = self.rng.random((size, steps))
+        add_rank = np.argsort(np.argsort(np.where(hits, 2, keys)), axis=1)
+        drop_rank = np.argsort(np.argsort(np.where(hits, keys, 2)), axis=1)
+        add = add_rank < np.maximum(low - count, 0)[:, None]
+        drop = drop_rank < np.maximum(count - high, 0)[:, None]
+        return (hits | add) & ~drop
+
+    def run(
+        self, composition: Composition, generations: int = 50, k: int = 5
+    ) -> list[Candidate]:
+        """The ``k`` best distinct variants of ``composition``, best first"""
+        population = Population.from_composition(composition, self.population_size)
+        self._mutate(population)  # Spread the initial population around the seed
+
+        for _ in range(generations):
+            scores = self.fitness(population)
+            elite = population.take(np.argsort(-scores, kind="stable")[: self.elite])
+            count = self.population_size - self.elite
+            children = self._crossover(
+                population.take(self._select(scores, count)),
+                population.take(self._select(scores, count)),
+            )
+            self._mutate(children)
+            population = elite.concat(children)
+
+        scores = self.fitness(population)
+        candidates, seen = [], set()
+        for i in np.argsort(-scores, kind="stable"):
+            key = b"".join(np.packbits(hits[i]).tobytes() for hits in population.hits)
+            if key in seen:
+                continue
+            seen.add(key)
+            candidates.append(Candidate(population.composition(i), float(scores[i])))
+            if len(candidates) == k:
+                break
+        return candidates
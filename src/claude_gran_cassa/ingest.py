@@ -0,0 +1,379 @@
+import heapq
+import mmap
+import multiprocessing
+import os
+from dataclasses import dataclass, field
+from operator import itemgetter
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional
+
+import numpy as np
+
+from .models import Composition, Pattern, SongConfig
+from .smf import (
+    CONTROL_CHANGE,
+    META,
+    NOTE_ON,
+    PAN,
+    TEMPO,
+    TIME_SIGNATURE,
+    smf_tracks,
+    track_events,
+)
+from .validation import CHANNELS
+
+CENTER = 64
+DEFAULT_BPM = 120
+
+# Steps per bar to try, coarsest first: a groove lands on the first grid
+# that fits it. 12 and 24 are the triplet grids; 48 fits mixed material.
+GRIDS = np.array([16, 12, 32, 24, 48])
+# Mean distance from the grid, in bars, that still counts as fitting it
+# (about a 96th note, so humanized playing still snaps to straight 16ths)
+TOLERANCE = 1 / 96
+
+# General MIDI percussion names for the notes drum parts use most
+GM_DRUMS = {
+    35: "kick",
+    36: "kick",
+    37: "rimshot",
+    38: "snare",
+    39: "clap",
+    40: "snare",
+    41: "low tom",
+    42: "closed hihat",
+    43: "low tom",
+    44: "pedal hihat",
+    45: "mid tom",
+    46: "open hihat",
+    47: "mid tom",
+    48: "high tom",
+    49: "crash",
+    50: "high tom",
+    51: "ride",
+    53: "ride bell",
+    54: "tambourine",
+    56: "cowbell",
+    57: "crash",
+    59: "ride",
+    70: "maracas",
+    75: "claves",
+}
+
+
+@dataclass
+class NoteEvents:
+    """Every note-on of a MIDI file as columns, in file order"""
+
+    ppqn: int
+    bpm: int
+    time_signature: tuple[int, int]
+    tick: np.ndarray  # int64, absolute
+    channel: np.ndarray  # uint8, 0-based MIDI channel
+    note: np.ndarray  # uint8
+    velocity: np.ndarray  # uint8
+    pan: np.ndarray  # uint8, the channel's CC10 when the note started
+
+    def __len__(self) -> int:
+        return len(self.tick)
+
+
+def _pan_at(
+    note_seq: np.ndarray,
+    note_channel: np.ndarray,
+    pan_seq: np.ndarray,
+    pan_channel: np.ndarray,
+    pan_value: np.ndarray,
+) -> np.ndarray:
+    """The latest CC10 on each note's channel before it, or center"""
+    # One sorted key space per channel, so a search never crosses channels
+    shift = np.int64(1) << 40
+    pan_key = pan_channel.astype(np.int64) * shift + pan_seq
+    order = np.argsort(pan_key, kind="stable")
+    pan_key, pan_value = pan_key[order], pan_value[order]
+
+    note_key = note_channel.astype(np.int64) * shift + note_seq
+    found = np.searchsorted(pan_key, note_key, side="right") - 1
+    valid = found >= 0
+    valid[valid] = pan_key[found[valid]] // shift == note_channel[valid]
+    pan = np.full(len(note_key), CENTER, dtype=np.uint8)
+    pan[valid] = pan_value[found[valid]]
+    return pan
+
+
+def read_midi(source) -> NoteEvents:
+    """Read the note-ons, pan changes, first tempo and time signature of a
+    Standard MIDI File (a path or a binary file object).
+
+    A path is memory-mapped rather than read, and tracks are decoded
+    lazily and merged by tick, so no message objects are created: memory
+    holds the note columns, not the file's messages.
+    """
+    if isinstance(source, (str, Path)):
+        with open(source, "rb") as f:
+            if not os.fstat(f.fileno()).st_size:
+                raise ValueError("Not a Standard MIDI File")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return _read_events(data)
+    return _read_events(source.read())
+
+
+def _read_events(data) -> NoteEvents:
+    file_format, ppqn, tracks = smf_tracks(data)
+    if file_format == 2:
+        raise ValueError("Type 2 MIDI files (independent sequences) are not supported")
+
+    bpm = time_signature = None
+    notes = {"seq": [], "tick": [], "channel": [], "note": [], "velocity": []}
+    pans = {"seq": [], "channel": [], "value": []}
+    merged = heapq.merge(
+        *(track_events(data, start, end) for start, end in tracks),
+        key=itemgetter(0),
+    )
+    for seq, (tick, status, first, second) in enumerate(merged):
+        kind = status & 0xF0
+        if kind == NOTE_ON:
+            if second == 0:  # A note-off by running status
+                continue
+            notes["seq"].append(seq)
+            notes["tick"].append(tick)
+            notes["channel"].append(status & 0x0F)
+            notes["note"].append(first)
+            notes["velocity"].append(second)
+        elif kind == CONTROL_CHANGE and first == PAN:
+            pans["seq"].append(seq)
+            pans["channel"].append(status & 0x0F)
+            pans["value"].append(second)
+        elif status == META and first == TEMPO and bpm is None:
+            bpm = round(60_000_000 / max(int.from_bytes(second, "big"), 1))
+        elif status == META and first == TIME_SIGNATURE and time_signature is None:
+            time_signature = (second[0], 2 ** second[1])
+
+    channel = np.array(notes["channel"], dtype=np.uint8)
+    return NoteEvents(
+        ppqn=ppqn,
+        bpm=bpm or DEFAULT_BPM,
+        time_signature=time_signature or (4, 4),
+        tick=np.array(notes["tick"], dtype=np.int64),
+        channel=channel,
+        note=np.array(notes["note"], dtype=np.uint8),
+        velocity=np.array(notes["velocity"], dtype=np.uint8),
+        pan=_pan_at(
+            np.array(notes["seq"], dtype=np.int64),
+            channel,
+            np.array(pans["seq"], dtype=np.int64),
+            np.array(pans["channel"], dtype=np.uint8),
+            np.array(pans["value"], dtype=np.uint8),
+        ),
+    )
+
+
+def choose_grids(position: np.ndarray, group: np.ndarray, groups: int) -> np.ndarray:
+    """Steps per bar for each group of onsets (``position`` in bars).
+
+    Each group gets the first of ``GRIDS`` whose mean quantization error is
+    within ``TOLERANCE``, or the grid that fits it best if none is.
+    """
+    scaled = position[np.newaxis, :] * GRIDS[:, np.newaxis]
+    error = np.abs(scaled - np.rint(scaled)) / GRIDS[:, np.newaxis]
+    counts = np.maximum(np.bincount(group, minlength=groups), 1)
+    mean = (
+        np.stack([np.bincount(group, weights=row, minlength=groups) for row in error])
+        / counts
+    )
+    fits = mean <= TOLERANCE
+    best = np.where(fits.any(axis=0), fits.argmax(axis=0), mean.argmin(axis=0))
+    return GRIDS[best]
+
+
+def _pattern_name(channel: int, note: int) -> str:
+    if channel == 9:
+        return GM_DRUMS.get(note, f"percussion {note}")
+    return f"note {note}"
+
+
+def _assign_channels(channels: list[int]) -> list[int]:
+    """Keep each part's own channel where it is free, otherwise the lowest
+    free one, since every pattern needs a channel to itself"""
+    wanted = [channel + 1 for channel in channels]
+    free = [channel for channel in CHANNELS if channel not in wanted]
+    assigned, seen = [], set()
+    for channel in wanted:
+        if channel in seen:
+            channel = free.pop(0)
+        seen.add(channel)
+        assigned.append(channel)
+    return assigned
+
+
+def to_compositions(
+    events: NoteEvents, bars: int = 4, max_patterns: int = len(CHANNELS)
+) -> Iterator[Composition]:
+    """Cut the notes into loops of ``bars`` 4/4 bars and quantize each one.
+
+    Every (channel, note) pair becomes a pattern; if there are more than
+    ``max_patterns``, the least used are dropped. Each pattern is snapped to
+    the grid that fits its onsets in that loop, so a triplet part becomes a
+    12 or 24 step per bar pattern next to straight 16ths. Loops without
+    notes are skipped; the last loop is shortened to the bars it uses.
+    """
+    if bars < 1:
+        raise ValueError("A loop needs at least one bar")
+    if not len(events):
+        return
+
+    bar_length = events.ppqn * 4
+    loop_ticks = bar_length * bars
+    # Notes a hair early still belong to the next loop
+    slack = round(bar_length * TOLERANCE)
+    loop = (events.tick + slack) // loop_ticks
+
+    pairs = events.channel.astype(np.int64) * 128 + events.note
+    keys, part, counts = np.unique(pairs, return_inverse=True, return_counts=True)
+    kept = np.sort(np.argsort(-counts, kind="stable")[:max_patterns])
+    keep = np.isin(part, kept)
+    channels = _assign_channels([int(key // 128) for key in keys[kept]])
+    channel_of = dict(zip(kept.tolist(), channels))
+
+    tick, velocity, pan = events.tick[keep], events.velocity[keep], events.pan[keep]
+    loop, part = loop[keep], part[keep]
+    config = SongConfig(bpm=events.bpm, time_signature=events.time_signature)
+
+    # Notes stream out in tick order, so each loop is one contiguous run
+    boundaries = np.flatnonzero(np.diff(loop)) + 1
+    runs = np.split(np.arange(len(loop)), boundaries)
+    for number, run in enumerate(runs, 1):
+        if not len(run):
+            continue
+        start = loop[run[0]] * loop_ticks
+        position = np.maximum(tick[run] - start, 0) / bar_length
+        loop_bars = bars
+        if number == len(runs):
+            loop_bars = min(bars, int(position.max() + TOLERANCE) + 1)
+
+        parts, group = np.unique(part[run], return_inverse=True)
+        grids = choose_grids(position, group, len(parts))
+        divisions = grids * loop_bars
+        step = np.minimum(
+            np.rint(position * grids[group]).astype(np.int64), divisions[group] - 1
+        )
+
+        # All the loop's patterns in one flat step array; simultaneous
+        # notes on a step keep the loudest velocity
+        offsets = np.concatenate([[0], np.cumsum(divisions)])
+        index = offsets[group] + step
+        hits = np.zeros(offsets[-1], dtype=np.uint8)
+        hits[index] = 1
+        velocities = np.zeros(offsets[-1], dtype=np.uint8)
+        np.maximum.at(velocities, index, velocity[run])
+        pannings = np.full(offsets[-1], CENTER, dtype=np.uint8)
+        pannings[index[::-1]] = pan[run][::-1]  # First note on a step wins
+
+        patterns = []
+        for i, key in enumerate(keys[parts]):
+            span = slice(offsets[i], offsets[i + 1])
+            mask = hits[span].astype(bool)
+            patterns.append(
+                Pattern(
+                    hits=hits[span].tolist(),
+                    divisions=int(divisions[i]),
+                    channel=channel_of[parts[i]],
+                    note=int(key % 128),
+                    velocities=velocities[span][mask].tolist(),
+                    panning=pannings[span][mask].tolist(),
+                    name=_pattern_name(int(key // 128), int(key % 128)),
+                    bars=loop_bars,
+                )
+            )
+        yield Composition(config=config, patterns=patterns)
+
+
+def import_midi(source, bars: int = 4) -> list[Composition]:
+    """Read a MIDI file and quantize it into loops of ``bars`` bars"""
+    return list(to_compositions(read_midi(source), bars))
+
+
+def find_midi_files(paths: Iterable[Path]) -> list[tuple[Path, Path]]:
+    """(file, path relative to its input) for every MIDI file under ``paths``"""
+    found = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            found.extend(
+                (file, file.relative_to(path))
+                for file in path.rglob("*")
+                if file.suffix.lower() in (".mid", ".midi") and file.is_file()
+            )
+        else:
+            found.append((path, Path(path.name)))
+
+    # Outputs are named after the relative path, so two inputs that share
+    # one (e.g. same-named files from different folders) would overwrite
+    # each other's patterns
+    sources = {}
+    for file, relative in found:
+        sources.setdefault(relative.with_suffix(""), []).append(file)
+    clashes = [files for files in sources.values() if len(files) > 1]
+    if clashes:
+        raise ValueError(
+            "Inputs would be imported to the same place: "
+            + "; ".join(", ".join(map(str, sorted(files))) for files in clashes)
+        )
+    return sorted(found)
+
+
+@dataclass
+class IngestResult:
+    source: Path
+    relative: Path
+    compositions: list[Composition] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _ingest_one(item: tuple[Path, Path, int]) -> IngestResult:
+    source, relative, bars = item
+    result = IngestResult(source, relative)
+    try:
+        result.compositions = import_midi(source, bars)
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    return result
+
+
+def ingest_bulk(
+    items: list[tuple[Path, Path]],
+    bars: int = 4,
+    workers: Optional[int] = None,
+    on_result: Optional[Callable[[IngestResult], None]] = None,
+) -> list[IngestResult]:
+    """Import MIDI files over a pool of processes.
+
+    ``items`` come from ``find_midi_files``. Parsing and quantizing happen
+    in the workers; results arrive in completion order, so the caller can
+    save them or record them in the library (which has a single writer) as
+    they come in.
+    """
+    workers = workers or multiprocessing.cpu_count()
+    jobs = [(source, relative, bars) for source, relative in items]
+    pool = None
+    results = []
+    try:
+        if workers == 1:
+            outcomes = map(_ingest_one, jobs)
+        else:
+            pool = multiprocessing.Pool(workers)
+            chunksize = max(1, min(64, len(jobs) // (workers * 8)))
+            outcomes = pool.imap_unordered(_ingest_one, jobs, chunksize)
+
+        for result in outcomes:
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    return results
@@ -0,0 +1,335 @@
+import json
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from .models import Composition
+from .similarity import fingerprint
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS compositions (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    bpm INTEGER NOT NULL,
+    parent_id INTEGER REFERENCES compositions(id),
+    prompt TEXT,
+    path TEXT,
+    created REAL NOT NULL,
+    data TEXT NOT NULL,
+    UNIQUE (name, version)
+);
+CREATE INDEX IF NOT EXISTS compositions_bpm ON compositions(bpm);
+CREATE INDEX IF NOT EXISTS compositions_parent ON compositions(parent_id);
+CREATE INDEX IF NOT EXISTS compositions_path ON compositions(path);
+
+CREATE TABLE IF NOT EXISTS patterns (
+    composition_id INTEGER NOT NULL REFERENCES compositions(id),
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    note INTEGER NOT NULL,
+    channel INTEGER NOT NULL,
+    divisions INTEGER NOT NULL,
+    triplet INTEGER NOT NULL,
+    bars INTEGER NOT NULL,
+    hit_count INTEGER NOT NULL,
+    density REAL NOT NULL,
+    PRIMARY KEY (composition_id, position)
+);
+CREATE INDEX IF NOT EXISTS patterns_note ON patterns(note);
+CREATE INDEX IF NOT EXISTS patterns_channel ON patterns(channel);
+CREATE INDEX IF NOT EXISTS patterns_name ON patterns(name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS patterns_density ON patterns(density);
+
+-- Rhythm fingerprints (float32 bytes) for similarity search
+CREATE TABLE IF NOT EXISTS fingerprints (
+    composition_id INTEGER PRIMARY KEY REFERENCES compositions(id),
+    vector BLOB NOT NULL
+);
+
+-- Latest version per name, so allocating the next one is a single upsert
+CREATE TABLE IF NOT EXISTS versions (
+    name TEXT PRIMARY KEY,
+    latest INTEGER NOT NULL
+);
+"""
+
+
+def _like_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+@dataclass
+class LibraryEntry:
+    id: int
+    name: str
+    version: int
+    bpm: int
+    parent_id: Optional[int]
+    prompt: Optional[str]
+    path: Optional[str]
+    created: float
+    data: str
+
+    @property
+    def composition(self) -> Composition:
+        return Composition.from_dict(json.loads(self.data))
+
+
+_COLUMNS = "id, name, version, bpm, parent_id, prompt, path, created, data"
+
+
+class PatternLibrary:
+    """Indexed store of generated compositions with versions and lineage"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        if str(path) != ":memory:":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), timeout=30, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(
+        self,
+        composition: Composition,
+        name: str,
+        parent_id: Optional[int] = None,
+        prompt: Optional[str] = None,
+        path: Optional[Path] = None,
+    ) -> LibraryEntry:
+        """Store a composition as the next version of ``name``"""
+        data = json.dumps(composition.to_dict(), separators=(",", ":"))
+        path = str(Path(path).resolve()) if path is not None else None
+        created = time.time()
+
+        db = self._db
+        # IMMEDIATE takes the write lock up front so concurrent writers
+        # never allocate the same version
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute(
+                "INSERT INTO versions (name, latest) VALUES (?, 1) "
+                "ON CONFLICT(name) DO UPDATE SET latest = latest + 1",
+                (name,),
+            )
+            (version,) = db.execute(
+                "SELECT latest FROM versions WHERE name = ?", (name,)
+            ).fetchone()
+            cursor = db.execute(
+                "INSERT INTO compositions "
+                "(name, version, bpm, parent_id, prompt, path, created, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    name,
+                    version,
+                    composition.config.bpm,
+                    parent_id,
+                    prompt,
+                    path,
+                    created,
+                    data,
+                ),
+            )
+            entry_id = cursor.lastrowid
+            db.executemany(
+                "INSERT INTO patterns VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        entry_id,
+                        position,
+                        pattern.name,
+                        pattern.note,
+                        pattern.channel,
+                        pattern.divisions,
+                        int(pattern.triplet),
+                        pattern.bars,
+                        pattern.hit_count,
+                        pattern.hit_count / max(pattern.hit_length, 1),
+                    )
+                    for position, pattern in enumerate(composition.patterns)
+                ],
+            )
+            db.execute(
+                "INSERT INTO fingerprints VALUES (?, ?)",
+                (entry_id, fingerprint(composition).tobytes()),
+            )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+        return LibraryEntry(
+            entry_id,
+            name,
+            version,
+            composition.config.bpm,
+            parent_id,
+            prompt,
+            path,
+            created,
+            data,
+        )
+
+    def _entries(self, sql: str, params=()) -> list[LibraryEntry]:
+        return [LibraryEntry(*row) for row in self._db.execute(sql, params)]
+
+    def get(self, entry_id: int) -> Optional[LibraryEntry]:
+        entries = self._entries(
+            f"SELECT {_COLUMNS} FROM compositions WHERE id = ?", (entry_id,)
+        )
+        return entries[0] if entries else None
+
+    def latest(self, name: str) -> Optional[LibraryEntry]:
+        entries = self._entries(
+            f"SELECT {_COLUMNS} FROM compositions WHERE name = ? "
+            "ORDER BY version DESC LIMIT 1",
+            (name,),
+        )
+        return entries[0] if entries else None
+
+    def find_by_path(self, path: Path) -> Optional[LibraryEntry]:
+        entries = self._entries(
+            f"SELECT {_COLUMNS} FROM compositions WHERE path = ? "
+            "ORDER BY id DESC LIMIT 1",
+            (str(Path(path).resolve()),),
+        )
+        return entries[0] if entries else None
+
+    def lineage(self, entry_id: int) -> list[LibraryEntry]:
+        """The entry followed by its parent, grandparent and so on"""
+        return self._entries(
+            f"""
+            WITH RECURSIVE ancestors(id, depth) AS (
+                SELECT id, 0 FROM compositions WHERE id = ?
+                UNION ALL
+                SELECT c.parent_id, a.depth + 1
+                FROM compositions c JOIN ancestors a ON c.id = a.id
+                WHERE c.parent_id IS NOT NULL
+            )
+            SELECT {", ".join("c." + column for column in _COLUMNS.split(", "))}
+            FROM ancestors a JOIN compositions c ON c.id = a.id
+            ORDER BY a.depth
+            """,
+            (entry_id,),
+        )
+
+    def children(self, entry_id: int) -> list[LibraryEntry]:
+        return self._entries(
+            f"SELECT {_COLUMNS} FROM compositions WHERE parent_id = ? ORDER BY id",
+            (entry_id,),
+        )
+
+    def fingerprints(self, after: int = 0) -> list[tuple[int, np.ndarray]]:
+        """(id, fingerprint) of every entry with an id above ``after``"""
+        rows = self._db.execute(
+            "SELECT c.id, f.vector, c.data FROM compositions c "
+            "LEFT JOIN fingerprints f ON f.composition_id = c.id "
+            "WHERE c.id > ? ORDER BY c.id",
+            (after,),
+        ).fetchall()
+
+        # Entries stored before fingerprints existed are filled in on first use
+        missing = [
+            (entry_id, fingerprint(Composition.from_dict(json.loads(data))))
+            for entry_id, vector, data in rows
+            if vector is None
+        ]
+        if missing:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO fingerprints VALUES (?, ?)",
+                [(entry_id, vector.tobytes()) for entry_id, vector in missing],
+            )
+        computed = dict(missing)
+
+        return [
+            (
+                entry_id,
+                (
+                    computed[entry_id]
+                    if vector is None
+                    else np.frombuffer(vector, dtype=np.float32)
+                ),
+            )
+            for entry_id, vector, _ in rows
+        ]
+
+    def query(
+        self,
+        bpm_min: Optional[int] = None,
+        bpm_max: Optional[int] = None,
+        name: Optional[str] = None,
+        note: Optional[int] = None,
+        channel: Optional[int] = None,
+        pattern_name: Optional[str] = None,
+        triplet: Optional[bool] = None,
+        min_density: Optional[float] = None,
+        max_density: Optional[float] = None,
+        limit: Optional[int] = None,
+    ) -> list[LibraryEntry]:
+        """Find compositions by tempo and name. Pattern filters (note, channel,
+        pattern name, triplet, density) must all match the same pattern; the
+        pattern name matches anywhere in the name, case-insensitively."""
+        where, params = [], []
+        if bpm_min is not None:
+            where.append("bpm >= ?")
+            params.append(bpm_min)
+        if bpm_max is not None:
+            where.append("bpm <= ?")
+            params.append(bpm_max)
+        if name is not None:
+            where.append("name = ?")
+            params.append(name)
+
+        pattern_where = []
+        if note is not None:
+            pattern_where.append("p.note = ?")
+            params.append(note)
+        if channel is not None:
+            pattern_where.append("p.channel = ?")
+            params.append(channel)
+        if pattern_name is not None:
+            pattern_where.append("p.name LIKE '%' || ? || '%' ESCAPE '\\'")
+            params.append(_like_escape(pattern_name))
+        if triplet is not None:
+            pattern_where.append("p.triplet = ?")
+            params.append(int(triplet))
+        if min_density is not None:
+            pattern_where.append("p.density >= ?")
+            params.append(min_density)
+        if max_density is not None:
+            pattern_where.append("p.density <= ?")
+            params.append(max_density)
+        if pattern_where:
+            # An uncorrelated subquery lets SQLite drive it from the pattern
+            # indexes instead of probing every composition
+            where.append(
+                "c.id IN (SELECT p.composition_id FROM patterns p WHERE "
+                + " AND ".join(pattern_where)
+                + ")"
+            )
+
+        sql = f"SELECT {_COLUMNS} FROM compositions c"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self._entries(sql, params)
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM compositions").fetchone()[0]
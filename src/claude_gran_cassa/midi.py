@@ -1,51 +1,253 @@
-from midiutil import MIDIFile
+import time
+from os import PathLike
+from typing import Any, BinaryIO, Callable, Optional, Union
+from .arrangement import Arrangement
+from .clock import (
+    CLOCK,
+    CONTINUE,
+    START,
+    STOP,
+    ClockStats,
+    pulse_offsets,
+    song_position,
+)
 from .models import Composition
+from .playback import Player
+from .smf import StreamingSMF, encode_smf, tempo_data, time_signature_data
+from .timeline import Timeline, compile_timeline
+from .tracing import span, tracer
 
 
 class MIDIConverter:
     def __init__(self, ppqn: int = 480):
         self.ppqn = ppqn  # Pulses Per Quarter Note - high resolution for triplets
 
-    def convert(self, composition: Composition, filename: str):
-        midi = MIDIFile(1)  # Single track
-        track = 0
-        time = 0
+    def to_bytes(
+        self, composition: Composition, loops: int = 1, split_tracks: bool = True
+    ) -> bytes:
+        """Encode a composition as a Standard MIDI File in memory, with one
+        track per pattern unless ``split_tracks`` is off"""
+        timeline = compile_timeline(composition, self.ppqn)
+        names = [pattern.name for pattern in composition.patterns]
+        return encode_smf(
+            timeline,
+            time_signature=composition.config.time_signature,
+            loops=loops,
+            track_names=names if split_tracks else None,
+        )
 
-        midi.addTempo(track, time, composition.config.bpm)
+    def convert(
+        self,
+        composition: Composition,
+        filename: Optional[str] = None,
+        loops: int = 1,
+        split_tracks: bool = True,
+    ) -> bytes:
+        """Encode a composition, writing it to ``filename`` if given"""
+        data = self.to_bytes(composition, loops, split_tracks)
+        if filename is not None:
+            with open(filename, "wb") as f:
+                f.write(data)
+        return data
 
-        for pattern in composition.patterns:
-            if pattern.triplet:
-                beat_length = self.ppqn * 4  # Length of a whole note in ticks
-                division_length = beat_length // (pattern.divisions // pattern.bars)
-                division_length = int(division_length * 2 / 3)  # Adjust for triplet
+    def write_arrangement(
+        self, arrangement: Arrangement, output: Union[str, BinaryIO], start_bar: int = 0
+    ):
+        """Stream an arrangement into a single-track MIDI file one loop at a
+        time, with tempo and time signature changes between sections.
+        ``output`` is a filename or a seekable binary file."""
+        if isinstance(output, (str, PathLike)):
+            with open(output, "wb") as f:
+                return self.write_arrangement(arrangement, f, start_bar)
+
+        smf = StreamingSMF(output, arrangement.ppqn)
+        origin = None
+        bpm = time_signature = None
+        for segment in arrangement.segments(start_bar):
+            if origin is None:
+                origin = segment.tick + segment.skip
+            start = max(segment.tick - origin, 0)
+            config = arrangement.sections[segment.section].composition.config
+            if config.bpm != bpm:
+                bpm = config.bpm
+                smf.meta(0x51, tempo_data(bpm), start)
+            if config.time_signature != time_signature:
+                time_signature = config.time_signature
+                smf.meta(0x58, time_signature_data(time_signature), start)
+
+            hits = segment.hits()
+            smf.events(
+                until=segment.end_tick - origin,
+                tick=hits.tick - origin,
+                channel=hits.channel,
+                note=hits.note,
+                velocity=hits.velocity,
+                pan=hits.pan,
+                duration=hits.duration,
+            )
+        smf.close(arrangement.length - (origin or 0))
+
+
+class MIDIPlayer(Player):
+    """Send compiled events straight to a MIDI output device.
+
+    Events due within the next ``horizon_ms`` are written in one timestamped
+    ``write()`` call and PortMidi delivers them on time, so the scheduler
+    only wakes once per horizon instead of once per note.
+
+    With ``send_clock`` the player is also a MIDI clock master: 24 PPQN
+    clock pulses travel in the same event stream as the notes, playback
+    opens with Start (or Song Position and Continue when an arrangement
+    starts mid-way) and ends with Stop. ``clock_stats`` tracks how far the
+    pulses leave from their perf_counter_ns due times.
+    """
+
+    MAX_BATCH = 1024  # PortMidi's limit for a single write()
+
+    def __init__(
+        self,
+        device_id: Optional[int] = None,
+        horizon_ms: float = 20.0,
+        ppqn: int = 480,
+        output=None,
+        clock: Optional[Callable[[], int]] = None,
+        send_clock: bool = False,
+        timer: Callable[[], int] = time.perf_counter_ns,
+        sleep: Optional[Callable[[float], Any]] = None,
+    ):
+        super().__init__(lookahead_ms=horizon_ms, ppqn=ppqn, timer=timer, sleep=sleep)
+        self.send_clock = send_clock
+        self.clock_stats = ClockStats()
+        self._owns_output = output is None
+        if output is None or clock is None:
+            import pygame.midi  # Deferred: pygame is slow to import
+        if output is None:
+            with span("engine.init", backend="midi"):
+                pygame.midi.init()
+                if device_id is None:
+                    device_id = pygame.midi.get_default_output_device_id()
+                if device_id == -1:
+                    pygame.midi.quit()
+                    raise ValueError("No MIDI output device available")
+                try:
+                    # Non-zero latency makes PortMidi honour the event timestamps
+                    output = pygame.midi.Output(device_id, latency=1)
+                except pygame.midi.MidiException:
+                    pygame.midi.quit()
+                    raise
+        self.output = output
+        self.clock = clock or pygame.midi.time
+        self._channels = set()
+        self._reference = (0, 0)
+        self._written_until = 0  # Latest timestamp handed to the output
+
+    def _prepare(self, timeline: Timeline):
+        ns_per_tick = timeline.seconds_per_tick * 1e9
+        events = []
+        for tick, channel, note, duration, velocity, pan in zip(
+            timeline.tick.tolist(),
+            timeline.channel.tolist(),
+            timeline.note.tolist(),
+            timeline.duration.tolist(),
+            timeline.velocity.tolist(),
+            timeline.pan.tolist(),
+        ):
+            start = round(tick * ns_per_tick)
+            events.append((start, 0, [0xB0 | channel, 10, pan]))  # Pan control
+            events.append((start, 1, [0x90 | channel, note, velocity]))
+            end = round((tick + duration) * ns_per_tick)
+            events.append((end, 2, [0x80 | channel, note, 0]))
+            self._channels.add(channel)
+        if self.send_clock:
+            # Pulses go out ahead of any notes due at the same time
+            events.extend(
+                (offset, -1, [CLOCK]) for offset in pulse_offsets(timeline).tolist()
+            )
+        events.sort(key=lambda event: event[:2])
+        return [(offset, message) for offset, _, message in events]
+
+    def _events(self, composition: Composition):
+        if self.send_clock:
+            yield 0, [START]
+        yield from super()._events(composition)
+
+    def _arrangement_events(self, arrangement: Arrangement, start_bar: int):
+        if self.send_clock:
+            if start_bar:
+                yield 0, song_position(start_bar)
+                yield 0, [CONTINUE]
             else:
-                # Regular timing
-                beat_length = self.ppqn * 4
-                division_length = beat_length // (pattern.divisions // pattern.bars)
-
-            hit_index = 0
-            for i, hit in enumerate(pattern.hits):
-                if hit == "1":
-                    tick_time = time + (i * division_length)
-                    midi.addNote(
-                        track=track,
-                        channel=pattern.channel - 1,  # MIDI channels are 0-based
-                        pitch=pattern.note,
-                        time=tick_time / self.ppqn,  # Convert ticks to beats
-                        duration=division_length
-                        / self.ppqn
-                        / 2,  # Short duration for percussion
-                        volume=pattern.velocities[hit_index],
-                    )
-                    # Pan control
-                    midi.addControllerEvent(
-                        track=track,
-                        channel=pattern.channel - 1,
-                        time=tick_time / self.ppqn,
-                        controller_number=10,  # Pan controller
-                        parameter=pattern.panning[hit_index],
-                    )
-                    hit_index += 1
-
-        with open(filename, "wb") as f:
-            midi.writeFile(f)
+                yield 0, [START]
+        yield from super()._arrangement_events(arrangement, start_bar)
+
+    def _pair_clocks(self, start_ns: Optional[int]) -> int:
+        # Pair the scheduler clock with PortMidi's millisecond clock
+        self._reference = (self.scheduler.timer(), self.clock())
+        self._written_until = self._reference[1]
+        return self._reference[0] if start_ns is None else start_ns
+
+    def start(
+        self,
+        composition: Composition,
+        loop: bool = False,
+        start_ns: Optional[int] = None,
+    ):
+        start_ns = self._pair_clocks(start_ns)
+        super().start(composition, loop=loop, start_ns=start_ns)
+
+    def start_arrangement(
+        self,
+        arrangement: Arrangement,
+        start_bar: int = 0,
+        start_ns: Optional[int] = None,
+    ):
+        start_ns = self._pair_clocks(start_ns)
+        super().start_arrangement(arrangement, start_bar, start_ns=start_ns)
+
+    def _dispatch(self, batch):
+        reference_ns, reference_ms = self._reference
+        events = [
+            [message, reference_ms + (due - reference_ns) // 1_000_000]
+            for due, message in batch
+        ]
+        self._written_until = max(self._written_until, events[-1][1])
+        for i in range(0, len(events), self.MAX_BATCH):
+            chunk = events[i : i + self.MAX_BATCH]
+            self.output.write(chunk)
+            if self.send_clock:
+                self._measure(batch[i : i + self.MAX_BATCH], chunk)
+
+    def _measure(self, batch, events):
+        """Record when each pulse of a chunk just written leaves: when the
+        write returned, or later at its timestamp on the output clock. Slow
+        writes count as error, as does any drift between the two clocks
+        since they were paired."""
+        written_ns, written_ms = self.scheduler.timer(), self.clock()
+        for (due, message), (_, timestamp) in zip(batch, events):
+            if message[0] == CLOCK:
+                sent = written_ns + max(timestamp - written_ms, 0) * 1_000_000
+                self.clock_stats.record(due, sent)
+
+    def stop(self):
+        super().stop()
+        # All notes off on every channel we played. Events already written
+        # ahead still go out, so stop after the last of them rather than
+        # now, or a note in the horizon would start after All Notes Off
+        now = max(self.clock(), self._written_until)
+        events = [[[0xB0 | channel, 123, 0], now] for channel in self._channels]
+        if self.send_clock:
+            events.insert(0, [[STOP], now])
+        if events:
+            self.output.write(events)
+
+    def close(self):
+        super().close()
+        if len(self.clock_stats):
+            tracer.gauge("clock.pulses", len(self.clock_stats))
+            tracer.gauge("clock.drift_ppm", self.clock_stats.drift_ppm)
+            tracer.gauge("clock.jitter_ms", self.clock_stats.jitter_ns / 1e6)
+        if self._owns_output:
+            import pygame.midi
+
+            self.output.close()
+            pygame.midi.quit()
@@ -1,39 +1,180 @@
+from array import array
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Iterable, List, Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class SongConfig:
     bpm: int = 130
     time_signature: tuple[int, int] = (4, 4)
     swing_amount: float = 0.0
 
 
-@dataclass
+# Bits of every byte value, least significant first, for unpacking hit masks
+_BYTE_BITS = [tuple((byte >> i) & 1 for i in range(8)) for byte in range(256)]
+_BINARY_DIGITS = bytes.maketrans(b"\x00\x01", b"01")
+
+
+def _pack_hits(hits: List[int]) -> int:
+    try:
+        # Fast path for plain 0/1 lists: reverse so step 0 is the lowest bit
+        digits = bytes(hits)[::-1].translate(_BINARY_DIGITS)
+        return int(digits, 2) if digits else 0
+    except (TypeError, ValueError):
+        mask = 0
+        for i, hit in enumerate(hits):
+            if hit:
+                mask |= 1 << i
+        return mask
+
+
+def _byte_array(values: Iterable[int], field: str) -> array:
+    """Pack MIDI data values (0-127) into a byte array"""
+    try:
+        packed = array("B", bytes(values))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Pattern {field} must be integers 0-127: {e}")
+    if packed and max(packed) > 127:
+        raise ValueError(f"Pattern {field} must be integers 0-127, got {max(packed)}")
+    return packed
+
+
 class Pattern:
-    # Core rhythm properties
-    hits: List[int]  # 1 for hit, 0 for rest
-    divisions: int = 16
-    triplet: bool = False
-
-    # Sound properties
-    channel: int = 1
-    note: int = 36
-
-    # Expression properties
-    velocities: Optional[List[int]] = None  # 0-127 for each hit
-    panning: Optional[List[int]] = None  # 0-127 for each hit (64 = center)
-
-    # Metadata
-    name: str = ""
-    bars: int = 1
-
-    def __post_init__(self):
-        hit_count = sum(self.hits)
-        if self.velocities is None:
-            self.velocities = [100] * hit_count
-        if self.panning is None:
-            self.panning = [64] * hit_count
+    """One instrument's rhythm.
+
+    Hits are stored as an integer bitmask (bit i set = hit on step i) and
+    velocities/panning as byte arrays, which keeps large in-memory libraries
+    small. ``hits``, ``velocities`` and ``panning`` still read and assign as
+    lists of ints; ``velocity_bytes`` and ``pan_bytes`` expose the packed
+    arrays for zero-copy use.
+    """
+
+    __slots__ = (
+        "_hit_mask",
+        "_hit_length",
+        "_hit_count",
+        "divisions",
+        "triplet",
+        "channel",
+        "note",
+        "_velocities",
+        "_panning",
+        "name",
+        "bars",
+    )
+
+    def __init__(
+        self,
+        # Core rhythm properties
+        hits: List[int],  # 1 for hit, 0 for rest
+        divisions: int = 16,
+        triplet: bool = False,
+        # Sound properties
+        channel: int = 1,
+        note: int = 36,
+        # Expression properties
+        velocities: Optional[List[int]] = None,  # 0-127 for each hit
+        panning: Optional[List[int]] = None,  # 0-127 for each hit (64 = center)
+        # Metadata
+        name: str = "",
+        bars: int = 1,
+    ):
+        mask = _pack_hits(hits)
+        hit_count = mask.bit_count()
+        self._hit_mask = mask
+        self._hit_length = len(hits)
+        self._hit_count = hit_count
+        self.divisions = divisions
+        self.triplet = triplet
+        self.channel = channel
+        self.note = note
+        self._velocities = _byte_array(
+            velocities if velocities is not None else [100] * hit_count, "velocities"
+        )
+        self._panning = _byte_array(
+            panning if panning is not None else [64] * hit_count, "panning"
+        )
+        self.name = name
+        self.bars = bars
+
+    @property
+    def hits(self) -> List[int]:
+        length = self._hit_length
+        hits = []
+        for byte in self._hit_mask.to_bytes((length + 7) // 8, "little"):
+            hits += _BYTE_BITS[byte]
+        del hits[length:]
+        return hits
+
+    @hits.setter
+    def hits(self, hits: List[int]):
+        mask = _pack_hits(hits)
+        self._hit_mask = mask
+        self._hit_length = len(hits)
+        self._hit_count = mask.bit_count()
+
+    @property
+    def hit_mask(self) -> int:
+        return self._hit_mask
+
+    @property
+    def hit_length(self) -> int:
+        return self._hit_length
+
+    @property
+    def hit_count(self) -> int:
+        return self._hit_count
+
+    @property
+    def velocities(self) -> List[int]:
+        return self._velocities.tolist()
+
+    @velocities.setter
+    def velocities(self, values: Iterable[int]):
+        self._velocities = _byte_array(values, "velocities")
+
+    @property
+    def panning(self) -> List[int]:
+        return self._panning.tolist()
+
+    @panning.setter
+    def panning(self, values: Iterable[int]):
+        self._panning = _byte_array(values, "panning")
+
+    @property
+    def velocity_bytes(self) -> array:
+        return self._velocities
+
+    @property
+    def pan_bytes(self) -> array:
+        return self._panning
+
+    def _key(self) -> tuple:
+        return (
+            self._hit_mask,
+            self._hit_length,
+            self.divisions,
+            self.triplet,
+            self.channel,
+            self.note,
+            self._velocities,
+            self._panning,
+            self.name,
+            self.bars,
+        )
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Pattern):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __repr__(self) -> str:
+        return (
+            f"Pattern(hits={self.hits}, divisions={self.divisions}, "
+            f"triplet={self.triplet}, channel={self.channel}, note={self.note}, "
+            f"velocities={self._velocities.tolist()}, "
+            f"panning={self._panning.tolist()}, name={self.name!r}, bars={self.bars})"
+        )
 
     def to_dict(self) -> dict:
         return {
@@ -42,8 +183,8 @@ class Pattern:
             "triplet": self.triplet,
             "channel": self.channel,
             "note": self.note,
-            "velocities": self.velocities,
-            "panning": self.panning,
+            "velocities": self._velocities.tolist(),
+            "panning": self._panning.tolist(),
             "name": self.name,
             "bars": self.bars,
         }
@@ -63,7 +204,7 @@ class Pattern:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class Composition:
     config: SongConfig
     patterns: List[Pattern]
@@ -1,5 +1,7 @@
 import json
+from typing import Optional, Union
 from .models import Composition, Pattern, SongConfig
+from .validation import Issue, check_composition, check_config, check_pattern
 
 
 class ResponseParser:
@@ -12,36 +14,135 @@ class ResponseParser:
             return int((pan_value + 100) * (127 / 200))
         raise ValueError(f"Unexpected pan value: {pan_value}")
 
-    @classmethod
-    def parse(cls, response: str) -> Composition:
-        """Parse Claude's response into a Composition"""
-        try:
-            data = json.loads(response.strip())
+    @staticmethod
+    def parse_config(data: dict) -> SongConfig:
+        return SongConfig(
+            bpm=data["bpm"],
+            time_signature=tuple(data["time_signature"]),
+            swing_amount=data.get("swing_amount", 0.0),
+        )
 
-            config = SongConfig(
-                bpm=data["config"]["bpm"],
-                time_signature=tuple(data["config"]["time_signature"]),
-                swing_amount=data["config"].get("swing_amount", 0.0),
-            )
+    @classmethod
+    def parse_pattern(cls, p: dict) -> Pattern:
+        return Pattern(
+            hits=p["hits"],
+            divisions=p["divisions"],
+            triplet=p.get("triplet", False),
+            channel=p["channel"],
+            note=p["note"],
+            velocities=p["velocities"],
+            panning=[cls.normalize_pan(pan) for pan in p["panning"]],
+            name=p["name"],
+            bars=p.get("bars", 1),
+        )
 
-            patterns = [
-                Pattern(
-                    hits=p["hits"],
-                    divisions=p["divisions"],
-                    triplet=p.get("triplet", False),
-                    channel=p["channel"],
-                    note=p["note"],
-                    velocities=p["velocities"],
-                    panning=[cls.normalize_pan(pan) for pan in p["panning"]],
-                    name=p["name"],
-                    bars=p.get("bars", 1),
-                )
-                for p in data["patterns"]
-            ]
-
-            return Composition(config=config, patterns=patterns)
-
-        except Exception as e:
+    @staticmethod
+    def load(response: str, start: str = "{", end: str = "}"):
+        """Decode the outermost JSON value in a response, ignoring any text
+        around it"""
+        first = response.find(start)
+        last = response.rfind(end) + 1
+        try:
+            if first == -1 or last == 0:
+                raise ValueError("No JSON found in response")
+            return json.loads(response[first:last])
+        except ValueError as e:
             raise ValueError(
                 f"Failed to parse Claude's response: {str(e)}\nResponse: {response}"
             )
+
+    @classmethod
+    def parse_data(
+        cls, data: dict, repairs: Optional[list[Issue]] = None
+    ) -> Composition:
+        """Validate and repair decoded response JSON, then build the model"""
+        found = check_composition(data)
+        if repairs is not None:
+            repairs.extend(found)
+
+        config = cls.parse_config(data["config"])
+        patterns = [cls.parse_pattern(p) for p in data["patterns"]]
+        return Composition(config=config, patterns=patterns)
+
+    @classmethod
+    def parse(cls, response: str, repairs: Optional[list[Issue]] = None) -> Composition:
+        """Parse Claude's response into a Composition. The JSON is decoded
+        once; fixable schema problems are repaired and appended to
+        ``repairs``, anything else raises ValidationError."""
+        return cls.parse_data(cls.load(response), repairs)
+
+
+class IncrementalParser:
+    """Parse a response as it streams in, emitting the config and each pattern
+    as soon as its JSON object closes. Text around the top-level object is
+    ignored, as in ResponseParser.load."""
+
+    def __init__(self):
+        self._buffer = ""
+        self._position = 0
+        self._in_string = False
+        self._escaped = False
+        self._string_start = 0
+        self._last_string = None
+        # One entry per open container: [kind, current key, start offset]
+        self._stack = []
+        self._patterns = 0
+        self.done = False
+
+    def _path(self) -> list:
+        return [entry[1] for entry in self._stack]
+
+    def feed(self, chunk: str) -> list[Union[SongConfig, Pattern]]:
+        self._buffer += chunk
+        items = []
+        buffer = self._buffer
+        stack = self._stack
+
+        for i in range(self._position, len(buffer)):
+            if self.done:
+                break
+            char = buffer[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    self._last_string = buffer[self._string_start : i + 1]
+                continue
+            if not stack and char != "{":
+                continue  # Preamble before the top-level object
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = i
+            elif char == ":":
+                stack[-1][1] = json.loads(self._last_string)
+            elif char in "{[":
+                stack.append(["object" if char == "{" else "array", None, i])
+            elif char in "}]":
+                _, _, start = stack.pop()
+                item = self._complete(buffer[start : i + 1])
+                if item is not None:
+                    items.append(item)
+                if not stack:
+                    self.done = True
+            elif char == "," and stack[-1][0] == "object":
+                stack[-1][1] = None
+
+        self._position = len(buffer)
+        return items
+
+    def _complete(self, text: str) -> Optional[Union[SongConfig, Pattern]]:
+        path = self._path()
+        if path == ["config"]:
+            data = json.loads(text)
+            check_config(data)
+            return ResponseParser.parse_config(data)
+        if path == ["patterns", None]:
+            data = json.loads(text)
+            check_pattern(data, f"/patterns/{self._patterns}")
+            self._patterns += 1
+            return ResponseParser.parse_pattern(data)
+        return None
@@ -0,0 +1,81 @@
+import copy
+from typing import Any
+
+
+class PatchError(ValueError):
+    pass
+
+
+def _parse_pointer(path: str) -> list[str]:
+    """Split a JSON Pointer (RFC 6901) into unescaped reference tokens"""
+    if path == "":
+        return []
+    if not path.startswith("/"):
+        raise PatchError(f"Invalid path: {path!r}")
+    return [
+        token.replace("~1", "/").replace("~0", "~") for token in path[1:].split("/")
+    ]
+
+
+def _index(container: list, token: str, allow_end: bool = False) -> int:
+    if allow_end and token == "-":
+        return len(container)
+    if not token.isdigit():
+        raise PatchError(f"Invalid list index: {token!r}")
+    index = int(token)
+    limit = len(container) + (1 if allow_end else 0)
+    if index >= limit:
+        raise PatchError(f"List index out of range: {index}")
+    return index
+
+
+def _resolve(document: Any, tokens: list[str]) -> Any:
+    for token in tokens:
+        if isinstance(document, list):
+            document = document[_index(document, token)]
+        elif isinstance(document, dict):
+            if token not in document:
+                raise PatchError(f"Path not found: {token!r}")
+            document = document[token]
+        else:
+            raise PatchError(f"Cannot descend into {type(document).__name__}")
+    return document
+
+
+def apply_patch(document: dict, operations: list[dict]) -> dict:
+    """Apply JSON Patch (RFC 6902) add/remove/replace operations to a copy"""
+    document = copy.deepcopy(document)
+    for operation in operations:
+        if not isinstance(operation, dict):
+            raise PatchError(f"Invalid operation: {operation!r}")
+        op = operation.get("op")
+        if op not in ("add", "remove", "replace"):
+            raise PatchError(f"Unsupported operation: {op!r}")
+        tokens = _parse_pointer(operation.get("path", ""))
+        if not tokens:
+            raise PatchError("Operations on the whole document are not allowed")
+        if op != "remove" and "value" not in operation:
+            raise PatchError(f"Missing value for {op} at {operation['path']}")
+
+        parent = _resolve(document, tokens[:-1])
+        token = tokens[-1]
+        value = copy.deepcopy(operation.get("value"))
+
+        if isinstance(parent, list):
+            if op == "add":
+                parent.insert(_index(parent, token, allow_end=True), value)
+            elif op == "remove":
+                del parent[_index(parent, token)]
+            else:
+                parent[_index(parent, token)] = value
+        elif isinstance(parent, dict):
+            if op != "add" and token not in parent:
+                raise PatchError(f"Path not found: {operation['path']}")
+            if op == "remove":
+                del parent[token]
+            else:
+                parent[token] = value
+        else:
+            raise PatchError(f"Cannot modify {type(parent).__name__}")
+
+    return document
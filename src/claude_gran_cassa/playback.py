@@ -0,0 +1,210 @@
+import bisect
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from .arrangement import Arrangement
+from .models import Composition
+from .scheduler import Scheduler
+from .timeline import Timeline, compile_timeline
+from .tracing import span, tracer
+
+
+class Player:
+    """Long-lived playback on one Scheduler clock.
+
+    Subclasses turn a compiled timeline into per-event payloads once
+    (``_prepare``) and send batches of them to their output (``_dispatch``).
+    Loops are generated lazily from the prepared events, each offset by the
+    previous loop's length, so loop N+1 is queued before loop N ends and
+    repeats cost no recompilation.
+    """
+
+    def __init__(
+        self,
+        lookahead_ms: float = 0.0,
+        ppqn: int = 480,
+        timer: Callable[[], int] = time.perf_counter_ns,
+        sleep: Optional[Callable[[float], Any]] = None,
+    ):
+        self.ppqn = ppqn
+        self.scheduler = Scheduler(
+            self._send, lookahead_ms=lookahead_ms, timer=timer, sleep=sleep
+        )
+        self._lock = threading.Lock()
+        self._queued: Optional[Composition] = None
+        self._queued_at_bar = False
+        self._looping = False
+        self._prepared: Optional[tuple[Timeline, list, list]] = None
+
+    def _prepare(self, timeline: Timeline) -> list[tuple[int, Any]]:
+        raise NotImplementedError
+
+    def _dispatch(self, batch: list[tuple[int, Any]]):
+        raise NotImplementedError
+
+    def _send(self, batch: list[tuple[int, Any]]):
+        batch = [event for event in batch if event[1] is not None]
+        if batch:
+            self._dispatch(batch)
+
+    def _load(self, composition: Composition) -> tuple[Timeline, list, list]:
+        return self._load_timeline(compile_timeline(composition, self.ppqn))
+
+    def _load_timeline(self, timeline: Timeline) -> tuple[Timeline, list, list]:
+        """(timeline, prepared events, bar cuts), prepared once per timeline"""
+        if self._prepared is None or self._prepared[0] is not timeline:
+            events = self._prepare(timeline)
+            self._prepared = (timeline, events, self._bars(timeline, events))
+        return self._prepared
+
+    @staticmethod
+    def _ns(timeline: Timeline, ticks: int) -> int:
+        return round(ticks * timeline.seconds_per_tick * 1e9)
+
+    def _bars(self, timeline: Timeline, events: list) -> list[tuple[int, int, int]]:
+        """(bar offset, first event, end event) for every bar of a loop"""
+        starts = [
+            self._ns(timeline, tick)
+            for tick in range(0, timeline.length, timeline.ppqn * 4)
+        ]
+        offsets = [event_offset for event_offset, _ in events]
+        cuts = [0, *(bisect.bisect_left(offsets, s) for s in starts[1:]), len(events)]
+        return [(start, cuts[i], cuts[i + 1]) for i, start in enumerate(starts)]
+
+    def _reload(self, timeline: Timeline) -> tuple[Timeline, list, list]:
+        # The prepared payloads were dropped while playing (a subclass swapped
+        # what they refer to, like a sound bank): prepare the loop again
+        return self._load_timeline(timeline)
+
+    def _take_bar_swap(self) -> Optional[Composition]:
+        with self._lock:
+            if self._queued is None or not self._queued_at_bar:
+                return None
+            queued, self._queued = self._queued, None
+            return queued
+
+    def _events(self, composition: Composition):
+        timeline, events, bars = self._load(composition)
+        offset = 0
+        while timeline.length:
+            if self._prepared is None:
+                timeline, events, bars = self._reload(timeline)
+            if not events:
+                yield offset, None  # Keep the clock moving through silent loops
+
+            queued = None
+            for bar in range(len(bars)):
+                bar_offset, first, end = bars[bar]
+                if bar_offset:
+                    # A bar line inside the loop: wake up on it, so a swap
+                    # queued for the next bar lands exactly here
+                    yield offset + bar_offset, None
+                    queued = self._take_bar_swap()
+                    if queued is not None:
+                        offset += bar_offset
+                        break
+                    if self._prepared is None:
+                        timeline, events, bars = self._reload(timeline)
+                        bar_offset, first, end = bars[bar]
+                for index in range(first, end):
+                    event_offset, payload = events[index]
+                    yield offset + event_offset, payload
+
+            if queued is None:
+                offset += self._ns(timeline, timeline.length)
+                # Wake on the loop end too, not on the last hit before it,
+                # so a swap queued after that hit still lands on time
+                yield offset, None
+                with self._lock:
+                    queued, self._queued = self._queued, None
+                    looping = self._looping
+                if queued is None and not looping:
+                    return
+            if queued is not None:
+                timeline, events, bars = self._load(queued)
+
+    def _arrangement_events(self, arrangement: Arrangement, start_bar: int):
+        origin = None
+        for segment in arrangement.segments(start_bar):
+            _, events, _ = self._load_timeline(segment.timeline)
+            skip = segment.skip_ns
+            if origin is None:
+                origin = segment.ns + skip
+            offset = segment.ns - origin
+            silent = True
+            for event_offset, payload in events:
+                if event_offset >= skip:
+                    silent = False
+                    yield offset + event_offset, payload
+            if silent:
+                yield offset + skip, None  # Keep the clock moving through silence
+
+    def start_arrangement(
+        self,
+        arrangement: Arrangement,
+        start_bar: int = 0,
+        start_ns: Optional[int] = None,
+    ):
+        """Play an arrangement from ``start_bar``, one loop prepared at a time"""
+        self._looping = False
+        self._queued = None
+        self.scheduler.start(
+            self._arrangement_events(arrangement, start_bar), start_ns=start_ns
+        )
+
+    def start(
+        self,
+        composition: Composition,
+        loop: bool = False,
+        start_ns: Optional[int] = None,
+    ):
+        self._looping = loop
+        self._queued = None
+        self.scheduler.start(self._events(composition), start_ns=start_ns)
+
+    def queue(self, composition: Composition, at_bar: bool = False):
+        """Play ``composition`` from the next loop boundary, or with
+        ``at_bar`` from the next bar line"""
+        with self._lock:
+            self._queued = composition
+            self._queued_at_bar = at_bar
+
+    def finish(self):
+        """Stop looping once the current loop has played out"""
+        with self._lock:
+            self._looping = False
+
+    def wait(self):
+        self.scheduler.join()
+
+    def stop(self):
+        self.scheduler.stop()
+
+    def close(self):
+        if self.scheduler.running:
+            self.stop()
+        stats = self.scheduler.stats
+        if len(stats):
+            tracer.gauge("playback.events", len(stats))
+            tracer.gauge("playback.lateness_p50_ms", stats.p50 / 1e6)
+            tracer.gauge("playback.lateness_p99_ms", stats.p99 / 1e6)
+            tracer.gauge("playback.lateness_max_ms", stats.max / 1e6)
+
+    def play(self, composition: Composition, loop: bool = False):
+        """Play and block until done; Ctrl+C stops looped playback"""
+        with span("playback", loop=loop):
+            self.start(composition, loop=loop)
+            try:
+                self.wait()
+            finally:
+                self.stop()
+
+    def play_arrangement(self, arrangement: Arrangement, start_bar: int = 0):
+        """Play an arrangement through and block until done"""
+        with span("playback", start_bar=start_bar):
+            self.start_arrangement(arrangement, start_bar)
+            try:
+                self.wait()
+            finally:
+                self.stop()
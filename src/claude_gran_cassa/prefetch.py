@@ -0,0 +1,100 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterable, Optional
+
+from .composer import Composer
+from .models import Composition
+from .timeline import content_hash
+
+# Likely next steps after a prompt: the same again, or a nudge either way
+VARIATIONS = (
+    "{prompt}",
+    "{prompt}, but more subtle",
+    "{prompt}, and push it further",
+)
+
+
+def variations(prompt: str) -> list[str]:
+    return [template.format(prompt=prompt) for template in VARIATIONS]
+
+
+class EvolutionPrefetcher:
+    """Evolve a composition ahead of time with likely prompts.
+
+    While a composition plays, ``speculate`` starts up to ``limit``
+    evolutions of it on at most ``workers`` threads. ``evolve`` then returns
+    a matching prefetch (waiting for it if still in flight) or falls back to
+    a direct request. Speculating on a different base composition cancels
+    work for the old one: queued requests never start and results of
+    running ones are dropped.
+    """
+
+    def __init__(self, composer: Composer, workers: int = 2, limit: int = 4):
+        self.composer = composer
+        self.limit = limit
+        self.hits = 0
+        self.misses = 0
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._base: Optional[str] = None
+        self._futures: dict[tuple[str, bool], Future] = {}
+
+    def speculate(
+        self, base: Composition, prompts: Iterable[str], delta: bool = False
+    ) -> int:
+        """Start evolving ``base`` with each prompt; returns how many started"""
+        key = content_hash(base)
+        started = 0
+        with self._lock:
+            if key != self._base:
+                self._cancel()
+                self._base = key
+            for prompt in dict.fromkeys(prompts):  # Unique, in order
+                if len(self._futures) >= self.limit:
+                    break
+                if (prompt, delta) in self._futures:
+                    continue
+                self._futures[prompt, delta] = self._pool.submit(
+                    self.composer.evolve_pattern, base, prompt, delta
+                )
+                started += 1
+        return started
+
+    def _cancel(self):
+        for future in self._futures.values():
+            future.cancel()
+        self._futures = {}
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(not future.done() for future in self._futures.values())
+
+    def evolve(
+        self, base: Composition, prompt: str, delta: bool = False
+    ) -> Composition:
+        """``Composer.evolve_pattern``, served from a prefetch when possible"""
+        with self._lock:
+            future = None
+            if content_hash(base) == self._base:
+                future = self._futures.get((prompt, delta))
+        if future is not None and not future.cancelled():
+            try:
+                composition = future.result()
+            except Exception:
+                pass  # Speculative failures get one direct retry below
+            else:
+                self.hits += 1
+                return composition
+        self.misses += 1
+        return self.composer.evolve_pattern(base, prompt, delta=delta)
+
+    def close(self):
+        with self._lock:
+            self._cancel()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
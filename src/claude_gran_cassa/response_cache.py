@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+
+class ResponseCache:
+    """Validated API responses on disk, addressed by a hash of the request.
+
+    Entries older than ``ttl`` seconds are treated as misses. When the store
+    grows past ``max_bytes`` the least recently used entries are removed.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        max_bytes: int = 100 * 1024 * 1024,
+        ttl: Optional[float] = 30 * 24 * 3600,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+    @staticmethod
+    def key(request: dict) -> str:
+        """Hash of everything that determines the model's answer"""
+        fields = {
+            name: request.get(name)
+            for name in ("model", "system", "messages", "max_tokens")
+        }
+        data = json.dumps(fields, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        try:
+            created, response = entry["created"], entry["response"]
+            if not isinstance(response, str):
+                raise TypeError(response)
+            expired = self.ttl is not None and time.time() - created > self.ttl
+        except (KeyError, TypeError):
+            expired = True  # Malformed: drop it like an expired entry
+        if expired:
+            path.unlink(missing_ok=True)
+            return None
+        os.utime(path)  # Mark as recently used for eviction
+        return response
+
+    def put(self, key: str, response: str):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"created": time.time(), "response": response}, f)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self):
+        for path in self.cache_dir.glob("*.json"):
+            path.unlink(missing_ok=True)
@@ -0,0 +1,139 @@
+import threading
+import time
+from array import array
+from typing import Any, Callable, Iterable, Optional
+
+import numpy as np
+
+
+class LatenessStats:
+    """Per-event dispatch lateness in nanoseconds"""
+
+    def __init__(self):
+        self._samples = array("q")
+
+    def record(self, lateness_ns: int):
+        self._samples.append(lateness_ns)
+
+    def reset(self):
+        self._samples = array("q")
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def _snapshot(self) -> np.ndarray:
+        # Copy first: a live view would stop the scheduler thread appending
+        return np.frombuffer(self._samples[:], dtype=np.int64)
+
+    def percentile(self, q: float) -> int:
+        if not self._samples:
+            return 0
+        return int(np.percentile(self._snapshot(), q))
+
+    @property
+    def p50(self) -> int:
+        return self.percentile(50)
+
+    @property
+    def p99(self) -> int:
+        return self.percentile(99)
+
+    @property
+    def max(self) -> int:
+        return max(self._samples, default=0)
+
+    def histogram(self, bucket_us: int = 100, buckets: int = 10) -> list[int]:
+        """Event counts per lateness bucket; the last bucket collects the overflow"""
+        counts = np.zeros(buckets, dtype=np.int64)
+        if self._samples:
+            samples = self._snapshot()
+            index = np.minimum(samples // (bucket_us * 1000), buckets - 1)
+            counts = np.bincount(index, minlength=buckets)
+        return counts.tolist()
+
+    def summary(self) -> str:
+        return (
+            f"{len(self)} events, lateness p50={self.p50 / 1e6:.3f}ms "
+            f"p99={self.p99 / 1e6:.3f}ms max={self.max / 1e6:.3f}ms"
+        )
+
+
+class Scheduler:
+    """Dispatch timed events from a dedicated thread on the perf_counter_ns clock.
+
+    Events are (offset_ns, payload) pairs in non-decreasing offset order,
+    relative to the start time. The thread sleeps until ``lookahead_ms``
+    before the next event is due, then hands every event due within the
+    lookahead window to ``dispatch`` as one batch of (due_ns, payload) pairs.
+
+    ``timer`` and ``sleep`` stand in for perf_counter_ns and the wait between
+    events (seconds, cut short by ``stop``), so tests can run on a fake clock.
+    """
+
+    def __init__(
+        self,
+        dispatch: Callable[[list[tuple[int, Any]]], None],
+        lookahead_ms: float = 0.0,
+        timer: Callable[[], int] = time.perf_counter_ns,
+        sleep: Optional[Callable[[float], Any]] = None,
+    ):
+        self.dispatch = dispatch
+        self.lookahead_ns = int(lookahead_ms * 1_000_000)
+        self.timer = timer
+        self.stats = LatenessStats()
+        self.start_ns = 0
+        self._stop = threading.Event()
+        self._sleep = sleep or self._stop.wait
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(
+        self, events: Iterable[tuple[int, Any]], start_ns: Optional[int] = None
+    ) -> int:
+        """Start dispatching events; returns the start time in perf_counter_ns"""
+        if self.running:
+            raise RuntimeError("Scheduler is already running")
+        self._stop.clear()
+        self.start_ns = self.timer() if start_ns is None else start_ns
+        self._thread = threading.Thread(
+            target=self._run, args=(iter(events),), daemon=True
+        )
+        self._thread.start()
+        return self.start_ns
+
+    def stop(self):
+        self._stop.set()
+        self.join()
+
+    def join(self, timeout: Optional[float] = None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self, events):
+        lookahead = self.lookahead_ns
+        start = self.start_ns
+        pending = next(events, None)
+
+        while pending is not None:
+            wake = start + pending[0] - lookahead
+            now = self.timer()
+            if now < wake:
+                # Sleep on the stop event so stop() interrupts the wait
+                self._sleep((wake - now) / 1e9)
+                if self._stop.is_set():
+                    return
+                continue
+            if self._stop.is_set():
+                return
+
+            batch = []
+            horizon = now + lookahead
+            while pending is not None and start + pending[0] <= horizon:
+                due = start + pending[0]
+                self.stats.record(max(0, now - (due - lookahead)))
+                batch.append((due, pending[1]))
+                pending = next(events, None)
+            self.dispatch(batch)
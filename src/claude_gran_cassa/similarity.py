@@ -0,0 +1,153 @@
+from typing import Optional
+
+import numpy as np
+
+from .models import Composition, Pattern
+from .timeline import hit_steps
+
+# One bar on a 48 step grid holds both 16ths (3 steps) and 8th triplets (2)
+GRID = 48
+
+# Fingerprint slots by General MIDI drum note, so the same instrument lines up
+# across compositions whatever channel or exact note it was given
+_SLOTS = (
+    (35, 36),  # kick
+    (37, 38, 39, 40),  # snare, rim, clap
+    (42, 44),  # closed hihat
+    (46,),  # open hihat
+    (41, 43, 45, 47, 48, 50),  # toms
+    (49, 51, 52, 53, 55, 57, 59),  # cymbals
+)
+SLOTS = len(_SLOTS) + 1  # Plus one for everything else
+_SLOT_OF_NOTE = np.full(128, len(_SLOTS), dtype=np.intp)
+for _slot, _notes in enumerate(_SLOTS):
+    _SLOT_OF_NOTE[list(_notes)] = _slot
+
+DIMENSIONS = SLOTS * GRID
+
+# Set bits per byte value, for Hamming distances on packed onset masks
+_POPCOUNT = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.uint16)
+
+
+def pattern_fingerprint(pattern: Pattern) -> np.ndarray:
+    """Velocity per step of one bar on the common grid (0-1, bars folded)"""
+    vector = np.zeros(GRID, dtype=np.float32)
+    steps = hit_steps(pattern)
+    if not len(steps):
+        return vector
+    # Exact integer slots: a rounded step length would drift for grids that
+    # do not divide 48, such as 32nds
+    steps_per_bar = pattern.divisions // pattern.bars
+    if pattern.triplet:
+        positions = (steps * GRID * 2 // (steps_per_bar * 3)) % GRID
+    else:
+        positions = (steps * GRID // steps_per_bar) % GRID
+    velocities = np.frombuffer(pattern.velocity_bytes, dtype=np.uint8)[: len(steps)]
+    velocities = np.pad(
+        velocities, (0, len(steps) - len(velocities)), constant_values=100
+    )
+    np.maximum.at(vector, positions, velocities / np.float32(127))
+    return vector
+
+
+def fingerprint(composition: Composition) -> np.ndarray:
+    """Per-instrument velocity-weighted onset grid, flattened"""
+    vector = np.zeros((SLOTS, GRID), dtype=np.float32)
+    for pattern in composition.patterns:
+        slot = _SLOT_OF_NOTE[pattern.note & 0x7F]
+        np.maximum(vector[slot], pattern_fingerprint(pattern), out=vector[slot])
+    return vector.ravel()
+
+
+def onset_bits(fingerprints: np.ndarray) -> np.ndarray:
+    """Packed onset masks of one or more fingerprints"""
+    return np.packbits(fingerprints > 0, axis=-1)
+
+
+class SimilarityIndex:
+    """Fingerprint matrix of a pattern library for nearest-neighbour search.
+
+    ``refresh`` only reads entries added since the last call, so keeping an
+    index open while the library grows costs one small query per search.
+    """
+
+    def __init__(self, library):
+        self.library = library
+        self.ids = np.empty(0, dtype=np.int64)
+        self.vectors = np.empty((0, DIMENSIONS), dtype=np.float32)
+        self._unit = np.empty((0, DIMENSIONS), dtype=np.float32)
+        self._bits = np.empty((0, DIMENSIONS // 8), dtype=np.uint8)
+        self._last_id = 0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def refresh(self):
+        rows = self.library.fingerprints(after=self._last_id)
+        if not rows:
+            return
+        ids = np.array([entry_id for entry_id, _ in rows], dtype=np.int64)
+        vectors = np.stack([vector for _, vector in rows])
+        self.add(ids, vectors)
+
+    def add(self, ids: np.ndarray, vectors: np.ndarray):
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        unit = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+        self.ids = np.concatenate([self.ids, ids])
+        self.vectors = np.concatenate([self.vectors, vectors])
+        self._unit = np.concatenate([self._unit, unit])
+        self._bits = np.concatenate([self._bits, onset_bits(vectors)])
+        self._last_id = max(self._last_id, int(ids.max()))
+
+    def scores(self, vector: np.ndarray, metric: str = "cosine") -> np.ndarray:
+        """Similarity of every indexed entry to ``vector``, 1.0 = identical"""
+        if metric == "cosine":
+            norm = np.linalg.norm(vector)
+            if norm == 0:
+                return np.zeros(len(self.ids), dtype=np.float32)
+            return self._unit @ (vector / norm)
+        if metric == "hamming":
+            distance = _POPCOUNT[self._bits ^ onset_bits(vector)].sum(axis=1)
+            return 1 - distance / np.float32(DIMENSIONS)
+        raise ValueError(f"Unknown metric: {metric}")
+
+    def nearest(
+        self,
+        composition: Composition,
+        k: int = 5,
+        metric: str = "cosine",
+        exclude: Optional[int] = None,
+    ) -> list[tuple[int, float]]:
+        """The ``k`` most similar library entries as (id, score), best first"""
+        self.refresh()
+        scores = self.scores(fingerprint(composition), metric)
+        if exclude is not None:
+            scores = np.where(self.ids == exclude, -np.inf, scores)
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            (int(self.ids[i]), float(scores[i])) for i in top if scores[i] > -np.inf
+        ]
+
+    def duplicates(
+        self, threshold: float = 0.95, block: int = 1024
+    ) -> list[tuple[int, int, float]]:
+        """Pairs of entries with cosine similarity of at least ``threshold``"""
+        self.refresh()
+        pairs = []
+        for start in range(0, len(self.ids), block):
+            # Compare each block only against later entries
+            scores = self._unit[start : start + block] @ self._unit[start:].T
+            rows, columns = np.nonzero(np.triu(scores, k=1) >= threshold)
+            for row, column in zip(rows, columns):
+                pairs.append(
+                    (
+                        int(self.ids[start + row]),
+                        int(self.ids[start + column]),
+                        float(scores[row, column]),
+                    )
+                )
+        return sorted(pairs, key=lambda pair: -pair[2])
@@ -0,0 +1,329 @@
+import struct
+from typing import BinaryIO, Iterator, Optional, Sequence
+
+import numpy as np
+
+from .timeline import Timeline
+
+NOTE_ON = 0x90
+CONTROL_CHANGE = 0xB0
+PAN = 10
+META = 0xFF
+TEMPO = 0x51
+TIME_SIGNATURE = 0x58
+END_OF_TRACK = 0x2F
+
+# Data bytes after each channel message status
+_DATA_BYTES = {0x80: 2, 0x90: 2, 0xA0: 2, 0xB0: 2, 0xC0: 1, 0xD0: 1, 0xE0: 2}
+
+# Order of simultaneous events: release the previous note before setting the
+# pan for, and striking, the next one
+_NOTE_OFF_ORDER, _PAN_ORDER, _NOTE_ON_ORDER = range(3)
+
+
+def variable_length(values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """MIDI variable-length quantities for many values at once.
+
+    Returns a (n, 4) byte matrix, most significant group first, and a mask of
+    the bytes each value actually uses.
+    """
+    values = values.astype(np.uint32)
+    shifts = np.array([21, 14, 7, 0], dtype=np.uint32)
+    groups = ((values[:, None] >> shifts) & 0x7F).astype(np.uint8)
+    groups[:, :3] |= 0x80  # Continuation bit on all but the last byte
+    size = (1 + (values >= 1 << 7) + (values >= 1 << 14) + (values >= 1 << 21)).astype(
+        np.uint8
+    )
+    used = np.arange(4) >= (4 - size)[:, None]
+    return groups, used
+
+
+def _vlq(value: int) -> bytes:
+    groups, used = variable_length(np.array([value]))
+    return groups[used].tobytes()
+
+
+def _chunk(kind: bytes, data: bytes) -> bytes:
+    return kind + struct.pack(">I", len(data)) + data
+
+
+def tempo_data(bpm: float) -> bytes:
+    return round(60_000_000 / bpm).to_bytes(3, "big")
+
+
+def time_signature_data(time_signature: tuple[int, int]) -> bytes:
+    numerator, denominator = time_signature
+    return bytes([numerator, denominator.bit_length() - 1, 24, 8])
+
+
+class TrackEncoder:
+    """Encode one track's events chunk by chunk.
+
+    Running status, the last pan sent on each channel and note-offs that
+    fall after the end of a chunk carry over between calls, so a long track
+    can be produced piecewise with the same bytes as encoding it at once.
+    """
+
+    def __init__(self):
+        self.time = 0  # Tick of the last event written
+        self._status = -1
+        self._pan = np.full(16, -1, dtype=np.int16)
+        self._pending = None
+
+    def meta(self, kind: int, data: bytes, tick: Optional[int] = None) -> bytes:
+        tick = self.time if tick is None else tick
+        delta = tick - self.time
+        self.time = tick
+        self._status = -1  # Meta events cancel running status
+        return _vlq(delta) + bytes([0xFF, kind]) + _vlq(len(data)) + data
+
+    def events(
+        self,
+        tick: np.ndarray,
+        channel: np.ndarray,
+        note: np.ndarray,
+        velocity: np.ndarray,
+        pan: np.ndarray,
+        duration: np.ndarray,
+        until: Optional[int] = None,
+    ) -> bytes:
+        """Encode hits as pan, note-on and note-off events with running status.
+
+        Note-offs are sent as note-on with velocity 0 so all note events share
+        one status byte. Events at or after ``until`` (note-offs running past
+        the chunk) are held back and merged into the next call.
+        """
+        count = len(tick)
+        note_status = (NOTE_ON | channel).astype(np.uint8)
+
+        # Only send pan when it changes on a channel; with a steady pan the
+        # note events then run together under one status byte
+        by_channel = np.lexsort((tick, channel))
+        sorted_channel = channel[by_channel]
+        sorted_pan = pan[by_channel].astype(np.int16)
+        previous = self._pan[sorted_channel]
+        same_channel = np.zeros(count, dtype=bool)
+        same_channel[1:] = sorted_channel[1:] == sorted_channel[:-1]
+        previous[1:] = np.where(same_channel[1:], sorted_pan[:-1], previous[1:])
+        send_pan = np.empty(count, dtype=bool)
+        send_pan[by_channel] = sorted_pan != previous
+        self._pan[sorted_channel] = sorted_pan  # Last write per channel wins
+
+        columns = [
+            np.concatenate([tick + duration, tick[send_pan], tick]),
+            np.concatenate(
+                [
+                    np.full(count, _NOTE_OFF_ORDER, dtype=np.uint8),
+                    np.full(np.count_nonzero(send_pan), _PAN_ORDER, dtype=np.uint8),
+                    np.full(count, _NOTE_ON_ORDER, dtype=np.uint8),
+                ]
+            ),
+            np.concatenate(
+                [
+                    note_status,
+                    (CONTROL_CHANGE | channel[send_pan]).astype(np.uint8),
+                    note_status,
+                ]
+            ),
+            np.concatenate(
+                [note, np.full(np.count_nonzero(send_pan), PAN, np.uint8), note]
+            ),
+            np.concatenate([np.zeros(count, dtype=np.uint8), pan[send_pan], velocity]),
+        ]
+        if self._pending is not None:
+            columns = [np.concatenate(pair) for pair in zip(self._pending, columns)]
+            self._pending = None
+
+        time, order = columns[0], columns[1]
+        events = np.lexsort((order, time))
+        if until is not None:
+            held = events[time[events] >= until]
+            if len(held):
+                self._pending = [column[held] for column in columns]
+            events = events[time[events] < until]
+        if not len(events):
+            return b""
+        time, status, data1, data2 = (
+            columns[0][events],
+            columns[2][events],
+            columns[3][events],
+            columns[4][events],
+        )
+
+        groups, used = variable_length(np.diff(time, prepend=self.time))
+        running = np.empty(len(status), dtype=bool)
+        running[0] = status[0] == self._status
+        running[1:] = status[1:] == status[:-1]
+        self.time = int(time[-1])
+        self._status = int(status[-1])
+
+        table = np.column_stack([groups, status, data1, data2])
+        mask = np.column_stack([used, ~running, np.ones((len(status), 2), dtype=bool)])
+        return table[mask].tobytes()
+
+    def flush(self) -> bytes:
+        """Events still held back from earlier chunks"""
+        if self._pending is None:
+            return b""
+        empty = np.zeros(0, dtype=np.uint8)
+        return self.events(
+            np.zeros(0, dtype=np.int64), empty, empty, empty, empty, empty
+        )
+
+    def end(self, tick: int) -> bytes:
+        """Flush and close the track, no earlier than ``tick``"""
+        data = self.flush()
+        return data + self.meta(0x2F, b"", max(tick, self.time))
+
+
+def encode_smf(
+    timeline: Timeline,
+    time_signature: tuple[int, int] = (4, 4),
+    loops: int = 1,
+    track_names: Optional[Sequence[str]] = None,
+) -> bytes:
+    """Encode a timeline as a Standard MIDI File.
+
+    With ``track_names`` (one per pattern) the file is format 1: a tempo
+    track followed by one track per pattern. Otherwise every event goes into
+    a single format 0 track.
+    """
+    length = timeline.length
+    offsets = np.repeat(np.arange(loops, dtype=np.int64) * length, len(timeline))
+    columns = {
+        "tick": np.tile(timeline.tick, loops) + offsets,
+        "channel": np.tile(timeline.channel, loops),
+        "note": np.tile(timeline.note, loops),
+        "velocity": np.tile(timeline.velocity, loops),
+        "pan": np.tile(timeline.pan, loops),
+        "duration": np.tile(timeline.duration, loops),
+    }
+    end = loops * length  # End of track at the loop boundary keeps trailing rests
+
+    conductor = TrackEncoder()
+    header = conductor.meta(0x51, tempo_data(timeline.bpm)) + conductor.meta(
+        0x58, time_signature_data(time_signature)
+    )
+
+    if track_names is None:
+        tracks = [header + conductor.events(**columns) + conductor.end(end)]
+        file_format = 0
+    else:
+        tracks = [header + conductor.end(end)]
+        pattern = np.tile(timeline.pattern, loops)
+        for index, name in enumerate(track_names):
+            selected = pattern == index
+            encoder = TrackEncoder()
+            tracks.append(
+                encoder.meta(0x03, name.encode())
+                + encoder.events(
+                    **{key: values[selected] for key, values in columns.items()}
+                )
+                + encoder.end(end)
+            )
+        file_format = 1
+
+    return _chunk(
+        b"MThd", struct.pack(">HHH", file_format, len(tracks), timeline.ppqn)
+    ) + b"".join(_chunk(b"MTrk", track) for track in tracks)
+
+
+class StreamingSMF:
+    """Format 0 Standard MIDI File written to a seekable binary file as
+    events arrive; the track length is filled in by ``close``"""
+
+    def __init__(self, file: BinaryIO, ppqn: int):
+        self.file = file
+        self.track = TrackEncoder()
+        file.write(_chunk(b"MThd", struct.pack(">HHH", 0, 1, ppqn)))
+        file.write(b"MTrk\0\0\0\0")
+        self._start = file.tell()
+
+    def meta(self, kind: int, data: bytes, tick: int):
+        self.file.write(self.track.meta(kind, data, tick))
+
+    def events(self, until: Optional[int] = None, **columns):
+        self.file.write(self.track.events(until=until, **columns))
+
+    def close(self, end: int):
+        self.file.write(self.track.end(end))
+        size = self.file.tell() - self._start
+        self.file.seek(self._start - 4)
+        self.file.write(struct.pack(">I", size))
+        self.file.seek(0, 2)
+
+
+def smf_tracks(data) -> tuple[int, int, list[tuple[int, int]]]:
+    """(format, ticks per beat, byte range of every track chunk) of a
+    Standard MIDI File held in ``data`` (bytes or an mmap)"""
+    if data[:4] != b"MThd" or len(data) < 14:
+        raise ValueError("Not a Standard MIDI File")
+    (size,) = struct.unpack_from(">I", data, 4)
+    file_format, count, division = struct.unpack_from(">HHH", data, 8)
+    if division & 0x8000:
+        raise ValueError("SMPTE time division is not supported")
+
+    tracks = []
+    position = 8 + size
+    while position + 8 <= len(data) and len(tracks) < count:
+        (size,) = struct.unpack_from(">I", data, position + 4)
+        start = position + 8
+        if data[position : position + 4] == b"MTrk":  # Skip unknown chunks
+            tracks.append((start, min(start + size, len(data))))
+        position = start + size
+    return file_format, division, tracks
+
+
+def _read_vlq(data, position: int) -> tuple[int, int]:
+    value = 0
+    for _ in range(4):
+        byte = data[position]
+        position += 1
+        value = (value << 7) | (byte & 0x7F)
+        if byte < 0x80:
+            return value, position
+    raise ValueError(f"Variable-length quantity too long at byte {position}")
+
+
+def track_events(data, start: int, end: int) -> Iterator[tuple]:
+    """Decode one track chunk lazily into (tick, status, data1, data2).
+
+    Running status is resolved, so channel messages always carry their
+    status byte. Meta events come as (tick, 0xFF, type, payload); system
+    exclusive messages are skipped.
+    """
+    tick = 0
+    status = 0
+    position = start
+    try:
+        while position < end:
+            delta, position = _read_vlq(data, position)
+            tick += delta
+            byte = data[position]
+            if byte == META:
+                kind = data[position + 1]
+                length, position = _read_vlq(data, position + 2)
+                yield tick, META, kind, data[position : position + length]
+                position += length
+                status = 0  # Meta events and sysex cancel running status
+                if kind == END_OF_TRACK:
+                    return
+                continue
+            if byte in (0xF0, 0xF7):
+                length, position = _read_vlq(data, position + 1)
+                position += length
+                status = 0
+                continue
+            if byte & 0x80:
+                status = byte
+                position += 1
+            elif not status:
+                raise ValueError(f"Data byte without a status at byte {position}")
+            size = _DATA_BYTES.get(status & 0xF0)
+            if size is None:
+                raise ValueError(f"Unexpected status {status:#x} at byte {position}")
+            second = data[position + 1] if size == 2 else 0
+            yield tick, status, data[position], second
+            position += size
+    except IndexError:
+        raise ValueError("Track chunk ends in the middle of an event")
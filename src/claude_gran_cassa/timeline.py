@@ -0,0 +1,187 @@
+import hashlib
+import struct
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+from .models import Composition
+
+
+@dataclass(frozen=True)
+class Timeline:
+    """Sorted struct-of-arrays view of every hit in a composition"""
+
+    ppqn: int
+    bpm: int
+    length: int  # Loop length in ticks
+    tick: np.ndarray  # int64
+    note: np.ndarray  # uint8
+    channel: np.ndarray  # uint8, 0-based MIDI channel
+    velocity: np.ndarray  # uint8
+    pan: np.ndarray  # uint8, 0-127 (64 = center)
+    duration: np.ndarray  # int64, ticks
+    pattern: np.ndarray  # uint16, index into composition.patterns
+
+    def __len__(self) -> int:
+        return len(self.tick)
+
+    @property
+    def seconds_per_tick(self) -> float:
+        return 60 / (self.bpm * self.ppqn)
+
+    def seconds(self) -> np.ndarray:
+        return self.tick * self.seconds_per_tick
+
+    def nanoseconds(self) -> np.ndarray:
+        return np.rint(self.seconds() * 1e9).astype(np.int64)
+
+
+# Fixed-size part of a pattern's content hash: hit length, divisions,
+# triplet, channel, note, bars and the lengths of the variable-size parts
+_PATTERN_HEADER = struct.Struct("<9q")
+
+
+def content_hash(composition: Composition) -> str:
+    """Digest of a composition's content, fed straight from its packed fields"""
+    config = composition.config
+    digest = hashlib.sha1(
+        repr((config.bpm, tuple(config.time_signature), config.swing_amount)).encode()
+    )
+    for pattern in composition.patterns:
+        length = pattern.hit_length
+        mask = pattern.hit_mask.to_bytes((length + 7) // 8, "little")
+        name = pattern.name.encode()
+        velocities, pans = pattern.velocity_bytes, pattern.pan_bytes
+        digest.update(
+            _PATTERN_HEADER.pack(
+                length,
+                pattern.divisions,
+                pattern.triplet,
+                pattern.channel,
+                pattern.note,
+                pattern.bars,
+                len(name),
+                len(velocities),
+                len(pans),
+            )
+        )
+        digest.update(mask)
+        digest.update(name)
+        digest.update(velocities)
+        digest.update(pans)
+    return digest.hexdigest()
+
+
+def division_length(pattern, ppqn: int) -> int:
+    """Length of one step of a pattern in ticks"""
+    bar_length = ppqn * 4
+    length = bar_length // (pattern.divisions // pattern.bars)
+    if pattern.triplet:
+        length = int(length * 2 / 3)
+    return length
+
+
+def hit_steps(pattern) -> np.ndarray:
+    """Indices of the steps that have a hit, straight from the hit bitmask"""
+    length = pattern.hit_length
+    mask = pattern.hit_mask.to_bytes((length + 7) // 8, "little")
+    bits = np.unpackbits(np.frombuffer(mask, dtype=np.uint8), bitorder="little")
+    return np.flatnonzero(bits[:length])
+
+
+def loop_length(composition: Composition, ppqn: int) -> int:
+    """Length of one loop of a composition in ticks, without compiling it"""
+    return max(
+        (
+            max(
+                pattern.bars * ppqn * 4,
+                pattern.hit_length * division_length(pattern, ppqn),
+            )
+            for pattern in composition.patterns
+        ),
+        default=0,
+    )
+
+
+_DTYPES = {
+    "tick": np.int64,
+    "note": np.uint8,
+    "channel": np.uint8,
+    "velocity": np.uint8,
+    "pan": np.uint8,
+    "duration": np.int64,
+    "pattern": np.uint16,
+}
+
+
+def _compile(composition: Composition, ppqn: int) -> Timeline:
+    columns = {key: [] for key in _DTYPES}
+
+    for index, pattern in enumerate(composition.patterns):
+        step = division_length(pattern, ppqn)
+        steps = hit_steps(pattern)
+        count = len(steps)
+        if len(pattern.velocity_bytes) < count or len(pattern.pan_bytes) < count:
+            raise ValueError(
+                f"Pattern '{pattern.name}' has {count} hits but "
+                f"{len(pattern.velocity_bytes)} velocities and "
+                f"{len(pattern.pan_bytes)} pan values"
+            )
+
+        columns["tick"].append(steps * step)
+        columns["note"].append(np.full(count, pattern.note))
+        columns["channel"].append(np.full(count, pattern.channel - 1))
+        columns["velocity"].append(
+            np.frombuffer(pattern.velocity_bytes, dtype=np.uint8)[:count]
+        )
+        columns["pan"].append(np.frombuffer(pattern.pan_bytes, dtype=np.uint8)[:count])
+        columns["duration"].append(np.full(count, step // 2))  # Short percussion
+        columns["pattern"].append(np.full(count, index))
+
+    arrays = {
+        key: (
+            np.concatenate(values).astype(_DTYPES[key])
+            if values
+            else np.zeros(0, dtype=_DTYPES[key])
+        )
+        for key, values in columns.items()
+    }
+
+    # Stable sort keeps pattern order for simultaneous hits
+    order = np.argsort(arrays["tick"], kind="stable")
+    for key, values in arrays.items():
+        values = values[order]
+        values.flags.writeable = False  # Shared between callers via the cache
+        arrays[key] = values
+
+    return Timeline(
+        ppqn=ppqn,
+        bpm=composition.config.bpm,
+        length=loop_length(composition, ppqn),
+        **arrays,
+    )
+
+
+_cache: "OrderedDict[tuple[str, int], Timeline]" = OrderedDict()
+_CACHE_SIZE = 128
+
+
+def compile_timeline(composition: Composition, ppqn: int = 480) -> Timeline:
+    """Compile a composition into a Timeline, memoized on its content hash"""
+    key = (content_hash(composition), ppqn)
+    timeline = _cache.get(key)
+    if timeline is not None:
+        _cache.move_to_end(key)
+        return timeline
+
+    timeline = _compile(composition, ppqn)
+    _cache[key] = timeline
+    if len(_cache) > _CACHE_SIZE:
+        _cache.popitem(last=False)
+    return timeline
+
+
+def clear_cache():
+    """Forget every compiled timeline, e.g. to time compilation itself"""
+    _cache.clear()
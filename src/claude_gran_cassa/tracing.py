@@ -0,0 +1,163 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+
+class Span:
+    """A timed region; attributes can be added while it is open"""
+
+    __slots__ = ("name", "start_ns", "end_ns", "thread", "attrs")
+
+    def __init__(self, name: str, attrs: dict):
+        self.name = name
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns = None
+        self.thread = threading.get_ident()
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    @property
+    def duration_ns(self) -> int:
+        end = self.end_ns if self.end_ns is not None else time.perf_counter_ns()
+        return end - self.start_ns
+
+
+class _NullSpan:
+    duration_ns = 0
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """Collects spans and counters while enabled; a no-op otherwise.
+
+    ``write`` saves the spans in the Chrome trace event format, which
+    chrome://tracing and Perfetto open directly.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.spans: list[Span] = []
+        self.counters: dict[str, float] = defaultdict(float)
+        self.gauges: dict[str, float] = {}
+        self.origin_ns = time.perf_counter_ns()
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self.spans = []
+            self.counters = defaultdict(float)
+            self.gauges = {}
+            self.origin_ns = time.perf_counter_ns()
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        if not self.enabled:
+            yield _NULL_SPAN
+            return
+        span = Span(name, attrs)
+        try:
+            yield span
+        except BaseException as e:
+            span.set(error=type(e).__name__)
+            raise
+        finally:
+            span.end_ns = time.perf_counter_ns()
+            with self._lock:
+                self.spans.append(span)
+
+    def count(self, name: str, value: float = 1):
+        """Add to a counter, e.g. tokens used"""
+        if self.enabled:
+            with self._lock:
+                self.counters[name] += value
+
+    def gauge(self, name: str, value: float):
+        """Record the latest value of a measurement, e.g. playback lateness"""
+        if self.enabled:
+            with self._lock:
+                self.gauges[name] = value
+
+    def summary(self) -> str:
+        """Time per span name, in order of first appearance, then counters"""
+        totals = {}
+        for span in self.spans:
+            count, total, longest = totals.get(span.name, (0, 0, 0))
+            totals[span.name] = (
+                count + 1,
+                total + span.duration_ns,
+                max(longest, span.duration_ns),
+            )
+        lines = [f"{'span':<24} {'count':>6} {'total':>10} {'max':>10}"]
+        for name, (count, total, longest) in totals.items():
+            lines.append(
+                f"{name:<24} {count:>6} {total / 1e6:>8.1f}ms {longest / 1e6:>8.1f}ms"
+            )
+        for name, value in {**self.counters, **self.gauges}.items():
+            lines.append(f"{name:<24} {value:>g}")
+        return "\n".join(lines)
+
+    def to_dict(self) -> dict:
+        pid = os.getpid()
+        events = [
+            {
+                "name": span.name,
+                "ph": "X",
+                "ts": (span.start_ns - self.origin_ns) / 1000,
+                "dur": span.duration_ns / 1000,
+                "pid": pid,
+                "tid": span.thread,
+                "args": span.attrs,
+            }
+            for span in self.spans
+        ]
+        now = (time.perf_counter_ns() - self.origin_ns) / 1000
+        events.extend(
+            {"name": name, "ph": "C", "ts": now, "pid": pid, "args": {name: value}}
+            for name, value in {**self.counters, **self.gauges}.items()
+        )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, path: Path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, default=str)
+
+
+tracer = Tracer()
+
+
+def span(name: str, **attrs):
+    """Time a region on the global tracer: ``with span("parse"): ...``"""
+    return tracer.span(name, **attrs)
+
+
+def record_usage(response, span: Optional[Span] = None):
+    """Count the input/output tokens reported in an API response's usage"""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    tokens = {
+        "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+        "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+    }
+    if span is not None:
+        span.set(**tokens)
+    for name, value in tokens.items():
+        tracer.count(name, value)
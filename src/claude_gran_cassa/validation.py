@@ -0,0 +1,278 @@
+import math
+from dataclasses import dataclass
+from typing import Optional
+
+# Pan scales: model responses use -64~64 (or -100~100, see
+# ResponseParser.normalize_pan), stored compositions use 0~127
+RESPONSE_PAN = (-100, 100)
+STORED_PAN = (0, 127)
+
+DEFAULT_VELOCITY = 100
+CHANNELS = range(1, 17)
+
+
+@dataclass(frozen=True)
+class Issue:
+    path: str  # JSON Pointer to the offending value
+    message: str
+    repaired: bool = False
+
+    def __str__(self) -> str:
+        return f"{self.path}: {self.message}" + (" (repaired)" if self.repaired else "")
+
+
+class ValidationError(ValueError):
+    def __init__(self, issues: list[Issue]):
+        self.issues = issues
+        super().__init__(
+            "Invalid composition:\n" + "\n".join(f"  {issue}" for issue in issues)
+        )
+
+
+_MISSING = object()
+
+
+class _Checker:
+    """Collects issues while checking, fixing what can be fixed in place"""
+
+    def __init__(self, repair: bool):
+        self.repair = repair
+        self.issues = []
+
+    def error(self, path: str, message: str):
+        self.issues.append(Issue(path, message))
+
+    def fix(self, path: str, message: str):
+        self.issues.append(Issue(path, message, repaired=self.repair))
+
+    def done(self) -> list[Issue]:
+        """The repairs made, or ValidationError if anything was left broken"""
+        if any(not issue.repaired for issue in self.issues):
+            raise ValidationError(self.issues)
+        return self.issues
+
+    def integer(
+        self,
+        data: dict,
+        key: str,
+        path: str,
+        low: int,
+        high: Optional[int] = None,
+        default=_MISSING,
+    ) -> Optional[int]:
+        path = f"{path}/{key}"
+        value = data.get(key, _MISSING)
+        if value is _MISSING:
+            if default is _MISSING:
+                self.error(path, "is required")
+                return None
+            value = default  # Optional field
+        value = self.number(value, path)
+        if value is None:
+            return None
+        value = self.clamp(value, path, low, high)
+        data[key] = value
+        return value
+
+    def number(self, value, path: str) -> Optional[int]:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            self.error(path, f"must be an integer, got {value!r}")
+            return None
+        if not math.isfinite(value):
+            self.error(path, f"must be a finite number, got {value!r}")
+            return None
+        if value != int(value):
+            self.fix(path, f"{value} rounded to an integer")
+        return int(round(value))
+
+    def clamp(self, value: int, path: str, low: int, high: Optional[int]) -> int:
+        clamped = max(low, value) if high is None else min(max(low, value), high)
+        if clamped != value:
+            self.fix(path, f"{value} clamped to {clamped}")
+        return clamped
+
+    def integers(
+        self, data: dict, key: str, path: str, low: int, high: int, length: int, fill
+    ) -> Optional[list[int]]:
+        """A list of ``length`` integers in range, padded with ``fill`` or
+        truncated as needed"""
+        path = f"{path}/{key}"
+        values = data.get(key, _MISSING)
+        if values is _MISSING:
+            self.fix(path, f"missing, using {fill} for every hit")
+            data[key] = [fill] * length
+            return data[key]
+        if not isinstance(values, list):
+            self.error(path, "must be a list")
+            return None
+
+        numbers = []
+        for i, value in enumerate(values[:length]):
+            number = self.number(value, f"{path}/{i}")
+            if number is None:
+                return None
+            numbers.append(number)
+        if any(n < low or n > high for n in numbers):
+            self.fix(path, f"values clamped to {low}-{high}")
+            numbers = [min(max(n, low), high) for n in numbers]
+
+        if len(values) != length:
+            self.fix(path, f"has {len(values)} values for {length} hits")
+            numbers += [fill] * (length - len(numbers))
+        data[key] = numbers
+        return numbers
+
+
+def _check_config(check: _Checker, data, path: str = "/config"):
+    if not isinstance(data, dict):
+        check.error(path, "must be an object")
+        return
+    check.integer(data, "bpm", path, 20, 300)
+
+    signature = data.get("time_signature", _MISSING)
+    if signature is _MISSING:
+        check.fix(f"{path}/time_signature", "missing, using [4, 4]")
+        data["time_signature"] = [4, 4]
+    elif (
+        not isinstance(signature, (list, tuple))
+        or len(signature) != 2
+        or not all(
+            isinstance(n, int) and not isinstance(n, bool) and n > 0 for n in signature
+        )
+    ):
+        check.error(f"{path}/time_signature", "must be two positive integers")
+
+    swing = data.get("swing_amount", 0.0)
+    if isinstance(swing, bool) or not isinstance(swing, (int, float)):
+        check.error(f"{path}/swing_amount", "must be a number")
+    elif not 0 <= swing <= 1:
+        clamped = min(max(float(swing), 0.0), 1.0)
+        check.fix(f"{path}/swing_amount", f"{swing} clamped to {clamped}")
+        data["swing_amount"] = clamped
+
+
+def _check_pattern(check: _Checker, data, path: str, pan_range: tuple[int, int]):
+    if not isinstance(data, dict):
+        check.error(path, "must be an object")
+        return
+
+    if not isinstance(data.get("name", ""), str):
+        check.fix(f"{path}/name", "must be a string")
+        data["name"] = str(data["name"])
+    elif "name" not in data:
+        check.fix(f"{path}/name", "missing, using an empty name")
+        data["name"] = ""
+
+    divisions = check.integer(data, "divisions", path, 1)
+    if divisions is not None:
+        check.integer(data, "bars", path, 1, divisions, default=1)
+    check.integer(data, "channel", path, CHANNELS.start, CHANNELS.stop - 1)
+    check.integer(data, "note", path, 0, 127)
+
+    triplet = data.get("triplet", False)
+    if not isinstance(triplet, bool):
+        check.fix(f"{path}/triplet", f"{triplet!r} is not a boolean")
+        data["triplet"] = bool(triplet)
+
+    hits = data.get("hits", _MISSING)
+    if hits is _MISSING:
+        check.error(f"{path}/hits", "is required")
+        return
+    if not isinstance(hits, list):
+        check.error(f"{path}/hits", "must be a list")
+        return
+    if not all(
+        isinstance(hit, (int, float)) and not isinstance(hit, bool) for hit in hits
+    ):
+        check.error(f"{path}/hits", "must be a list of 0/1 integers")
+        return
+    if any(hit not in (0, 1) for hit in hits):
+        check.fix(f"{path}/hits", "values other than 0/1 treated as hits")
+    hits = [1 if hit else 0 for hit in hits]
+    if divisions is not None and len(hits) != divisions:
+        # Divisions also sets the step length, so trust it over the list
+        check.fix(f"{path}/hits", f"has {len(hits)} steps for {divisions} divisions")
+        hits = hits[:divisions] + [0] * (divisions - len(hits))
+    data["hits"] = hits
+
+    count = sum(hits)
+    check.integers(data, "velocities", path, 0, 127, count, DEFAULT_VELOCITY)
+    low, high = pan_range
+    check.integers(data, "panning", path, low, high, count, (low + high + 1) // 2)
+
+
+def _check_channels(check: _Checker, patterns: list, path: str = "/patterns"):
+    """Move patterns that share a channel to the lowest free ones"""
+    channels = [
+        p.get("channel")
+        for p in patterns
+        if isinstance(p, dict) and isinstance(p.get("channel"), int)
+    ]
+    free = [channel for channel in CHANNELS if channel not in channels]
+    seen = set()
+    for i, pattern in enumerate(patterns):
+        if not isinstance(pattern, dict) or not isinstance(pattern.get("channel"), int):
+            continue
+        channel = pattern["channel"]
+        if channel in seen:
+            if not free:
+                check.error(f"{path}/{i}/channel", f"channel {channel} is not unique")
+                continue
+            pattern["channel"] = free.pop(0)
+            check.fix(
+                f"{path}/{i}/channel",
+                f"channel {channel} already used, moved to {pattern['channel']}",
+            )
+        seen.add(pattern["channel"])
+
+
+def check_config(data: dict, repair: bool = True) -> list[Issue]:
+    """Validate a song config in place, see ``check_composition``"""
+    check = _Checker(repair)
+    _check_config(check, data)
+    return check.done()
+
+
+def check_pattern(
+    data: dict,
+    path: str = "/patterns/0",
+    pan_range: tuple[int, int] = RESPONSE_PAN,
+    repair: bool = True,
+) -> list[Issue]:
+    """Validate one pattern in place, see ``check_composition``"""
+    check = _Checker(repair)
+    _check_pattern(check, data, path, pan_range)
+    return check.done()
+
+
+def check_composition(
+    data, pan_range: tuple[int, int] = RESPONSE_PAN, repair: bool = True
+) -> list[Issue]:
+    """Check decoded composition JSON against the schema in the system prompt.
+
+    Common mistakes are repaired in place: velocity and pan lists padded or
+    truncated to the hit count, hits padded or truncated to the divisions,
+    duplicate channels moved to free ones and out-of-range numbers clamped.
+    Returns the repairs made. Anything that cannot be repaired (or anything
+    at all without ``repair``) raises ValidationError listing every issue.
+    """
+    check = _Checker(repair)
+    if not isinstance(data, dict):
+        check.error("", "must be an object")
+        return check.done()
+
+    if "config" in data:
+        _check_config(check, data["config"])
+    else:
+        check.error("/config", "is required")
+
+    patterns = data.get("patterns", _MISSING)
+    if patterns is _MISSING:
+        check.error("/patterns", "is required")
+    elif not isinstance(patterns, list):
+        check.error("/patterns", "must be a list")
+    else:
+        for i, pattern in enumerate(patterns):
+            _check_pattern(check, pattern, f"/patterns/{i}", pan_range)
+        _check_channels(check, patterns)
+    return check.done()
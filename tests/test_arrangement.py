@@ -0,0 +1,121 @@
+import io
+import json
+import wave
+import mido
+import pytest
+from claude_gran_cassa.arrangement import Arrangement, Section
+from claude_gran_cassa.audio.render import OfflineRenderer
+from claude_gran_cassa.midi import MIDIConverter
+from claude_gran_cassa.models import Composition, Pattern, SongConfig
+from tests.test_playback import RecordingPlayer
+from tests.test_render import write_sample
+
+
+def make_composition(note=36, bpm=120, bars=1):
+    pattern = Pattern(hits=[1, 0, 1, 0], divisions=4, note=note, bars=bars)
+    return Composition(config=SongConfig(bpm=bpm), patterns=[pattern])
+
+
+def test_locate_and_lengths():
+    arrangement = Arrangement(
+        [
+            Section(make_composition(), repeats=3),
+            Section(make_composition(bars=2), repeats=2),
+        ]
+    )
+
+    assert arrangement.bars == 7
+    assert arrangement.length == 7 * 1920
+    assert arrangement.duration_ns == 14 * 10**9
+    assert arrangement.locate(0) == (0, 0, 0)
+    assert arrangement.locate(2) == (0, 2, 0)
+    assert arrangement.locate(4) == (1, 0, 1)
+    assert arrangement.locate(6) == (1, 1, 1)
+    assert arrangement.start_ns(4) == 8 * 10**9
+    with pytest.raises(ValueError):
+        arrangement.locate(7)
+
+
+def test_segments_seek_into_a_loop():
+    arrangement = Arrangement(
+        [Section(make_composition(), 2), Section(make_composition(bars=2), 1)]
+    )
+
+    segments = list(arrangement.segments(3))
+    assert len(segments) == 1
+    assert segments[0].section == 1
+    assert segments[0].skip == 1920
+    assert segments[0].hits().tick.tolist() == [3840 + 1920]
+
+
+def test_fades_ramp_velocity():
+    pattern = Pattern(hits=[1] * 4, divisions=4, velocities=[100] * 4)
+    composition = Composition(config=SongConfig(bpm=120), patterns=[pattern])
+    arrangement = Arrangement([Section(composition, repeats=6, fade_in=2, fade_out=2)])
+
+    velocities = [
+        segment.timeline.velocity.tolist() for segment in arrangement.segments()
+    ]
+    first, last = velocities[0], velocities[-1]
+    assert first == sorted(first) and first[0] < 100
+    assert velocities[2] == velocities[3] == [100] * 4
+    assert last == sorted(last, reverse=True) and last[-1] < 100
+
+
+def test_streamed_midi_matches_batch_export():
+    composition = make_composition()
+    converter = MIDIConverter()
+    output = io.BytesIO()
+    converter.write_arrangement(Arrangement([Section(composition, 5)]), output)
+
+    assert output.getvalue() == converter.to_bytes(composition, 5, split_tracks=False)
+
+
+def test_streamed_midi_changes_tempo_between_sections():
+    arrangement = Arrangement(
+        [Section(make_composition(bpm=120), 2), Section(make_composition(bpm=60), 1)]
+    )
+    output = io.BytesIO()
+    MIDIConverter().write_arrangement(arrangement, output)
+
+    midi = mido.MidiFile(file=io.BytesIO(output.getvalue()))
+    tempos = [msg.tempo for msg in midi.tracks[0] if msg.type == "set_tempo"]
+    assert tempos == [500_000, 1_000_000]
+    assert midi.length == pytest.approx(8.0)
+
+
+def test_streamed_wav_matches_render(tmp_path):
+    write_sample(tmp_path / "kick.wav", frames=30000)
+    bank = tmp_path / "bank.json"
+    bank.write_text(json.dumps({"36": str(tmp_path / "kick.wav")}))
+    renderer = OfflineRenderer()
+    renderer.load_sound_bank(bank)
+
+    composition = make_composition()
+    output = tmp_path / "set.wav"
+    renderer.write_arrangement(Arrangement([Section(composition, 3)]), output)
+
+    with wave.open(str(output), "rb") as wav:
+        streamed = wav.readframes(wav.getnframes())
+    assert streamed == renderer._pcm(renderer.render(composition, loops=3))
+
+
+def test_player_plays_arrangement_from_a_bar():
+    # At 3000 bpm a bar lasts 80ms
+    arrangement = Arrangement(
+        [
+            Section(make_composition(36, bpm=3000), 2),
+            Section(make_composition(42, bpm=3000), 2),
+        ]
+    )
+    player = RecordingPlayer()
+    player.play_arrangement(arrangement, start_bar=1)
+
+    assert player.played == [
+        (0, 36),
+        (40_000_000, 36),
+        (80_000_000, 42),
+        (120_000_000, 42),
+        (160_000_000, 42),
+        (200_000_000, 42),
+    ]
@@ -0,0 +1,94 @@
+import asyncio
+import httpx
+import json
+from anthropic import RateLimitError
+from types import SimpleNamespace
+from claude_gran_cassa.batch import generate_batch
+from claude_gran_cassa.composer import Composer
+
+RESPONSE = {
+    "config": {"bpm": 130, "time_signature": [4, 4], "swing_amount": 0.0},
+    "patterns": [
+        {
+            "name": "kick",
+            "hits": [1, 0, 0, 0],
+            "divisions": 4,
+            "channel": 1,
+            "note": 36,
+            "velocities": [127],
+            "panning": [0],
+        }
+    ],
+}
+
+
+def rate_limit_error():
+    request = httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+    response = httpx.Response(429, request=request, headers={"retry-after": "0"})
+    return RateLimitError("rate limited", response=response, body=None)
+
+
+class StubAsyncClient:
+    """Stands in for AsyncAnthropic: answers after a short delay"""
+
+    def __init__(self, failures=None):
+        self.failures = failures or {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+        self.messages = self
+
+    async def create(self, **request):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            prompt = request["messages"][0]["content"].split("\n")[0]
+            if self.failures.get(prompt):
+                self.failures[prompt] -= 1
+                raise rate_limit_error()
+            if prompt == "broken":
+                text = "no json here"
+            else:
+                text = json.dumps(RESPONSE)
+            return SimpleNamespace(content=[SimpleNamespace(text=text)])
+        finally:
+            self.in_flight -= 1
+
+
+def test_batch_bounds_concurrency():
+    client = StubAsyncClient()
+    composer = Composer(api_key="test", async_client=client)
+    completed = []
+
+    results = asyncio.run(
+        generate_batch(
+            composer,
+            [f"prompt {i}" for i in range(20)],
+            concurrency=3,
+            on_result=completed.append,
+        )
+    )
+
+    assert client.max_in_flight == 3
+    assert [result.index for result in results] == list(range(20))
+    assert all(result.ok for result in results)
+    assert len(completed) == 20
+    assert results[0].composition.config.bpm == 130
+
+
+def test_batch_retries_rate_limits_and_records_failures():
+    client = StubAsyncClient(failures={"flaky": 2, "hopeless": 10})
+    composer = Composer(api_key="test", async_client=client)
+
+    flaky, hopeless, broken = asyncio.run(
+        generate_batch(
+            composer, ["flaky", "hopeless", "broken"], max_retries=3, backoff=0
+        )
+    )
+
+    assert flaky.ok and flaky.attempts == 3
+    assert not hopeless.ok and hopeless.attempts == 4
+    assert "rate limited" in hopeless.error
+    assert not broken.ok and broken.attempts == 1
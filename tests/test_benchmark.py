@@ -0,0 +1,51 @@
+from claude_gran_cassa.benchmark import (
+    Result,
+    compare,
+    load_baseline,
+    run_benchmarks,
+    save_baseline,
+    synthetic_composition,
+    synthetic_response,
+)
+from claude_gran_cassa.parser import ResponseParser
+
+
+def test_synthetic_composition_is_reproducible_and_parses():
+    composition = synthetic_composition(8, 32, 2)
+
+    assert len(composition.patterns) == 8
+    assert {p.divisions for p in composition.patterns} == {32}
+    assert composition == synthetic_composition(8, 32, 2)
+    parsed = ResponseParser.parse(synthetic_response(composition))
+    assert [p.hits for p in parsed.patterns] == [p.hits for p in composition.patterns]
+
+
+def test_run_selected_benchmarks():
+    results = run_benchmarks(
+        sizes=["small"], only=["parse", "midi/small"], repeat=1, min_time=0
+    )
+
+    assert [result.name for result in results] == ["parse/small", "midi/small"]
+    assert all(result.seconds > 0 and result.runs >= 1 for result in results)
+
+
+def test_baseline_comparison(tmp_path):
+    path = tmp_path / "baseline.json"
+    save_baseline(
+        [Result("parse/small", 0.010, 5), Result("midi/small", 1e-6, 5)], path
+    )
+    baseline = load_baseline(path)
+    assert "python" in baseline["environment"]
+
+    comparisons = compare(
+        [
+            Result("parse/small", 0.015, 5),  # 50% slower
+            Result("midi/small", 3e-6, 5),  # Slower, but within the noise floor
+            Result("render/small", 0.1, 5),  # Not in the baseline
+        ],
+        baseline,
+        threshold=0.25,
+    )
+    assert [c.regressed for c in comparisons] == [True, False, False]
+    assert round(comparisons[0].change, 2) == 0.5
+    assert comparisons[2].baseline is None
@@ -0,0 +1,188 @@
+import json
+import threading
+from click.testing import CliRunner
+from claude_gran_cassa.arrangement import Arrangement, Section
+from claude_gran_cassa.cli.main import cli
+from claude_gran_cassa.clock import (
+    CLOCK,
+    CONTINUE,
+    SONG_POSITION,
+    START,
+    STOP,
+    ClockStats,
+    LoopbackPort,
+    song_position,
+)
+from claude_gran_cassa.midi import MIDIPlayer
+from claude_gran_cassa.models import Composition, Pattern, SongConfig
+
+
+def groove(bpm=300, note=36):
+    # At 300 bpm a beat lasts 200ms and clock pulses come every 8.3ms
+    pattern = Pattern(hits=[1, 1, 1, 1], divisions=4, note=note)
+    return Composition(config=SongConfig(bpm=bpm), patterns=[pattern])
+
+
+def test_song_position_counts_sixteenths():
+    assert song_position(0) == [SONG_POSITION, 0, 0]
+    assert song_position(10) == [SONG_POSITION, 160 & 0x7F, 160 >> 7]
+
+
+def test_clock_stats_separate_drift_from_jitter():
+    interval = 10_000_000
+    stats = ClockStats()
+    for i in range(100):
+        due = i * interval
+        # 100ppm slow, plus alternating 50us of jitter
+        stats.record(due, due + due // 10_000 + (50_000 if i % 2 else 0))
+
+    assert abs(stats.drift_ppm - 100) < 3
+    assert 40_000 < stats.jitter_ns < 60_000
+
+    steady = ClockStats.from_arrivals([i * interval for i in range(10)], bpm=250)
+    assert steady.max_error_ns == 0 and steady.drift_ppm == 0
+
+
+class FakeClock:
+    """perf_counter_ns stand-in that only moves when the scheduler sleeps or
+    the port is busy writing"""
+
+    def __init__(self):
+        self.ns = 1_000_000_000
+
+    def __call__(self) -> int:
+        return self.ns
+
+    def ms(self) -> int:
+        return self.ns // 1_000_000
+
+    def sleep(self, seconds: float):
+        self.ns += max(1, round(seconds * 1e9))
+
+
+class FakePort:
+    """Records (timestamp ms, message) writes; each write takes ``write_ns``"""
+
+    def __init__(self, clock: FakeClock, write_ns: int = 0):
+        self.clock = clock
+        self.write_ns = write_ns
+        self.written = []
+
+    def write(self, events):
+        self.clock.ns += self.write_ns
+        self.written.extend((timestamp, message) for message, timestamp in events)
+
+
+def fake_player(clock, port, horizon_ms=5):
+    return MIDIPlayer(
+        horizon_ms=horizon_ms,
+        output=port,
+        clock=clock.ms,
+        send_clock=True,
+        timer=clock,
+        sleep=clock.sleep,
+    )
+
+
+def test_clock_master_sends_pulses_with_the_notes():
+    clock = FakeClock()
+    port = FakePort(clock)
+    player = fake_player(clock, port)
+    player.start(groove())
+    player.wait()
+    player.stop()
+
+    statuses = [message[0] for _, message in port.written]
+    assert statuses[0] == START
+    assert STOP in statuses[-3:]
+    # Pulses come before the note due at the same time, 24 to a beat
+    assert statuses[1:3] == [CLOCK, 0xB0]
+    note_ons = [i for i, status in enumerate(statuses) if status == 0x90]
+    assert all(statuses[a:b].count(CLOCK) == 24 for a, b in zip(note_ons, note_ons[1:]))
+
+    # Written ahead, each pulse leaves on its millisecond timestamp
+    assert len(player.clock_stats) == 96
+    assert player.clock_stats.max_error_ns < 1_000_000
+    timestamps = [timestamp * 1_000_000 for timestamp, _ in port.written]
+    pulses = [t for t, (_, m) in zip(timestamps, port.written) if m == [CLOCK]]
+    received = ClockStats.from_arrivals(pulses, bpm=300)
+    assert abs(received.drift_ppm) < 1_000
+    assert received.jitter_ns < 1_000_000
+
+
+def test_clock_stats_count_slow_writes_from_when_they_return():
+    clock = FakeClock()
+    port = FakePort(clock, write_ns=3_000_000)
+    player = fake_player(clock, port, horizon_ms=0)
+    player.start(groove())
+    player.wait()
+
+    # Every pulse is written when due and leaves once the write returns
+    errors = player.clock_stats._errors()[1]
+    assert errors.tolist() == [3_000_000] * 96
+    assert player.clock_stats.jitter_ns == 0
+
+    # Split writes measure each chunk after its own write
+    clock = FakeClock()
+    port = FakePort(clock, write_ns=3_000_000)
+    player = fake_player(clock, port, horizon_ms=50)
+    player.MAX_BATCH = 1
+    player.start(groove())
+    player.wait()
+    errors = player.clock_stats._errors()[1]
+    assert errors[0] == 6_000_000  # Waited for Start's write, then its own
+
+
+def test_stop_lands_after_the_notes_written_ahead():
+    clock = FakeClock()
+    port = FakePort(clock)
+    player = fake_player(clock, port, horizon_ms=100)
+    player.start(groove())
+    player.wait()  # Returns once the last batch is written, 100ms early
+    player.stop()
+
+    *played, stop, notes_off = port.written
+    assert (stop[1], notes_off[1]) == ([STOP], [0xB0, 123, 0])
+    assert stop[0] == notes_off[0] == max(timestamp for timestamp, _ in played)
+    assert stop[0] > clock.ms()
+
+
+def test_arrangement_starting_mid_way_sends_song_position():
+    arrangement = Arrangement([Section(groove(note=36)), Section(groove(note=38))])
+    clock = FakeClock()
+    port = FakePort(clock)
+    player = fake_player(clock, port)
+    player.start_arrangement(arrangement, start_bar=1)
+    player.wait()
+    player.stop()
+
+    messages = [message for _, message in port.written]
+    assert messages[:2] == [song_position(1), [CONTINUE]]
+    assert [m[1] for m in messages if m[0] == 0x90] == [38] * 4
+    assert sum(m == [CLOCK] for m in messages) == 96  # One bar
+
+
+def test_loopback_port_delivers_in_timestamp_order():
+    arrivals = threading.Event()
+    port = LoopbackPort(
+        on_message=lambda _, message: message == [STOP] and arrivals.set()
+    )
+    now = port.time()
+    port.write([[[CLOCK], now + 2], [[START], now], [[STOP], now + 2]])
+    assert arrivals.wait(5)
+    port.close()
+
+    assert [message for _, message in port.messages()] == [[START], [CLOCK], [STOP]]
+    assert len(port.messages(CLOCK)) == 1
+
+
+def test_clock_is_rejected_for_audio_playback(tmp_path):
+    pattern = tmp_path / "p.json"
+    pattern.write_text(json.dumps(groove().to_dict()))
+
+    result = CliRunner().invoke(
+        cli, ["play", str(pattern), "--audio", "--samples", "bank.json", "--clock"]
+    )
+
+    assert result.exit_code == 2
+    assert "--clock" in result.output and "Traceback" not in result.output
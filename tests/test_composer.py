@@ -1,5 +1,7 @@
+import json
 import os
 import pytest
+from types import SimpleNamespace
 from claude_gran_cassa.composer import Composer
 from claude_gran_cassa.models import Composition
 
@@ -56,3 +58,84 @@ def test_pattern_evolution(composer):
 
     kick = next(p for p in evolved.patterns if p.name == "kick")
     assert len(set(kick.velocities)) > 1
+
+
+class StubStream:
+    def __init__(self, text, chunk_size=16):
+        self.text_stream = (
+            text[i : i + chunk_size] for i in range(0, len(text), chunk_size)
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class StubStreamingClient:
+    def __init__(self, text):
+        self.text = text
+        self.messages = self
+
+    def stream(self, **request):
+        return StubStream(self.text)
+
+
+def test_stream_pattern_yields_growing_compositions():
+    from tests.test_parser import RESPONSE
+
+    client = StubStreamingClient("Here:\n" + json.dumps(RESPONSE))
+    composer = Composer(api_key="test", client=client)
+
+    compositions = list(composer.stream_pattern("minimal techno"))
+
+    assert [len(c.patterns) for c in compositions] == [1, 2, 2]
+    assert compositions[0].patterns[0].name == "kick"
+    assert compositions[-1].to_dict() == compositions[-2].to_dict()
+
+
+class StubClient:
+    def __init__(self, text):
+        self.text = text
+        self.requests = []
+        self.messages = self
+
+    def create(self, **request):
+        self.requests.append(request)
+        return SimpleNamespace(content=[SimpleNamespace(text=self.text)])
+
+
+def test_delta_evolution_applies_patch_locally():
+    composition = Composition.from_dict(
+        {
+            "config": {"bpm": 130, "time_signature": [4, 4]},
+            "patterns": [
+                {
+                    "name": "kick",
+                    "hits": [1, 0, 1, 0],
+                    "divisions": 4,
+                    "channel": 1,
+                    "note": 36,
+                    "velocities": [127, 127],
+                    "panning": [64, 64],
+                }
+            ],
+        }
+    )
+    client = StubClient(
+        'Here is the patch: [{"op": "replace", '
+        '"path": "/patterns/0/velocities", "value": [127, 90]}]'
+    )
+    composer = Composer(api_key="test", client=client)
+
+    evolved = composer.evolve_pattern(composition, "accent the one", delta=True)
+
+    assert evolved.patterns[0].velocities == [127, 90]
+    assert evolved.patterns[0].panning == [64, 64]
+    assert composition.patterns[0].velocities == [127, 127]
+    assert "JSON Patch" in client.requests[0]["messages"][0]["content"]
+
+    client.text = '[{"op": "remove", "path": "/patterns/0/hits"}]'
+    with pytest.raises(ValueError):
+        composer.evolve_pattern(composition, "break it", delta=True)
@@ -0,0 +1,115 @@
+import json
+import threading
+import time
+import pytest
+from claude_gran_cassa.daemon import FileWatcher, PlaybackDaemon, send
+from tests.test_playback import RecordingPlayer, make_composition
+
+
+def write(path, composition):
+    path.write_text(json.dumps(composition.to_dict()))
+
+
+def wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_file_watcher_reports_changed_files(tmp_path):
+    path = tmp_path / "groove.json"
+    path.write_text("{}")
+    watcher = FileWatcher(on_change=None)
+    watcher.watch(path)
+    assert watcher.poll() == []
+
+    path.write_text('{"changed": true}')
+    assert watcher.poll() == [path.resolve()]
+    assert watcher.poll() == []
+
+
+class SlowComposer:
+    def __init__(self):
+        self.release = threading.Event()
+
+    def generate_pattern(self, prompt):
+        self.release.wait(5)  # Stands in for a long API call
+        return make_composition(38, bpm=300)
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    socket_path = tmp_path / "daemon.sock"
+    composer = SlowComposer()
+    server = PlaybackDaemon(
+        RecordingPlayer(),
+        socket_path,
+        composer_factory=lambda: composer,
+        poll_interval=0.01,
+    )
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    assert wait_for(socket_path.exists)
+    yield server
+    send(socket_path, "shutdown")
+    thread.join(5)
+    assert not socket_path.exists()
+
+
+def test_daemon_plays_and_reloads_watched_files(daemon, tmp_path):
+    # Files are validated on load, which caps the tempo at 300 bpm
+    path = tmp_path / "groove.json"
+    write(path, make_composition(36, bpm=300))
+
+    reply = send(daemon.socket_path, "play", file=str(path))
+    assert reply["file"] == str(path.resolve())
+    status = send(daemon.socket_path, "status")
+    assert status["playing"] and status["watching"] == [str(path.resolve())]
+
+    time.sleep(0.05)
+    write(path, make_composition(42, bpm=300))
+    assert wait_for(lambda: daemon.player.played[-1][1] == 42)
+    # The swap lands on the bar line after the first 800ms bar
+    assert daemon.player.played[0] == (0, 36)
+    assert (800_000_000, 42) in daemon.player.played
+
+    path.write_text("{not json")
+    assert wait_for(lambda: daemon.last_error is not None)
+    assert "groove.json" in send(daemon.socket_path, "status")["last_error"]
+
+
+def test_daemon_reports_errors(daemon, tmp_path):
+    with pytest.raises(ValueError, match="Unknown command"):
+        send(daemon.socket_path, "dance")
+    with pytest.raises(ValueError, match="No such file"):
+        send(daemon.socket_path, "play", file=str(tmp_path / "missing.json"))
+    with pytest.raises(ConnectionError):
+        send(tmp_path / "missing.sock", "status")
+
+    offline = PlaybackDaemon(RecordingPlayer(), tmp_path / "offline.sock")
+    reply = offline.handle(
+        {"command": "generate", "args": {"prompt": "x", "output": "x"}}
+    )
+    assert not reply["ok"] and "without an API client" in reply["error"]
+
+
+def test_generation_does_not_block_other_commands(daemon, tmp_path):
+    output = tmp_path / "generated.json"
+    replies = []
+    request = threading.Thread(
+        target=lambda: replies.append(
+            send(daemon.socket_path, "generate", prompt="x", output=str(output))
+        )
+    )
+    request.start()
+    time.sleep(0.05)
+
+    # The generate request is still waiting on the API
+    assert not send(daemon.socket_path, "status")["playing"]
+    send(daemon.socket_path, "stop")
+
+    daemon.composer.release.set()
+    request.join(5)
+    assert replies == [{"file": str(output.resolve())}]
+    assert send(daemon.socket_path, "status")["playing"]
@@ -0,0 +1,87 @@
+import json
+import mido
+import numpy as np
+import pytest
+from claude_gran_cassa.audio.render import OfflineRenderer
+from claude_gran_cassa.export import (
+    ExportJob,
+    SharedSoundBank,
+    export_bulk,
+    find_patterns,
+)
+from claude_gran_cassa.models import Composition, Pattern, SongConfig
+
+
+def write_patterns(directory, count):
+    (directory / "nested").mkdir(parents=True)
+    for i in range(count):
+        composition = Composition(
+            config=SongConfig(bpm=120 + i),
+            patterns=[Pattern(hits=[1, 0, 1, 0], divisions=4, note=36, name="kick")],
+        )
+        folder = directory / "nested" if i % 2 else directory
+        (folder / f"pattern_{i}.json").write_text(json.dumps(composition.to_dict()))
+
+
+def bank():
+    return {
+        36: np.full((100, 2), 16384, dtype=np.int16),
+        42: np.arange(60, dtype=np.int16).reshape(30, 2),
+    }
+
+
+def test_find_patterns_mirrors_layout(tmp_path):
+    write_patterns(tmp_path / "in", 3)
+    single = tmp_path / "in" / "pattern_0.json"
+
+    items = find_patterns([tmp_path / "in", single])
+
+    relative = sorted(str(relative) for _, relative in items)
+    assert relative == [
+        "nested/pattern_1.json",
+        "pattern_0.json",
+        "pattern_0.json",
+        "pattern_2.json",
+    ]
+
+
+def test_shared_sound_bank_round_trip():
+    samples = bank()
+    with SharedSoundBank(samples) as shared:
+        memory, attached = SharedSoundBank.attach(shared.spec)
+        for note, sample in samples.items():
+            np.testing.assert_array_equal(attached[note], sample)
+        assert not attached[36].flags.writeable
+        del attached
+        memory.close()
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_export_bulk(tmp_path, workers):
+    write_patterns(tmp_path / "in", 6)
+    (tmp_path / "in" / "broken.json").write_text("{}")
+    job = ExportJob(output_dir=tmp_path / "out", audio=True, loops=2)
+
+    results = export_bulk(
+        find_patterns([tmp_path / "in"]), job, bank(), workers=workers
+    )
+
+    assert len(results) == 7
+    failed = [result for result in results if not result.ok]
+    assert [result.source.name for result in failed] == ["broken.json"]
+    assert "KeyError" in failed[0].error
+
+    midi = mido.MidiFile(tmp_path / "out" / "nested" / "pattern_1.mid")
+    notes = [m for track in midi.tracks for m in track if m.type == "note_on"]
+    assert len(notes) == 8  # Two hits, two loops, each with a release
+
+    renderer = OfflineRenderer()
+    renderer.samples = bank()
+    with open(tmp_path / "in" / "pattern_2.json") as f:
+        expected = renderer.render(Composition.from_dict(json.load(f)), loops=2)
+    assert (tmp_path / "out" / "pattern_2.wav").stat().st_size == 44 + expected.size * 2
+
+
+def test_audio_export_needs_samples(tmp_path):
+    with pytest.raises(ValueError):
+        export_bulk([], ExportJob(output_dir=tmp_path, audio=True), workers=1)
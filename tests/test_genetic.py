@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from claude_gran_cassa.genetic import (
+    FITNESS,
+    GeneticEngine,
+    Population,
+    density,
+    similarity,
+    syncopation,
+)
+from claude_gran_cassa.models import Composition, Pattern, SongConfig
+
+
+def seed_composition():
+    return Composition(
+        config=SongConfig(bpm=128),
+        patterns=[
+            Pattern(hits=[1, 0, 0, 0] * 4, note=36, velocities=[120, 90, 100, 80]),
+            Pattern(hits=[0, 0, 1, 0] * 4, note=42, panning=[10, 20, 30, 40]),
+        ],
+    )
+
+
+def test_population_round_trips_seed():
+    seed = seed_composition()
+    population = Population.from_composition(seed, 4)
+
+    assert len(population) == 4
+    assert population.composition(3) == seed
+    np.testing.assert_array_equal(similarity()(population), np.ones(4))
+
+
+def test_fitness_functions():
+    seed = seed_composition()
+    population = Population.from_composition(seed, 2)
+    population.hits[0][1] = True  # Second individual: kick on every step
+
+    np.testing.assert_allclose(density(0.25)(population), [1.0, 0.625])
+    # Hihat on the "and" of every beat is fully syncopated; kick is on the beat
+    np.testing.assert_allclose(syncopation()(population), [0.5, 16 / 20])
+
+
+def test_engine_selects_for_fitness():
+    seed = seed_composition()
+    engine = GeneticEngine(density(0.75), population_size=128, seed=1)
+    candidates = engine.run(seed, generations=30, k=3)
+
+    assert len(candidates) == 3
+    assert [c.score for c in candidates] == sorted(
+        (c.score for c in candidates), reverse=True
+    )
+    best = candidates[0].composition
+    for pattern, original in zip(best.patterns, seed.patterns):
+        assert pattern.hit_count / pattern.hit_length > 0.5
+        assert len(pattern.velocities) == len(pattern.panning) == pattern.hit_count
+        assert (pattern.note, pattern.divisions) == (original.note, original.divisions)
+
+
+def test_density_bounds_and_reproducibility():
+    seed = seed_composition()
+    engine = GeneticEngine(
+        FITNESS["syncopated"](), population_size=64, max_density=0.25, seed=7
+    )
+    for candidate in engine.run(seed, generations=10, k=5):
+        for pattern in candidate.composition.patterns:
+            assert pattern.hit_count <= 4
+
+    first = GeneticEngine(similarity(), population_size=32, seed=3).run(seed, 5)
+    second = GeneticEngine(similarity(), population_size=32, seed=3).run(seed, 5)
+    assert [c.composition for c in first] == [c.composition for c in second]
+
+    with pytest.raises(ValueError):
+        GeneticEngine(similarity(), min_density=0.8, max_density=0.2)
@@ -0,0 +1,180 @@
+import io
+import json
+import mido
+import numpy as np
+import pytest
+from click.testing import CliRunner
+from claude_gran_cassa.cli.main import cli
+from claude_gran_cassa.ingest import (
+    choose_grids,
+    find_midi_files,
+    import_midi,
+    ingest_bulk,
+    read_midi,
+)
+from claude_gran_cassa.midi import MIDIConverter
+from claude_gran_cassa.models import Composition, Pattern, SongConfig
+
+
+def groove(bpm=110):
+    return Composition(
+        config=SongConfig(bpm=bpm),
+        patterns=[
+            Pattern(
+                hits=[1, 0, 0, 0] * 4,
+                channel=10,
+                note=36,
+                velocities=[120, 90, 100, 80],
+                panning=[64, 64, 64, 64],
+                name="kick",
+            ),
+            Pattern(
+                hits=[0, 0, 1, 0] * 4,
+                channel=2,
+                note=42,
+                velocities=[70] * 4,
+                panning=[20, 40, 100, 127],
+                name="hat",
+            ),
+            Pattern(
+                hits=[1, 0, 1, 1, 0, 1, 1, 0, 1, 1, 0, 1],
+                divisions=12,
+                channel=3,
+                note=38,
+                name="shaker",
+            ),
+        ],
+    )
+
+
+def midi_bytes(composition, loops=1):
+    return io.BytesIO(MIDIConverter().to_bytes(composition, loops))
+
+
+def test_round_trip_through_midi():
+    original = groove()
+    [imported] = import_midi(midi_bytes(original))
+
+    assert imported.config.bpm == 110
+    by_note = {pattern.note: pattern for pattern in imported.patterns}
+    for pattern in original.patterns:
+        found = by_note[pattern.note]
+        assert found.hits == pattern.hits
+        assert found.divisions == pattern.divisions
+        assert found.velocities == pattern.velocities
+        assert found.panning == pattern.panning
+    assert by_note[36].channel == 10 and by_note[36].name == "kick"
+    assert len({pattern.channel for pattern in imported.patterns}) == 3
+
+
+def test_long_files_become_several_loops():
+    compositions = import_midi(midi_bytes(groove(), loops=5), bars=2)
+
+    assert [c.patterns[0].bars for c in compositions] == [2, 2, 1]
+    kick = next(p for p in compositions[0].patterns if p.note == 36)
+    assert kick.hits == [1, 0, 0, 0] * 8 and kick.divisions == 32
+
+
+def test_grid_detection_prefers_coarse_grids_and_spots_triplets():
+    straight = np.array([0, 0.25, 0.5, 0.75, 0.0625])
+    triplet = np.array([0, 1 / 3, 2 / 3])
+    humanized = np.array([0.005, 0.245, 0.504, 0.748])
+    position = np.concatenate([straight, triplet, humanized])
+    group = np.repeat([0, 1, 2], [len(straight), len(triplet), len(humanized)])
+
+    assert choose_grids(position, group, 3).tolist() == [16, 12, 16]
+
+
+def test_pan_follows_the_latest_cc10_on_the_note_channel():
+    track = mido.MidiTrack(
+        [
+            mido.Message("control_change", channel=0, control=10, value=0),
+            mido.Message("control_change", channel=1, control=10, value=127),
+            mido.Message("note_on", channel=0, note=36, velocity=100),
+            mido.Message("note_on", channel=2, note=38, velocity=100),
+            mido.Message("control_change", channel=0, control=10, value=90, time=240),
+            mido.Message("note_on", channel=0, note=36, velocity=100, time=240),
+        ]
+    )
+    midi = mido.MidiFile()
+    midi.tracks.append(track)
+    data = io.BytesIO()
+    midi.save(file=data)
+    data.seek(0)
+
+    events = read_midi(data)
+
+    assert events.pan.tolist() == [0, 64, 90]
+    assert events.bpm == 120
+
+
+def test_running_status_meta_and_sysex_are_decoded(tmp_path):
+    track = mido.MidiTrack(
+        [
+            mido.MetaMessage("set_tempo", tempo=mido.bpm2tempo(90)),
+            mido.MetaMessage("time_signature", numerator=3, denominator=4),
+            mido.Message("sysex", data=[1, 2, 3]),
+            mido.Message("program_change", channel=1, program=5),
+            mido.Message("note_on", channel=1, note=40, velocity=80),
+            mido.Message("note_on", channel=1, note=40, velocity=0, time=10),
+            mido.Message("note_on", channel=1, note=41, velocity=90, time=10),
+        ]
+    )
+    midi = mido.MidiFile()
+    midi.tracks.append(track)
+    path = tmp_path / "running.mid"
+    midi.save(path)  # mido writes the note-ons with running status
+
+    events = read_midi(path)
+
+    assert (events.bpm, events.time_signature) == (90, (3, 4))
+    assert events.tick.tolist() == [0, 20]
+    assert events.note.tolist() == [40, 41]
+    assert events.channel.tolist() == [1, 1]
+
+    path.write_bytes(path.read_bytes()[:-6])
+    with pytest.raises(ValueError):
+        read_midi(path)
+
+
+def test_inputs_importing_to_the_same_place_are_rejected(tmp_path):
+    for folder in ("a", "b"):
+        (tmp_path / folder).mkdir()
+        (tmp_path / folder / "groove.mid").write_bytes(midi_bytes(groove()).read())
+    inputs = [tmp_path / "a" / "groove.mid", tmp_path / "b" / "groove.mid"]
+
+    with pytest.raises(ValueError, match="same place"):
+        find_midi_files(inputs)
+
+    result = CliRunner().invoke(
+        cli,
+        ["import", *map(str, inputs), "-o", str(tmp_path / "out"), "--no-library"],
+    )
+    assert result.exit_code == 2
+    assert "same place" in result.output
+
+
+def test_bulk_import_cli(tmp_path):
+    source = tmp_path / "in"
+    (source / "nested").mkdir(parents=True)
+    for i, folder in enumerate([source, source / "nested"]):
+        (folder / f"groove_{i}.mid").write_bytes(midi_bytes(groove(100 + i)).read())
+    (source / "broken.mid").write_bytes(b"not midi")
+
+    assert len(find_midi_files([source])) == 3
+    assert (
+        sum(result.ok for result in ingest_bulk(find_midi_files([source]), workers=2))
+        == 2
+    )
+
+    result = CliRunner().invoke(
+        cli,
+        ["import", str(source), "-o", str(tmp_path / "out"), "--no-library"],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "Imported 2/3 files as 2 patterns" in result.output
+    written = json.loads(
+        (tmp_path / "out" / "nested" / "groove_1_001.json").read_text()
+    )
+    assert written["config"]["bpm"] == 101
@@ -0,0 +1,98 @@
+import threading
+from claude_gran_cassa.cli.utils import get_versioned_filename, library_name
+from claude_gran_cassa.library import PatternLibrary
+from claude_gran_cassa.models import Composition, Pattern, SongConfig
+
+
+def composition(bpm=120, triplet=False, name="hihat", hits=None):
+    hits = hits or [1, 0, 1, 0]
+    return Composition(
+        config=SongConfig(bpm=bpm),
+        patterns=[
+            Pattern(hits=[1, 0, 0, 0], note=36, name="kick"),
+            Pattern(
+                hits=hits, divisions=len(hits), triplet=triplet, note=42, name=name
+            ),
+        ],
+    )
+
+
+def test_versions_are_allocated_per_name(tmp_path):
+    with PatternLibrary(tmp_path / "library.db") as library:
+        first = library.add(composition(), "groove")
+        second = library.add(composition(), "groove")
+        other = library.add(composition(), "other")
+
+        assert (first.version, second.version, other.version) == (1, 2, 1)
+        assert library.latest("groove").id == second.id
+        assert library.get(first.id).composition == composition()
+
+
+def test_concurrent_writers_get_unique_versions(tmp_path):
+    path = tmp_path / "library.db"
+    PatternLibrary(path).close()
+    versions = []
+
+    def worker():
+        with PatternLibrary(path) as library:
+            for _ in range(10):
+                versions.append(library.add(composition(), "groove").version)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(versions) == list(range(1, 41))
+
+
+def test_lineage_and_children(tmp_path):
+    with PatternLibrary(tmp_path / "library.db") as library:
+        root = library.add(composition(), "groove", path=tmp_path / "groove.json")
+        child = library.add(composition(), "groove", parent_id=root.id, prompt="more")
+        grandchild = library.add(composition(), "groove", parent_id=child.id)
+
+        lineage = library.lineage(grandchild.id)
+        assert [entry.id for entry in lineage] == [grandchild.id, child.id, root.id]
+        assert [entry.id for entry in library.children(root.id)] == [child.id]
+        assert library.find_by_path(tmp_path / "groove.json").id == root.id
+
+
+def test_query_by_tempo_and_pattern(tmp_path):
+    with PatternLibrary(tmp_path / "library.db") as library:
+        fast_triplet = library.add(composition(bpm=150, triplet=True), "a")
+        library.add(composition(bpm=150, triplet=False), "b")
+        library.add(composition(bpm=100, triplet=True), "c")
+        library.add(composition(bpm=160, triplet=True, name="snare"), "d")
+
+        results = library.query(bpm_min=140, triplet=True, pattern_name="hihat")
+        assert [entry.id for entry in results] == [fast_triplet.id]
+
+        # Pattern filters must hold for the same pattern: the kick is not triplet
+        assert library.query(triplet=True, note=36) == []
+
+        # Names match anywhere, case-insensitively, with wildcards taken literally
+        assert [e.name for e in library.query(pattern_name="SNA")] == ["d"]
+        assert [e.name for e in library.query(pattern_name="nare")] == ["d"]
+        assert library.query(pattern_name="h_hat") == []
+        closed = library.add(composition(name="closed hihat"), "e")
+        assert closed.id in [e.id for e in library.query(pattern_name="hihat")]
+
+        dense = library.add(composition(hits=[1, 1, 1, 1]), "dense")
+        assert [e.id for e in library.query(min_density=0.9)] == [dense.id]
+        assert len(library) == 6
+
+
+def test_versioned_filename_follows_highest_existing(tmp_path):
+    base = tmp_path / "groove.json"
+    assert get_versioned_filename(base) == base
+
+    base.touch()
+    assert get_versioned_filename(base) == tmp_path / "groove_v1.json"
+
+    (tmp_path / "groove_v1.json").touch()
+    (tmp_path / "groove_v3.json").touch()
+    (tmp_path / "groove_extra_v9.json").touch()
+    assert get_versioned_filename(base) == tmp_path / "groove_v4.json"
+    assert library_name(tmp_path / "groove_v4.json") == "groove"
@@ -1,7 +1,11 @@
+import io
+import json
+import mido
 import os
-import pytest
 import tempfile
-from claude_gran_cassa.midi import MIDIConverter
+from click.testing import CliRunner
+from claude_gran_cassa.cli.main import cli
+from claude_gran_cassa.midi import MIDIConverter, MIDIPlayer
 from claude_gran_cassa.models import Composition, Pattern, SongConfig
 
 
@@ -26,6 +30,13 @@ def test_basic_midi_conversion():
         assert os.path.exists(tmp.name)
         assert os.path.getsize(tmp.name) > 0
 
+        notes = [
+            msg
+            for msg in mido.MidiFile(tmp.name)
+            if msg.type == "note_on" and msg.velocity > 0
+        ]
+        assert [msg.velocity for msg in notes] == [127, 120, 127, 120]
+
         os.unlink(tmp.name)
 
 
@@ -45,7 +56,93 @@ def test_triplet_conversion():
     composition = Composition(config=config, patterns=[pattern])
     converter = MIDIConverter()
 
-    with tempfile.NamedTemporaryFile(suffix=".mid", delete=False) as tmp:
-        converter.convert(composition, tmp.name)
-        # TODO: Additional MIDI file validation
-        os.unlink(tmp.name)
+    midi = mido.MidiFile(file=io.BytesIO(converter.to_bytes(composition)))
+    onsets = []
+    now = 0
+    for msg in midi.tracks[1]:
+        now += msg.time
+        if msg.type == "note_on" and msg.velocity > 0:
+            onsets.append(now)
+    # Steps of int(1920 / 6 * 2 / 3) ticks
+    assert onsets == [0, 426, 852]
+
+
+def test_smf_tracks_and_running_status():
+    kick = Pattern(hits=[1, 0, 0, 0], divisions=4, channel=1, note=36, name="kick")
+    hat = Pattern(
+        hits=[1, 1, 1, 1], divisions=4, channel=2, note=42, name="hat", bars=2
+    )
+    composition = Composition(config=SongConfig(bpm=120), patterns=[kick, hat])
+    converter = MIDIConverter()
+
+    data = converter.to_bytes(composition, loops=2)
+    midi = mido.MidiFile(file=io.BytesIO(data))
+    assert midi.type == 1
+    assert [track.name for track in midi.tracks] == ["", "kick", "hat"]
+    assert midi.length == 8.0  # Two loops of the two-bar hat at 120 bpm
+
+    hat_notes = [msg for msg in midi.tracks[2] if msg.type == "note_on"]
+    assert len(hat_notes) == 16  # 8 hits, each with a velocity-0 release
+    assert {msg.channel for msg in hat_notes} == {1}
+
+    # Pan is sent once and the note status byte once per track
+    assert len([msg for msg in midi.tracks[2] if msg.type == "control_change"]) == 1
+    assert data.count(bytes([0x91, 42, 100])) == 1
+
+    single = mido.MidiFile(file=io.BytesIO(converter.to_bytes(composition, 1, False)))
+    assert single.type == 0 and len(single.tracks) == 1
+    assert converter.convert(composition) == converter.to_bytes(composition)
+
+
+class FakeOutput:
+    def __init__(self):
+        self.writes = []
+
+    def write(self, events):
+        self.writes.append(events)
+
+
+def test_midi_player_writes_timestamped_batches():
+    # At 3000 bpm a bar lasts 80ms; four hits 20ms apart
+    pattern = Pattern(
+        hits=[1, 1, 1, 1],
+        divisions=4,
+        channel=10,
+        note=42,
+        velocities=[100, 90, 80, 70],
+        panning=[0, 64, 127, 64],
+    )
+    composition = Composition(config=SongConfig(bpm=3000), patterns=[pattern])
+    output = FakeOutput()
+    player = MIDIPlayer(horizon_ms=50, output=output, clock=lambda: 1000)
+
+    player.play(composition)
+
+    # The 50ms horizon covers several notes per write instead of one per note
+    data_writes = output.writes[:-1]
+    assert len(data_writes) < 4
+    events = [event for write in data_writes for event in write]
+    note_ons = [(msg, ts) for msg, ts in events if msg[0] == 0x99]
+    assert [msg[2] for msg, _ in note_ons] == [100, 90, 80, 70]
+    assert [ts - 1000 for _, ts in note_ons] == [0, 20, 40, 60]
+    pans = [msg[2] for msg, _ in events if msg[:2] == [0xB9, 10]]
+    assert pans == [0, 64, 127, 64]
+    assert len([msg for msg, _ in events if msg[0] == 0x89]) == 4
+
+    # Stopping silences every channel that was used, after the notes
+    # already written ahead have played
+    last = max(timestamp for _, timestamp in events)
+    assert last > 1000
+    assert output.writes[-1] == [[[0xB9, 123, 0], last]]
+
+
+def test_bad_device_is_reported_without_a_traceback(tmp_path):
+    pattern = tmp_path / "p.json"
+    composition = Composition(config=SongConfig(), patterns=[Pattern(hits=[1])])
+    pattern.write_text(json.dumps(composition.to_dict()))
+
+    result = CliRunner().invoke(cli, ["play", str(pattern), "--device", "9999"])
+
+    assert result.exit_code == 1
+    assert "Can't open MIDI output 9999" in result.output
+    assert isinstance(result.exception, SystemExit)  # Not a traceback
@@ -1,3 +1,4 @@
+import json
 import pytest
 from claude_gran_cassa.models import Pattern, SongConfig, Composition
 
@@ -27,3 +28,55 @@ def test_composition_serialization():
 
     assert restored.config.bpm == 135
     assert restored.patterns[0].hits == [1, 0, 0, 0]
+
+
+def test_pattern_stores_compact_representation():
+    pattern = Pattern(hits=[1, 0, 1, 1, 0, 0, 0, 1], divisions=8, name="hat")
+
+    assert not hasattr(pattern, "__dict__")
+    assert pattern.hit_mask == 0b10001101
+    assert pattern.hit_count == 4
+    assert pattern.velocity_bytes.typecode == "B"
+    assert pattern.pan_bytes.typecode == "B"
+
+    pattern.hits = [1, 1, 0, 0, 0, 0, 0, 0]
+    assert pattern.hit_count == 2
+    assert pattern.hits == [1, 1, 0, 0, 0, 0, 0, 0]
+
+
+def test_pattern_round_trip_and_equality():
+    data = {
+        "hits": [1, 0, 0, 1],
+        "divisions": 4,
+        "triplet": True,
+        "channel": 3,
+        "note": 42,
+        "velocities": [90, 60],
+        "panning": [0, 127],
+        "name": "hat",
+        "bars": 2,
+    }
+    pattern = Pattern.from_dict(data)
+
+    assert pattern.to_dict() == data
+    assert pattern == Pattern.from_dict(data)
+    assert pattern != Pattern.from_dict(dict(data, note=46))
+
+
+def test_pattern_rejects_out_of_range_values():
+    with pytest.raises(ValueError):
+        Pattern(hits=[1], divisions=1, velocities=[300])
+    with pytest.raises(ValueError):
+        Pattern(hits=[1], divisions=1, panning=[-1])
+
+
+def test_pattern_values_read_as_lists_and_stay_midi_range():
+    pattern = Pattern(hits=[1, 1], divisions=2, velocities=[100, 90], panning=[0, 127])
+
+    assert pattern.velocities == [100, 90] and pattern.panning == [0, 127]
+    assert json.dumps(pattern.velocities) == "[100, 90]"
+    assert bytes(pattern.velocity_bytes) == bytes([100, 90])
+    with pytest.raises(ValueError, match="0-127"):
+        Pattern(hits=[1], divisions=1, velocities=[128])
+    with pytest.raises(ValueError, match="0-127"):
+        pattern.panning = [64, 200]
@@ -0,0 +1,63 @@
+import json
+import pytest
+from claude_gran_cassa.models import Pattern, SongConfig
+from claude_gran_cassa.parser import IncrementalParser, ResponseParser
+
+RESPONSE = {
+    "config": {"bpm": 128, "time_signature": [4, 4], "swing_amount": 0.1},
+    "patterns": [
+        {
+            "name": "kick",
+            "hits": [1, 0, 0, 0],
+            "divisions": 4,
+            "channel": 1,
+            "note": 36,
+            "velocities": [127],
+            "panning": [0],
+        },
+        {
+            "name": 'hat "open" {brace}',
+            "hits": [0, 1, 0, 1],
+            "divisions": 4,
+            "channel": 2,
+            "note": 46,
+            "velocities": [90, 80],
+            "panning": [-64, 64],
+        },
+    ],
+}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 10_000])
+def test_incremental_parser_emits_items_as_objects_close(chunk_size):
+    text = "Sure! " + json.dumps(RESPONSE, indent=2) + "\nEnjoy {"
+    parser = IncrementalParser()
+    items = []
+    for i in range(0, len(text), chunk_size):
+        items.extend(parser.feed(text[i : i + chunk_size]))
+
+    assert parser.done
+    assert items[0] == SongConfig(bpm=128, time_signature=(4, 4), swing_amount=0.1)
+    assert [item.name for item in items[1:]] == ["kick", 'hat "open" {brace}']
+    assert items[2].panning == [0, 127]
+
+
+def test_incremental_parser_yields_pattern_before_response_ends():
+    text = json.dumps(RESPONSE)
+    first_pattern_end = text.index("}", text.index('"kick"')) + 1
+    parser = IncrementalParser()
+
+    items = parser.feed(text[:first_pattern_end])
+
+    assert isinstance(items[-1], Pattern)
+    assert items[-1].name == "kick"
+    assert not parser.done
+
+
+def test_parse_matches_incremental_parser():
+    text = json.dumps(RESPONSE)
+    composition = ResponseParser.parse(text)
+    items = IncrementalParser().feed(text)
+
+    assert items[0] == composition.config
+    assert items[1:] == composition.patterns
@@ -0,0 +1,45 @@
+import pytest
+from claude_gran_cassa.patch import PatchError, apply_patch
+
+DOCUMENT = {
+    "config": {"bpm": 130},
+    "patterns": [{"name": "kick", "velocities": [127, 120]}],
+}
+
+
+def test_apply_patch_operations():
+    patched = apply_patch(
+        DOCUMENT,
+        [
+            {"op": "replace", "path": "/config/bpm", "value": 140},
+            {"op": "replace", "path": "/patterns/0/velocities/1", "value": 90},
+            {"op": "add", "path": "/patterns/-", "value": {"name": "hat"}},
+            {"op": "add", "path": "/patterns/0", "value": {"name": "snare"}},
+            {"op": "remove", "path": "/patterns/2"},
+            {"op": "add", "path": "/config/swing~1shuffle", "value": 0.2},
+        ],
+    )
+
+    assert patched == {
+        "config": {"bpm": 140, "swing/shuffle": 0.2},
+        "patterns": [{"name": "snare"}, {"name": "kick", "velocities": [127, 90]}],
+    }
+    # The input is never modified
+    assert DOCUMENT["config"] == {"bpm": 130}
+
+
+@pytest.mark.parametrize(
+    "operation",
+    [
+        {"op": "move", "path": "/config/bpm", "from": "/config"},
+        {"op": "replace", "path": "/config/tempo", "value": 1},
+        {"op": "remove", "path": "/patterns/3"},
+        {"op": "replace", "path": "/patterns/0/velocities/x", "value": 1},
+        {"op": "add", "path": "/config/bpm"},
+        {"op": "replace", "path": "", "value": {}},
+        {"op": "replace", "path": "config", "value": {}},
+    ],
+)
+def test_invalid_operations_raise(operation):
+    with pytest.raises(PatchError):
+        apply_patch(DOCUMENT, [operation])
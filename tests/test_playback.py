@@ -0,0 +1,109 @@
+import time
+from claude_gran_cassa.models import Composition, Pattern, SongConfig
+from claude_gran_cassa.playback import Player
+
+
+class RecordingPlayer(Player):
+    def __init__(self):
+        super().__init__()
+        self.prepared = 0
+        self.cut = 0
+        self.bank = ""
+        self.played = []
+
+    def _prepare(self, timeline):
+        self.prepared += 1
+        notes = [
+            f"{self.bank}{note}" if self.bank else note
+            for note in timeline.note.tolist()
+        ]
+        return list(zip(timeline.nanoseconds().tolist(), notes))
+
+    def _bars(self, timeline, events):
+        self.cut += 1
+        return super()._bars(timeline, events)
+
+    def _dispatch(self, batch):
+        self.played.extend((due - self.scheduler.start_ns, note) for due, note in batch)
+
+
+def make_composition(note, bpm=3000):
+    # At 3000 bpm a bar lasts 80ms
+    pattern = Pattern(hits=[1, 0, 1, 0], divisions=4, note=note)
+    return Composition(config=SongConfig(bpm=bpm), patterns=[pattern])
+
+
+def test_loops_are_scheduled_back_to_back():
+    player = RecordingPlayer()
+    player.start(make_composition(36), loop=True)
+    time.sleep(0.3)
+    player.finish()
+    player.wait()
+
+    offsets = [offset for offset, _ in player.played]
+    assert len(offsets) >= 6
+    assert offsets == [i * 40_000_000 for i in range(len(offsets))]
+    assert player.prepared == 1
+    assert player.cut == 1  # Bar cuts are worked out with the payloads
+
+
+def test_queued_composition_starts_at_loop_boundary():
+    player = RecordingPlayer()
+    player.start(make_composition(36), loop=True)
+    player.queue(make_composition(42))
+    time.sleep(0.2)
+    player.stop()
+
+    notes = [note for _, note in player.played]
+    assert notes[:2] == [36, 36]
+    assert set(notes[2:]) == {42}
+    assert player.played[2][0] == 80_000_000
+
+
+def test_single_play_without_loop():
+    player = RecordingPlayer()
+    player.play(make_composition(36))
+
+    assert player.played == [(0, 36), (40_000_000, 36)]
+
+
+def test_bar_queued_composition_starts_at_next_bar_line():
+    # A two-bar loop (80ms bars) with hits at 0 and 120ms
+    pattern = Pattern(hits=[1, 0, 0, 1], divisions=4, note=36, bars=2)
+    two_bars = Composition(config=SongConfig(bpm=3000), patterns=[pattern])
+    player = RecordingPlayer()
+    player.start(two_bars, loop=True)
+    time.sleep(0.02)
+    player.queue(make_composition(42), at_bar=True)
+    time.sleep(0.15)
+    player.stop()
+
+    assert player.played[:2] == [(0, 36), (80_000_000, 42)]
+
+
+def test_swap_queued_after_the_last_hit_lands_at_loop_end():
+    # One 80ms bar with hits at 0 and 40ms; the swap comes in at 60ms
+    player = RecordingPlayer()
+    player.start(make_composition(36), loop=True)
+    time.sleep(0.06)
+    player.queue(make_composition(42), at_bar=True)
+    time.sleep(0.1)
+    player.stop()
+
+    assert player.played[:3] == [(0, 36), (40_000_000, 36), (80_000_000, 42)]
+
+
+def test_dropped_payloads_are_prepared_again_from_the_next_bar():
+    # A two-bar loop (80ms bars) with hits at 0 and 120ms
+    pattern = Pattern(hits=[1, 0, 0, 1], divisions=4, note=36, bars=2)
+    two_bars = Composition(config=SongConfig(bpm=3000), patterns=[pattern])
+    player = RecordingPlayer()
+    player.start(two_bars, loop=True)
+    time.sleep(0.02)
+    player.bank = "B"  # As AudioEngine.load_sound_bank does
+    player._prepared = None
+    time.sleep(0.15)
+    player.stop()
+
+    assert player.played[:3] == [(0, 36), (120_000_000, "B36"), (160_000_000, "B36")]
+    assert player.prepared == 2
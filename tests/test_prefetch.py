@@ -0,0 +1,74 @@
+import json
+import threading
+import time
+from types import SimpleNamespace
+from claude_gran_cassa.composer import Composer
+from claude_gran_cassa.models import Composition
+from claude_gran_cassa.prefetch import EvolutionPrefetcher, variations
+from tests.test_parser import RESPONSE
+
+
+class SlowClient:
+    """Counts requests by prompt and how many run at once"""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.prompts = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.messages = self
+        self._lock = threading.Lock()
+
+    def create(self, **request):
+        content = request["messages"][0]["content"]
+        prompt = content.split("Modification request: ")[1].split("\n")[0]
+        with self._lock:
+            self.prompts.append(prompt)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+        return SimpleNamespace(content=[SimpleNamespace(text=json.dumps(RESPONSE))])
+
+
+def base(bpm=130):
+    data = json.loads(json.dumps(RESPONSE))
+    data["config"]["bpm"] = bpm
+    for pattern in data["patterns"]:
+        pattern["panning"] = [64] * len(pattern["panning"])
+    return Composition.from_dict(data)
+
+
+def test_prefetched_evolution_is_served_without_a_new_request():
+    client = SlowClient()
+    with EvolutionPrefetcher(Composer(api_key="test", client=client)) as prefetcher:
+        assert prefetcher.speculate(base(), variations("more hats")) == 3
+        prefetcher.evolve(base(), "more hats, but more subtle")
+        assert (prefetcher.hits, prefetcher.misses) == (1, 0)
+
+        prefetcher.evolve(base(), "something else")
+        assert (prefetcher.hits, prefetcher.misses) == (1, 1)
+    assert client.prompts.count("more hats, but more subtle") == 1
+    assert client.max_in_flight <= 2
+
+
+def test_limit_caps_speculative_requests():
+    client = SlowClient(delay=0)
+    prefetcher = EvolutionPrefetcher(Composer(api_key="test", client=client), limit=2)
+    assert prefetcher.speculate(base(), ["a", "b", "c"]) == 2
+    assert prefetcher.speculate(base(), ["c"]) == 0
+    prefetcher.close()
+
+
+def test_new_base_cancels_stale_work():
+    client = SlowClient(delay=0.1)
+    prefetcher = EvolutionPrefetcher(Composer(api_key="test", client=client), workers=1)
+    prefetcher.speculate(base(), ["a", "b", "c"])
+    prefetcher.speculate(base(bpm=140), ["d"])
+    prefetcher.evolve(base(bpm=140), "d")
+    prefetcher.close()
+
+    # "a" was already running; "b" and "c" never started
+    assert client.prompts == ["a", "d"]
+    assert prefetcher.hits == 1
@@ -0,0 +1,93 @@
+import json
+import wave
+import numpy as np
+import pytest
+from claude_gran_cassa.audio.render import OfflineRenderer
+from claude_gran_cassa.audio.samples import decode_sample
+from claude_gran_cassa.models import Composition, Pattern, SongConfig
+
+
+def write_sample(path, frames=100, rate=44100, channels=1):
+    pcm = np.full(frames * channels, 16384, dtype="<i2")
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(pcm.tobytes())
+
+
+@pytest.fixture
+def renderer(tmp_path):
+    write_sample(tmp_path / "kick.wav")
+    bank = tmp_path / "bank.json"
+    bank.write_text(json.dumps({"36": str(tmp_path / "kick.wav")}))
+
+    renderer = OfflineRenderer()
+    renderer.load_sound_bank(bank)
+    return renderer
+
+
+def test_decode_sample_converts_to_mixer_format(tmp_path):
+    write_sample(tmp_path / "mono.wav", frames=220, rate=22050)
+    data = decode_sample(tmp_path / "mono.wav")
+
+    assert data.dtype == np.int16
+    assert data.shape == (440, 2)
+
+
+def test_render_places_hits_on_the_grid(renderer):
+    pattern = Pattern(
+        hits=[1, 0, 0, 0, 1, 0, 0, 0, 1, 0, 0, 0, 1, 0, 0, 0],
+        divisions=16,
+        note=36,
+        velocities=[127, 127, 127, 127],
+    )
+    composition = Composition(config=SongConfig(bpm=120), patterns=[pattern])
+
+    buffer = renderer.render(composition, loops=2)
+
+    # One bar at 120 bpm is 2 seconds; quarter notes every 22050 frames
+    assert buffer.shape[1] == 2
+    onsets = np.flatnonzero(np.diff((buffer[:, 0] > 0).astype(int)) == 1) + 1
+    assert [0] + list(onsets) == [i * 22050 for i in range(8)]
+
+
+def test_render_honours_velocity_and_panning(renderer):
+    pattern = Pattern(
+        hits=[1, 0, 1, 0], divisions=4, note=36, velocities=[127, 64], panning=[0, 127]
+    )
+    composition = Composition(config=SongConfig(bpm=120), patterns=[pattern])
+
+    buffer = renderer.render(composition)
+
+    # First hit is hard left at full velocity, second hard right at half
+    assert buffer[0, 0] == pytest.approx(0.5)
+    assert buffer[0, 1] == 0
+    second = 44100
+    assert buffer[second, 0] == 0
+    assert buffer[second, 1] == pytest.approx(0.5 * 64 / 127)
+
+
+def test_write_wav(renderer, tmp_path):
+    composition = Composition(
+        config=SongConfig(bpm=130), patterns=[Pattern(hits=[1, 0, 0, 0], divisions=4)]
+    )
+    output = tmp_path / "out.wav"
+    renderer.write_wav(renderer.render(composition), output)
+
+    with wave.open(str(output), "rb") as wav:
+        assert wav.getnchannels() == 2
+        assert wav.getframerate() == 44100
+        assert wav.getnframes() > 0
+
+
+def test_overlapping_hits_add_up(renderer):
+    kick = Pattern(hits=[1] * 64, divisions=64, note=36, velocities=[127] * 64)
+    composition = Composition(config=SongConfig(bpm=120), patterns=[kick, kick])
+
+    buffer = renderer.render(composition)
+
+    # 64th notes are 1378 frames apart, so only the doubled hits overlap
+    assert buffer[0].tolist() == pytest.approx([1.0, 1.0])
+    assert buffer[1378].tolist() == pytest.approx([1.0, 1.0])
+    assert buffer[1377].tolist() == [0.0, 0.0]
@@ -0,0 +1,95 @@
+import json
+import os
+import pytest
+from types import SimpleNamespace
+from claude_gran_cassa.composer import Composer
+from claude_gran_cassa.response_cache import ResponseCache
+from tests.test_batch import RESPONSE
+
+
+class StubClient:
+    def __init__(self):
+        self.calls = 0
+        self.messages = self
+
+    def create(self, **request):
+        self.calls += 1
+        return SimpleNamespace(content=[SimpleNamespace(text=json.dumps(RESPONSE))])
+
+
+def test_key_depends_on_request_content():
+    request = {"model": "m", "system": "s", "messages": [], "max_tokens": 10}
+
+    assert ResponseCache.key(request) == ResponseCache.key(dict(request))
+    assert ResponseCache.key(request) != ResponseCache.key(dict(request, max_tokens=20))
+
+
+def test_ttl_expiry(tmp_path):
+    cache = ResponseCache(tmp_path, ttl=60)
+    cache.put("abc", "{}")
+    assert cache.get("abc") == "{}"
+
+    path = tmp_path / "abc.json"
+    entry = json.loads(path.read_text())
+    entry["created"] -= 120
+    path.write_text(json.dumps(entry))
+
+    assert cache.get("abc") is None
+    assert not path.exists()
+
+
+@pytest.mark.parametrize(
+    "entry",
+    [{"response": "{}"}, {"created": "yesterday", "response": "{}"}, ["{}"], {}],
+)
+def test_malformed_entries_are_dropped_as_misses(tmp_path, entry):
+    cache = ResponseCache(tmp_path)
+    path = tmp_path / "abc.json"
+    path.write_text(json.dumps(entry))
+
+    assert cache.get("abc") is None
+    assert not path.exists()
+
+    cache.put("abc", "{}")
+    assert cache.get("abc") == "{}"
+
+
+def test_size_eviction_drops_least_recently_used(tmp_path):
+    cache = ResponseCache(tmp_path)
+    cache.put("size", "x" * 50)
+    entry_size = (tmp_path / "size.json").stat().st_size
+    cache.clear()
+
+    # Room for three entries, not four
+    cache.max_bytes = entry_size * 3 + entry_size // 2
+    for i, key in enumerate(["a", "b", "c"]):
+        cache.put(key, "x" * 50)
+        os.utime(tmp_path / f"{key}.json", (i, i))
+    cache.get("a")
+    cache.put("d", "x" * 50)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("d") is not None
+
+
+def test_composer_serves_repeats_from_cache(tmp_path):
+    client = StubClient()
+    composer = Composer(api_key="test", client=client, cache=ResponseCache(tmp_path))
+
+    first = composer.generate_pattern("minimal kick")
+    second = composer.generate_pattern("minimal kick")
+    composer.generate_pattern("something else")
+
+    assert client.calls == 2
+    assert second.to_dict() == first.to_dict()
+
+
+def test_offline_mode_only_replays(tmp_path):
+    cache = ResponseCache(tmp_path)
+    Composer(api_key="test", client=StubClient(), cache=cache).generate_pattern("kick")
+
+    offline = Composer(api_key=None, cache=cache, offline=True)
+    assert offline.generate_pattern("kick").config.bpm == 130
+    with pytest.raises(ValueError, match="offline"):
+        offline.generate_pattern("snare")
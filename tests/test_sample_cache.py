@@ -0,0 +1,78 @@
+import json
+import os
+import numpy as np
+import pytest
+from claude_gran_cassa.audio.cache import SampleCache
+from claude_gran_cassa.audio.samples import decode_sample
+from tests.test_render import write_sample
+
+
+@pytest.fixture
+def banks(tmp_path):
+    paths = []
+    for name in ("a", "b", "c"):
+        write_sample(tmp_path / f"{name}.wav", frames=1000)
+        bank = tmp_path / f"{name}.json"
+        bank.write_text(json.dumps({"36": str(tmp_path / f"{name}.wav")}))
+        paths.append(bank)
+    return paths
+
+
+class CountingDecoder:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, path, sample_rate):
+        self.calls += 1
+        return decode_sample(path, sample_rate)
+
+
+def test_decoded_samples_persist_on_disk(tmp_path, banks):
+    decoder = CountingDecoder()
+    first = SampleCache(tmp_path / "cache", decoder=decoder).load_bank(banks[0])
+    second = SampleCache(tmp_path / "cache", decoder=decoder).load_bank(banks[0])
+
+    assert decoder.calls == 1
+    assert isinstance(second[36], np.memmap)
+    assert second[36].shape == (1000, 2)
+    assert np.array_equal(first[36], second[36])
+
+
+def test_modified_sample_is_decoded_again(tmp_path, banks):
+    decoder = CountingDecoder()
+    SampleCache(tmp_path / "cache", decoder=decoder).load_bank(banks[0])
+
+    write_sample(tmp_path / "a.wav", frames=500)
+    os.utime(tmp_path / "a.wav", ns=(0, 10**18))
+    bank = SampleCache(tmp_path / "cache", decoder=decoder).load_bank(banks[0])
+
+    assert decoder.calls == 2
+    assert bank[36].shape == (500, 2)
+
+
+def test_sample_replaced_in_place_reloads_the_bank(tmp_path, banks):
+    decoder = CountingDecoder()
+    cache = SampleCache(tmp_path / "cache", decoder=decoder)
+    first = cache.load_bank(banks[0])
+    assert cache.load_bank(banks[0]) is first
+
+    write_sample(tmp_path / "a.wav", frames=500)
+    os.utime(tmp_path / "a.wav", ns=(0, 10**18))
+    bank = cache.load_bank(banks[0])
+
+    assert bank is not first and decoder.calls == 2
+    assert bank[36].shape == (500, 2)
+
+
+def test_bank_lru_respects_memory_cap(tmp_path, banks):
+    # Each bank holds 1000 stereo int16 frames: 4000 bytes
+    cache = SampleCache(tmp_path / "cache", max_bytes=8000)
+    first = cache.load_bank(banks[0])
+    second = cache.load_bank(banks[1])
+
+    assert cache.load_bank(banks[0]) is first
+    cache.load_bank(banks[2])
+
+    assert cache.memory_bytes == 8000
+    assert cache.load_bank(banks[0]) is first
+    assert cache.load_bank(banks[1]) is not second
@@ -0,0 +1,59 @@
+import time
+from claude_gran_cassa.scheduler import LatenessStats, Scheduler
+
+
+def test_scheduler_dispatches_in_order_on_time():
+    dispatched = []
+
+    def dispatch(batch):
+        now = time.perf_counter_ns()
+        dispatched.extend((payload, now - due) for due, payload in batch)
+
+    scheduler = Scheduler(dispatch)
+    events = [(i * 2_000_000, i) for i in range(10)]
+    start = scheduler.start(events)
+    scheduler.join(timeout=2)
+
+    assert [payload for payload, _ in dispatched] == list(range(10))
+    assert all(late >= 0 for _, late in dispatched)
+    assert len(scheduler.stats) == 10
+    assert scheduler.stats.max < 50_000_000
+    assert time.perf_counter_ns() - start >= 18_000_000
+
+
+def test_scheduler_batches_events_within_lookahead():
+    batches = []
+    scheduler = Scheduler(lambda batch: batches.append(batch), lookahead_ms=50)
+    start = scheduler.start([(0, "a"), (10_000_000, "b"), (200_000_000, "c")])
+    scheduler.join(timeout=2)
+
+    assert [[payload for _, payload in batch] for batch in batches] == [
+        ["a", "b"],
+        ["c"],
+    ]
+    # Due times are absolute so the consumer can timestamp its output
+    assert batches[0][1][0] == start + 10_000_000
+
+
+def test_scheduler_stop_interrupts_wait():
+    dispatched = []
+    scheduler = Scheduler(dispatched.extend)
+    scheduler.start([(0, "now"), (10_000_000_000, "later")])
+    time.sleep(0.05)
+
+    begin = time.perf_counter()
+    scheduler.stop()
+    assert time.perf_counter() - begin < 1
+    assert [payload for _, payload in dispatched] == ["now"]
+    assert not scheduler.running
+
+
+def test_lateness_stats():
+    stats = LatenessStats()
+    for lateness in [0, 50_000, 150_000, 2_000_000]:
+        stats.record(lateness)
+
+    assert stats.max == 2_000_000
+    assert stats.p50 == 100_000
+    assert stats.histogram(bucket_us=100, buckets=3) == [2, 1, 1]
+    assert "4 events" in stats.summary()
@@ -0,0 +1,102 @@
+import numpy as np
+from claude_gran_cassa.library import PatternLibrary
+from claude_gran_cassa.models import Composition, Pattern, SongConfig
+from claude_gran_cassa.similarity import (
+    GRID,
+    SimilarityIndex,
+    fingerprint,
+    pattern_fingerprint,
+)
+
+
+def groove(hihat, note=42, velocity=100):
+    return Composition(
+        config=SongConfig(bpm=120),
+        patterns=[
+            Pattern(hits=[1, 0, 0, 0] * 4, note=36, name="kick"),
+            Pattern(
+                hits=hihat,
+                divisions=len(hihat),
+                note=note,
+                velocities=[velocity] * sum(hihat),
+                name="hihat",
+            ),
+        ],
+    )
+
+
+def test_patterns_resample_to_common_grid():
+    eighths = Pattern(hits=[1, 0] * 4, divisions=8)
+    sixteenths = Pattern(hits=[1, 0, 0, 0] * 4, divisions=16)
+    two_bars = Pattern(hits=[1, 0, 0, 0] * 8, divisions=32, bars=2)
+
+    assert len(pattern_fingerprint(eighths)) == GRID
+    np.testing.assert_array_equal(
+        pattern_fingerprint(eighths), pattern_fingerprint(sixteenths)
+    )
+    np.testing.assert_array_equal(
+        pattern_fingerprint(sixteenths), pattern_fingerprint(two_bars)
+    )
+
+    triplets = Pattern(hits=[1] * 12, divisions=16, triplet=True)
+    assert np.count_nonzero(pattern_fingerprint(triplets)) == 12
+
+
+def test_fine_grids_map_to_exact_slots():
+    thirty_seconds = Pattern(hits=[1] * 32, divisions=32)
+    positions = np.flatnonzero(pattern_fingerprint(thirty_seconds))
+    assert positions.tolist() == sorted({step * 48 // 32 for step in range(32)})
+    assert positions[-1] == 46  # Not folded back onto the downbeat
+
+    twenty_fourths = Pattern(hits=[1] * 24, divisions=24)
+    assert np.flatnonzero(pattern_fingerprint(twenty_fourths)).tolist() == list(
+        range(0, 48, 2)
+    )
+
+    offbeats = Pattern(hits=[0, 1] * 16, divisions=32)
+    assert np.flatnonzero(pattern_fingerprint(offbeats)).tolist() == [
+        step * 48 // 32 for step in range(1, 32, 2)
+    ]
+
+
+def test_instruments_align_by_note():
+    closed = groove([1, 0] * 8, note=42)
+    pedal = groove([1, 0] * 8, note=44)
+    ride = groove([1, 0] * 8, note=51)
+
+    np.testing.assert_array_equal(fingerprint(closed), fingerprint(pedal))
+    assert not np.array_equal(fingerprint(closed), fingerprint(ride))
+
+
+def test_nearest_and_incremental_index(tmp_path):
+    with PatternLibrary(tmp_path / "library.db") as library:
+        straight = library.add(groove([1, 0] * 8), "straight")
+        busy = library.add(groove([1] * 16), "busy")
+
+        index = SimilarityIndex(library)
+        query = groove([1, 0] * 8, velocity=90)
+        assert index.nearest(query, k=1)[0][0] == straight.id
+        assert len(index) == 2
+
+        # Saved after the index was built: picked up on the next search
+        exact = library.add(query, "exact")
+        results = index.nearest(query, k=3)
+        assert [entry_id for entry_id, _ in results] == [exact.id, straight.id, busy.id]
+        assert abs(results[0][1] - 1) < 1e-6
+
+        # Hamming ignores velocity, so both straight grooves score 1.0
+        hamming = dict(index.nearest(query, k=3, metric="hamming"))
+        assert hamming[straight.id] == hamming[exact.id] == 1.0
+        assert hamming[busy.id] < 1.0
+
+        assert exact.id not in dict(index.nearest(query, exclude=exact.id))
+
+
+def test_duplicates(tmp_path):
+    with PatternLibrary(tmp_path / "library.db") as library:
+        first = library.add(groove([1, 0] * 8), "a")
+        library.add(groove([1, 1, 0, 0] * 4), "b")
+        second = library.add(groove([1, 0] * 8, velocity=110), "c")
+
+        pairs = SimilarityIndex(library).duplicates(threshold=0.99)
+        assert [(a, b) for a, b, _ in pairs] == [(first.id, second.id)]
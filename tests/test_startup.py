@@ -0,0 +1,51 @@
+import json
+import subprocess
+import sys
+import click
+import pytest
+from claude_gran_cassa.cli.main import COMMANDS, cli
+
+SLOW_MODULES = ("pygame", "anthropic", "dotenv")
+
+# Scripts run the CLI hundreds of times per job, so listing the commands
+# loads none of them, nor what they need for actual work
+HELP_UNUSED_MODULES = SLOW_MODULES + ("numpy", "sqlite3", "mido")
+
+PROBE = """
+import json, sys
+from claude_gran_cassa.cli.main import cli
+try:
+    cli(sys.argv[1:], standalone_mode=False)
+except SystemExit:
+    pass
+print(json.dumps(sorted({name.split(".")[0] for name in sys.modules})))
+"""
+
+
+def probe(*args):
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE, *args],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+@pytest.mark.parametrize(
+    "args", [["--help"], ["play", "--help"], ["generate", "--help"]]
+)
+def test_help_does_not_import_slow_dependencies(args):
+    assert not set(SLOW_MODULES) & set(probe(*args))
+
+
+def test_help_loads_no_subcommand():
+    loaded = set(probe("--help"))
+    assert not set(HELP_UNUSED_MODULES) & loaded
+
+
+def test_listed_help_matches_the_commands():
+    ctx = click.Context(cli)
+    for name, (_, _, short_help) in COMMANDS.items():
+        help = cli.get_command(ctx, name).help
+        assert help.split("\n\n")[0].strip() == short_help, name
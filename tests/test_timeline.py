@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+from claude_gran_cassa.models import Composition, Pattern, SongConfig
+from claude_gran_cassa.timeline import compile_timeline, content_hash
+
+
+def make_composition(bpm=130):
+    kick = Pattern(
+        hits=[1, 0, 0, 0, 1, 0, 0, 0],
+        divisions=8,
+        channel=1,
+        note=36,
+        velocities=[127, 110],
+        name="kick",
+    )
+    hihat = Pattern(
+        hits=[1, 1, 1, 1, 1, 1],
+        divisions=6,
+        triplet=True,
+        channel=2,
+        note=42,
+        panning=[10, 20, 30, 40, 50, 60],
+        name="hihat",
+    )
+    return Composition(config=SongConfig(bpm=bpm), patterns=[kick, hihat])
+
+
+def test_timeline_is_sorted_struct_of_arrays():
+    timeline = compile_timeline(make_composition(), ppqn=480)
+
+    assert len(timeline) == 8
+    assert list(timeline.tick) == [0, 0, 213, 426, 639, 852, 960, 1065]
+    assert list(timeline.note) == [36, 42, 42, 42, 42, 42, 36, 42]
+    assert list(timeline.channel) == [0, 1, 1, 1, 1, 1, 0, 1]
+    assert list(timeline.velocity[timeline.note == 36]) == [127, 110]
+    assert list(timeline.pan[timeline.note == 42]) == [10, 20, 30, 40, 50, 60]
+    assert timeline.length == 1920
+
+
+def test_timeline_is_memoized_on_content():
+    first = compile_timeline(make_composition())
+    second = compile_timeline(make_composition())
+    changed = compile_timeline(make_composition(bpm=140))
+
+    assert first is second
+    assert changed is not first
+    assert changed.bpm == 140
+    with pytest.raises(ValueError):
+        first.tick[0] = 1
+
+
+def test_content_hash_covers_every_field():
+    base = content_hash(make_composition())
+    assert content_hash(make_composition()) == base
+
+    def changed(edit):
+        composition = make_composition()
+        edit(composition.patterns[0])
+        return content_hash(composition)
+
+    edits = [
+        lambda p: setattr(p, "hits", [1, 0, 0, 0, 1, 0, 0, 1]),
+        lambda p: setattr(p, "velocities", [127, 111]),
+        lambda p: setattr(p, "panning", [64, 64, 64]),
+        lambda p: setattr(p, "note", 35),
+        lambda p: setattr(p, "name", "kick 2"),
+        lambda p: setattr(p, "triplet", True),
+    ]
+    hashes = {changed(edit) for edit in edits}
+    assert len(hashes) == len(edits) and base not in hashes
+
+    swung = make_composition()
+    swung.config.swing_amount = 0.2
+    assert content_hash(swung) != base
+
+
+def test_timeline_rejects_missing_velocities():
+    pattern = Pattern(hits=[1, 1, 1, 1], divisions=4, velocities=[100])
+    composition = Composition(config=SongConfig(), patterns=[pattern])
+
+    with pytest.raises(ValueError):
+        compile_timeline(composition)
+
+
+def test_seconds():
+    timeline = compile_timeline(make_composition(bpm=120), ppqn=480)
+
+    assert np.allclose(timeline.seconds()[-2:], [1.0, 1065 / 960])
@@ -0,0 +1,67 @@
+import json
+import pytest
+from types import SimpleNamespace
+from claude_gran_cassa.composer import Composer
+from claude_gran_cassa.tracing import record_usage, span, tracer
+from tests.test_parser import RESPONSE
+
+
+@pytest.fixture
+def tracing():
+    tracer.reset()
+    tracer.enable()
+    yield tracer
+    tracer.disable()
+    tracer.reset()
+
+
+def test_spans_are_only_recorded_when_enabled(tracing):
+    tracer.disable()
+    with span("ignored") as current:
+        current.set(size=1)
+    tracer.enable()
+    with span("parse", size=3) as current:
+        current.set(patterns=2)
+
+    assert [s.name for s in tracer.spans] == ["parse"]
+    assert tracer.spans[0].attrs == {"size": 3, "patterns": 2}
+    assert tracer.spans[0].duration_ns > 0
+
+
+def test_failed_span_records_the_error(tracing):
+    with pytest.raises(ValueError):
+        with span("parse"):
+            raise ValueError("bad")
+
+    assert tracer.spans[0].attrs == {"error": "ValueError"}
+
+
+class UsageClient:
+    def __init__(self):
+        self.messages = self
+
+    def create(self, **request):
+        return SimpleNamespace(
+            content=[SimpleNamespace(text=json.dumps(RESPONSE))],
+            usage=SimpleNamespace(input_tokens=1500, output_tokens=420),
+        )
+
+
+def test_composer_request_is_traced_with_token_usage(tracing, tmp_path):
+    Composer(api_key="test", client=UsageClient()).generate_pattern("techno")
+
+    request, parse = tracer.spans
+    assert (request.name, parse.name) == ("api.request", "parse")
+    assert request.attrs["input_tokens"] == 1500
+    assert tracer.counters == {"input_tokens": 1500, "output_tokens": 420}
+    assert "api.request" in tracer.summary()
+
+    path = tmp_path / "trace.json"
+    tracer.write(path)
+    events = json.loads(path.read_text())["traceEvents"]
+    assert [e["ph"] for e in events] == ["X", "X", "C", "C"]
+
+
+def test_record_usage_ignores_responses_without_usage(tracing):
+    record_usage(SimpleNamespace())
+    assert not tracer.counters
@@ -0,0 +1,98 @@
+import copy
+import json
+import pytest
+from claude_gran_cassa.composer import Composer
+from claude_gran_cassa.parser import ResponseParser
+from claude_gran_cassa.validation import ValidationError, check_composition
+from tests.test_composer import StubClient
+from tests.test_parser import RESPONSE
+
+
+def broken_response():
+    data = copy.deepcopy(RESPONSE)
+    kick, hat = data["patterns"]
+    kick["velocities"] = [127, 100, 90]  # One hit, three velocities
+    kick["note"] = 200
+    hat["channel"] = 1  # Same channel as the kick
+    hat["panning"] = [-90]  # Two hits, one pan
+    hat["hits"] = [0, 1, 0, 1, 0, 0]  # Six steps for four divisions
+    return data
+
+
+def test_repairs_common_mistakes():
+    data = broken_response()
+    repairs = check_composition(data)
+
+    kick, hat = data["patterns"]
+    assert kick["velocities"] == [127]
+    assert kick["note"] == 127
+    assert hat["channel"] == 2
+    assert hat["hits"] == [0, 1, 0, 1]
+    assert hat["panning"] == [-90, 0]
+    assert all(issue.repaired for issue in repairs)
+    assert {issue.path for issue in repairs} == {
+        "/patterns/0/velocities",
+        "/patterns/0/note",
+        "/patterns/1/channel",
+        "/patterns/1/hits",
+        "/patterns/1/panning",
+    }
+
+
+def test_valid_response_needs_no_repairs():
+    data = copy.deepcopy(RESPONSE)
+    assert check_composition(data) == []
+    assert data["patterns"][1]["panning"] == RESPONSE["patterns"][1]["panning"]
+
+
+def test_structured_errors():
+    data = broken_response()
+    del data["patterns"][0]["hits"]
+    data["patterns"][1]["velocities"] = ["loud", 90]
+
+    with pytest.raises(ValidationError) as error:
+        check_composition(data)
+
+    fatal = [issue for issue in error.value.issues if not issue.repaired]
+    assert [issue.path for issue in fatal] == [
+        "/patterns/0/hits",
+        "/patterns/1/velocities/0",
+    ]
+    assert "/patterns/0/hits: is required" in str(error.value)
+
+    # Without repair every deviation is an error
+    with pytest.raises(ValidationError) as error:
+        check_composition(broken_response(), repair=False)
+    assert len(error.value.issues) == 5
+
+
+@pytest.mark.parametrize("value", [float("inf"), float("-inf"), float("nan")])
+def test_non_finite_numbers_are_errors(value):
+    data = copy.deepcopy(RESPONSE)
+    data["patterns"][0]["note"] = value
+    data["patterns"][1]["velocities"][0] = value
+
+    with pytest.raises(ValidationError) as error:
+        check_composition(data)
+
+    assert [issue.path for issue in error.value.issues] == [
+        "/patterns/0/note",
+        "/patterns/1/velocities/0",
+    ]
+    assert "must be a finite number" in str(error.value)
+
+
+def test_parse_repairs_in_a_single_request():
+    client = StubClient("Here you go:\n" + json.dumps(broken_response()))
+    composer = Composer(api_key="test", client=client)
+
+    composition = composer.generate_pattern("techno")
+
+    assert len(client.requests) == 1
+    kick, hat = composition.patterns
+    assert hat.channel == 2
+    assert len(hat.velocities) == len(hat.panning) == hat.hit_count
+
+    repairs = []
+    ResponseParser.parse(json.dumps(broken_response()), repairs)
+    assert len(repairs) == 5